@@ -1,24 +1,216 @@
+import bisect
+import math
+
+
+DEFAULT_TOP_K = 5
+DEFAULT_NODE_BUDGET = 200000
+# Slack for float error between prefix-sum bounds and summed leg totals
+BOUND_EPSILON = 1e-9
+
+
+def _prepare_runners(runners):
+    """
+    Sort runners by price and precompute what the search needs per runner.
+
+    Returns (runners, log_prices, prefix, event_bits, type_bits) where prefix
+    holds prefix sums of the log prices, and event/type bits index each
+    runner's event-id and marketType in a bitset (event bit 0 = no event).
+    """
+    sorted_runners = sorted(runners, key=lambda r: r.get('price', 1))
+    log_prices = [math.log(r['price']) for r in sorted_runners]
+
+    prefix = [0.0]
+    for value in log_prices:
+        prefix.append(prefix[-1] + value)
+
+    event_index = {}
+    type_index = {}
+    event_bits = []
+    type_bits = []
+    for runner in sorted_runners:
+        event_id = runner.get('event-id')
+        if event_id:
+            event_bits.append(1 << event_index.setdefault(event_id, len(event_index)))
+        else:
+            event_bits.append(0)
+        # A missing marketType counts as its own type, as before
+        type_bits.append(1 << type_index.setdefault(runner.get('marketType'), len(type_index)))
+
+    return sorted_runners, log_prices, prefix, event_bits, type_bits
+
+
+def _search_parlays(log_prices, prefix, event_bits, type_bits, target_odd, target_min, target_max,
+                    max_legs, top_k, node_budget):
+    """
+    Exact best-k branch and bound over combinations of 2..max_legs runners.
+
+    Works on sums of log prices. Each node bounds the totals reachable below
+    it with prefix sums (smallest / largest remaining legs) and is pruned when
+    that interval misses the target range or cannot beat the current k-th best
+    (distance, leg count). Children are tried outward from the leg that would land closest
+    to the target, so good combinations are found early. Diversification:
+    legs may share an event only when the whole parlay is single-event, and
+    at most two legs share a marketType.
+
+    Returns (best, found, nodes, complete) where best is a list of
+    (distance, leg_count, indices, log_total) sorted best first.
+    """
+    n = len(log_prices)
+    log_target = math.log(target_odd)
+    log_min = math.log(target_min) if target_min > 0 else float('-inf')
+    log_max = math.log(target_max)
+
+    best = []
+    state = {'found': 0, 'nodes': 0, 'complete': True}
+
+    def distance(log_total):
+        # Ranked on the displayed (2 decimal) odd, as combinations are shown
+        return abs(round(math.exp(log_total), 2) - target_odd)
+
+    def interval_distance(lo, hi):
+        """Smallest distance to target for totals in [lo, hi], or None if out of range."""
+        lo = max(lo - BOUND_EPSILON, log_min)
+        hi = min(hi + BOUND_EPSILON, log_max)
+        if lo > hi:
+            return None
+        if lo <= log_target <= hi:
+            return 0.0
+        return distance(hi) if hi < log_target else distance(lo)
+
+    def beaten(dist, legs):
+        """True when nothing at (dist, legs) can enter the top-k any more."""
+        return len(best) >= top_k and (dist, legs) >= best[-1][:2]
+
+    def record(log_total, indices):
+        state['found'] += 1
+        dist = distance(log_total)
+        if not beaten(dist, len(indices)):
+            bisect.insort(best, (dist, len(indices), indices, log_total))
+            del best[top_k:]
+
+    def bound(start, legs, log_total):
+        """Distance bound for every combination below this node."""
+        more_min = max(0, 2 - legs)
+        more_max = min(max_legs - legs, n - start)
+        if more_min > more_max:
+            return None
+        lo = log_total + (prefix[start + more_min] - prefix[start])
+        hi = log_total + (prefix[n] - prefix[n - more_max])
+        return interval_distance(lo, hi)
+
+    def visit(start, indices, log_total, events, single_event, types_once, types_twice):
+        legs = len(indices)
+        if legs >= 2 and log_min <= log_total <= log_max:
+            record(log_total, indices)
+        if legs >= max_legs or start >= n:
+            return
+
+        # Aim the next leg at the target split over the legs still required
+        needed = max(1, 2 - legs)
+        pivot = max(bisect.bisect_left(log_prices, (log_target - log_total) / needed, start), start)
+        # Smallest legs a child still has to add, largest it may add
+        child_more_min = max(0, 1 - legs)
+        child_legs_min = legs + 1 + child_more_min
+        if beaten(0.0, child_legs_min):
+            # Even an exact hit below here would have too many legs
+            return
+        child_more_max = max_legs - legs - 1
+        top_tail = prefix[n] - prefix[max(n - child_more_max, 0)]
+        up, down = pivot, pivot - 1
+
+        while up < n or down >= start:
+            for going_up in (True, False):
+                if going_up:
+                    if up >= n:
+                        continue
+                    i = up
+                    up += 1
+                    # Child totals only grow with i, so once the smallest one
+                    # overshoots the range or the k-th best, stop going up
+                    if i + 1 + child_more_min <= n:
+                        child_lo = log_total + log_prices[i] + (prefix[i + 1 + child_more_min] - prefix[i + 1]) - BOUND_EPSILON
+                        if child_lo > log_max or (child_lo > log_target and beaten(distance(child_lo), child_legs_min)):
+                            up = n
+                            continue
+                else:
+                    if down < start:
+                        continue
+                    i = down
+                    down -= 1
+                    # Likewise the largest reachable total only shrinks going down
+                    child_hi = log_total + log_prices[i] + top_tail + BOUND_EPSILON
+                    if child_hi < log_min or (child_hi < log_target and beaten(distance(child_hi), child_legs_min)):
+                        down = start - 1
+                        continue
+
+                if state['nodes'] >= node_budget:
+                    state['complete'] = False
+                    return
+                state['nodes'] += 1
+
+                child_total = log_total + log_prices[i]
+                child_bound = bound(i + 1, legs + 1, child_total)
+                if child_bound is None or beaten(child_bound, child_legs_min):
+                    continue
+
+                event_bit = event_bits[i]
+                if event_bit and events & event_bit:
+                    # Same event again is only allowed in single-event parlays
+                    if events != event_bit:
+                        continue
+                    child_events, child_single = events, True
+                elif event_bit:
+                    if single_event:
+                        continue
+                    child_events, child_single = events | event_bit, False
+                else:
+                    child_events, child_single = events, single_event
+
+                type_bit = type_bits[i]
+                if types_twice & type_bit:
+                    continue
+                if types_once & type_bit:
+                    child_once, child_twice = types_once, types_twice | type_bit
+                else:
+                    child_once, child_twice = types_once | type_bit, types_twice
+
+                visit(i + 1, indices + (i,), child_total, child_events, child_single, child_once, child_twice)
+                if not state['complete']:
+                    return
+
+    if bound(0, 0, 0.0) is not None:
+        visit(0, (), 0.0, 0, False, 0, 0)
+
+    return best, state['found'], state['nodes'], state['complete']
+
+
 def invoke_build_parlay(request_data):
     """
     Builds parlay combinations that reach target odd
-    
+
     Input:
         - available_runners: list of market runners
         - target_odd: desired total odd
         - max_legs: maximum legs in parlay (default: 5)
         - tolerance: % tolerance for target (default: 0.20 = 20%)
-    
+        - top_k: combinations to return, closest to target first (default: 5)
+        - node_budget: search nodes to visit before returning the best so
+          far (default: 200000); search-complete tells whether the result
+          is exact
+
     Output:
         - parlay_combinations: list of combinations
         - Each combination has: runners, total_odd, leg_count
     """
-    
+
     params = request_data.get("params", {})
     runners = params.get("available-runners", [])
     target_odd = params.get("target-odd", 10.0)
     max_legs = params.get("max-legs", 5)
     tolerance = params.get("tolerance", 0.20)
-    
+    top_k = int(params.get("top-k", DEFAULT_TOP_K) or DEFAULT_TOP_K)
+    node_budget = int(params.get("node-budget", DEFAULT_NODE_BUDGET) or DEFAULT_NODE_BUDGET)
+
     if not runners or len(runners) == 0:
         return {
             "status": False,
@@ -29,10 +221,10 @@ def invoke_build_parlay(request_data):
                 "combinations-found": 0
             }
         }
-    
+
     # Filter runners with valid prices
     valid_runners = [r for r in runners if 'price' in r and r['price'] > 1.0]
-    
+
     if not valid_runners:
         return {
             "status": False,
@@ -43,84 +235,28 @@ def invoke_build_parlay(request_data):
                 "combinations-found": 0
             }
         }
-    
-    # Sort runners by price (ascending) for better algorithm performance
-    sorted_runners = sorted(valid_runners, key=lambda r: r.get('price', 1))
-    
-    combinations = []
+
+    target_odd = float(target_odd)
+    tolerance = float(tolerance)
     target_min = target_odd * (1 - tolerance)
     target_max = target_odd * (1 + tolerance)
-    
-    def calculate_combination(selected, current_odd, remaining_runners, depth):
-        """Recursive function to find valid parlay combinations"""
-        
-        # Base cases
-        if depth > max_legs:
-            return
-        
-        # Limit number of combinations to avoid performance issues
-        if len(combinations) >= 50:
-            return
-        
-        # Check if current combination is valid
-        if depth >= 2 and target_min <= current_odd <= target_max:
-            combinations.append({
-                'runners': selected.copy(),
-                'total_odd': round(current_odd, 2),
-                'leg_count': len(selected)
-            })
-        
-        # Pruning: if already too high, no point continuing this branch
-        if current_odd > target_max * 1.5:
-            return
-        
-        # Try adding more runners
-        for i, runner in enumerate(remaining_runners):
-            new_odd = current_odd * runner.get('price', 1)
-            
-            # Prune: if multiplying would exceed maximum too much
-            if new_odd > target_max * 2:
-                continue
-            
-            # Diversification: avoid same event (check event-id)
-            event_ids = [r.get('event-id') for r in selected if 'event-id' in r]
-            runner_event_id = runner.get('event-id')
-            
-            # For single-event parlays, allow multiple markets from same event
-            # For multi-event parlays, avoid duplicate events
-            if runner_event_id and len(set(event_ids)) > 1 and runner_event_id in event_ids:
-                continue
-            
-            # Diversification: avoid too many of the same market type
-            market_types = [r.get('marketType') for r in selected]
-            runner_market_type = runner.get('marketType')
-            if market_types.count(runner_market_type) >= 2:  # Max 2 of same type
-                continue
-            
-            calculate_combination(
-                selected + [runner],
-                new_odd,
-                remaining_runners[i+1:],
-                depth + 1
-            )
-    
-    # Start recursion
-    calculate_combination([], 1.0, sorted_runners, 0)
-    
-    # Sort combinations by multiple criteria:
-    # 1. Closest to target odd
-    # 2. Prefer fewer legs (more likely to win)
-    combinations.sort(key=lambda c: (
-        abs(c['total_odd'] - target_odd),
-        c['leg_count']
-    ))
-    
+
+    sorted_runners, log_prices, prefix, event_bits, type_bits = _prepare_runners(valid_runners)
+    best, found, nodes, complete = _search_parlays(
+        log_prices, prefix, event_bits, type_bits,
+        target_odd, target_min, target_max,
+        int(max_legs), max(1, top_k), max(1, node_budget)
+    )
+
     # Return top combinations with formatted data
     top_combinations = []
-    for combo in combinations[:5]:
+    for _, leg_count, indices, log_total in best:
+        total_odd = round(math.exp(log_total), 2)
+
         # Format runner info for better display
         formatted_runners = []
-        for runner in combo['runners']:
+        for i in indices:
+            runner = sorted_runners[i]
             formatted_runners.append({
                 'title': runner.get('title', ''),
                 'name': runner.get('name', ''),
@@ -130,23 +266,24 @@ def invoke_build_parlay(request_data):
                 'market-id': runner.get('market-id', ''),
                 'option-id': runner.get('option-id', '')
             })
-        
+
         top_combinations.append({
             'runners': formatted_runners,
-            'total_odd': combo['total_odd'],
-            'leg_count': combo['leg_count'],
-            'potential_return': round(combo['total_odd'] * 10, 2),  # Assuming R$10 stake
+            'total_odd': total_odd,
+            'leg_count': leg_count,
+            'potential_return': round(total_odd * 10, 2),  # Assuming R$10 stake
             'stake_suggestion': 10.0
         })
-    
+
     return {
         "status": True,
-        "message": f"Found {len(combinations)} parlay combinations (showing top 5)",
+        "message": f"Found {found} parlay combinations (showing top {len(top_combinations)})",
         "data": {
             "parlay-combinations": top_combinations,
             "target-odd": target_odd,
-            "combinations-found": len(combinations),
-            "best-combination": top_combinations[0] if top_combinations else None
+            "combinations-found": found,
+            "best-combination": top_combinations[0] if top_combinations else None,
+            "nodes-explored": nodes,
+            "search-complete": complete
         }
     }
-
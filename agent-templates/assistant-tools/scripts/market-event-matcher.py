@@ -1,38 +1,81 @@
 def match_markets_to_events(request_data):
     """
-    Simplified matcher with verbose logging and accent normalization.
+    Blocked, indexed matcher with level-gated logging and accent normalization.
+
+    Events are normalized, date-parsed and indexed once per call: by day bucket
+    (for the ±24h date window) and by team-name trigrams (a superset of every
+    event whose teams can overlap a market team). Each market is only fuzzy
+    scored against surviving candidates, and a candidate is skipped as soon as
+    its best possible confidence cannot beat the current best match, so the
+    result is the same as scoring every market against every event.
+
+    Dates without a UTC offset are read as UTC. The full scan compared them
+    as given and failed on a naive/aware pair; feeds that send local naive
+    times will be off by their offset in the ±24h window.
+
+    Optional params:
+        log_level: "debug" | "info" (default) | "warning"
     """
     import difflib
     import unicodedata
-    from datetime import datetime
+    from datetime import datetime, timezone
+
+    params = request_data.get("params", {})
+    markets = params.get("markets", [])
+    events = params.get("events", [])
+
+    log_levels = {"debug": 10, "info": 20, "warning": 30}
+    log_threshold = log_levels.get(str(params.get("log_level") or "info").lower(), 20)
+
+    def log(level, message):
+        if log_levels[level] >= log_threshold:
+            print(f"LOG: {message}")
 
     def normalize(text):
         if not text: return ""
         # Remove accents and lowercase
         return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8').lower().strip()
 
+    aliases = {
+        "internazionale": "inter milan",
+        "inter milano": "inter milan",
+        "psv eindhoven": "psv",
+        "manchester u.": "manchester united",
+        "manchester utd": "manchester united",
+    }
+
     def canonical_team_name(name):
         """Normalize common team aliases so name matching is stricter."""
         base = normalize(name)
-        aliases = {
-            "internazionale": "inter milan",
-            "inter milano": "inter milan",
-            "psv eindhoven": "psv",
-            "manchester u.": "manchester united",
-            "manchester utd": "manchester united",
-        }
         return aliases.get(base, base)
-    
+
+    def parse_date(date_str):
+        if not date_str:
+            return None
+        try:
+            clean = date_str.replace('ZT', 'T').replace('Z', '+00:00')
+            parsed = datetime.fromisoformat(clean)
+        except Exception:
+            return None
+        # Naive timestamps are treated as UTC so they compare with aware ones
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    def day_bucket(date):
+        return int(date.timestamp() // 86400)
+
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
     def is_outright_market(market):
         """Check if this is an outright/season market rather than a match market"""
-        m_val = market.get("value", {})
+        m_val = market.get("value", {}) or {}
         m_title = normalize(m_val.get("title", "") or market.get("title", ""))
-        
+
         # Check for outright keywords (be specific to avoid false positives like "Champions League")
         outright_keywords = [
             'outright',
             'tournament winner',
-            'league winner', 
+            'league winner',
             'to win',
             'top scorer',
             'relegation',
@@ -40,71 +83,128 @@ def match_markets_to_events(request_data):
             'vencedor da liga'
         ]
         if any(keyword in m_title for keyword in outright_keywords):
-            print(f"LOG: Market '{m_title}' flagged as outright due to keyword")
+            log("debug", f"Market '{m_title}' flagged as outright due to keyword")
             return True
-        
+
         # Check if there are participants (matches have teams, outrights don't always)
         participants = m_val.get('participants', [])
-        
-        # DEBUG: Log participant info
-        print(f"LOG: Market '{m_title}' has {len(participants)} participants: {participants}")
-        
+        log("debug", f"Market '{m_title}' has {len(participants)} participants: {participants}")
+
         # Only filter if explicitly has no participants AND title doesn't suggest a match
         if len(participants) < 2:
             # Check if title looks like a match (e.g., "Team A vs Team B")
             if ' vs ' in m_title or ' x ' in m_title or ' - ' in m_title:
-                print(f"LOG: Market '{m_title}' has <2 participants but title looks like a match - keeping")
+                log("debug", f"Market '{m_title}' has <2 participants but title looks like a match - keeping")
                 return False
-            print(f"LOG: Market '{m_title}' flagged as outright due to <2 participants")
+            log("debug", f"Market '{m_title}' flagged as outright due to <2 participants")
             return True
-            
+
         return False
 
-    print("LOG: Starting match_markets_to_events (v3 - normalized + outright filter)")
-    
-    params = request_data.get("params", {})
-    markets = params.get("markets", [])
-    events = params.get("events", [])
-    
-    print(f"LOG: Total markets received: {len(markets)}")
-    print(f"LOG: Total events received: {len(events)}")
-    
+    def score(team_score, name_score, date_score):
+        # Total Confidence (favor team overlap more heavily)
+        if team_score > 0:
+            return (team_score * 0.6) + (name_score * 0.25) + (date_score * 0.15)
+        # No team data on either side; fallback to name/date but with lower weight
+        return (name_score * 0.6) + (date_score * 0.4)
+
+    log("info", "Starting match_markets_to_events (v4 - blocked + indexed)")
+    log("info", f"Total markets received: {len(markets)}")
+    log("info", f"Total events received: {len(events)}")
+
     # Filter out outright markets
     match_markets = [m for m in markets if not is_outright_market(m)]
     outright_count = len(markets) - len(match_markets)
-    
+
     if outright_count > 0:
-        print(f"LOG: Filtered out {outright_count} outright/season markets")
-    
-    print(f"LOG: Processing {len(match_markets)} match markets against {len(events)} events")
-    
-    # Debug: print all events received
-    for idx, event in enumerate(events[:5]):  # Show first 5
-        e_val = event.get("value", {})
+        log("info", f"Filtered out {outright_count} outright/season markets")
+
+    log("info", f"Processing {len(match_markets)} match markets against {len(events)} events")
+
+    # Pre-normalize, pre-parse and index every event once
+    prepared_events = []
+    events_by_day = {}
+    teamless_events = set()
+    short_team_events = set()
+    team_gram_index = {}
+    team_head_index = {}
+
+    for e_idx, event in enumerate(events):
+        e_val = event.get("value", {}) or {}
         e_title = e_val.get("title", "") or event.get("title", "")
-        e_date = e_val.get("schema:startDate", "")
-        print(f"LOG: Event {idx}: '{e_title}' | Date: {e_date}")
+        e_search = normalize(e_title)
+        e_date = parse_date(e_val.get("schema:startDate", "") or e_val.get("startDate", ""))
+
+        e_teams_raw = e_val.get('sport:competitors', []) or e_val.get('sport:competitor', []) or e_val.get('competitors', [])
+        e_teams = []
+        if isinstance(e_teams_raw, list):
+            for t in e_teams_raw:
+                if isinstance(t, dict):
+                    e_name = canonical_team_name(t.get('name', ''))
+                elif isinstance(t, str):
+                    e_name = canonical_team_name(t)
+                else:
+                    continue
+                if e_name:
+                    e_teams.append(e_name)
+
+        # SequenceMatcher caches its analysis of seq2, so keep one per event
+        # and only swap the market side in per comparison.
+        matcher = difflib.SequenceMatcher(None, "", e_search)
+        prepared_events.append((event, e_title, e_date, e_teams, matcher))
+
+        if e_date is not None:
+            events_by_day.setdefault(day_bucket(e_date), []).append(e_idx)
+
+        if not e_teams:
+            teamless_events.add(e_idx)
+        for e_name in e_teams:
+            if len(e_name) < 3:
+                short_team_events.add(e_idx)
+                continue
+            # Every trigram finds events containing a market team; the
+            # leading trigram finds events contained in a market team.
+            for gram in trigrams(e_name):
+                team_gram_index.setdefault(gram, set()).add(e_idx)
+            team_head_index.setdefault(e_name[:3], set()).add(e_idx)
+
+    team_events = set(range(len(events))) - teamless_events
+
+    def team_candidates(m_teams):
+        """Superset of events whose teams can overlap (substring) a market team."""
+        candidates = set(short_team_events)
+        for mt in m_teams:
+            if len(mt) < 3:
+                # A short name can be a substring of any event team.
+                return set(team_events)
+            candidates |= team_gram_index.get(mt[:3], set())
+            for gram in trigrams(mt):
+                candidates |= team_head_index.get(gram, set())
+        return candidates
+
+    def can_win(bound, e_idx):
+        # Ties keep the earliest event, as a full in-order scan would
+        return bound > best_conf or (bound == best_conf and e_idx < best_idx)
 
     matches = []
+    fuzzy_comparisons = 0
+    best_idx = -1
+    best_conf = 0.0
 
     for m_idx, market in enumerate(match_markets):
-        m_val = market.get("value", {})
+        m_val = market.get("value", {}) or {}
         m_title = m_val.get("title", "") or market.get("title", "")
         m_comp = m_val.get("competition", "")
         m_search = normalize(f"{m_title} {m_comp}")
-        
+
         # Date parsing (Market)
         m_date_str = m_val.get("startDate") or m_val.get("startDateUtc", "")
-        m_date = None
-        if m_date_str:
-            try:
-                clean = m_date_str.replace('ZT', 'T').replace('Z', '+00:00')
-                m_date = datetime.fromisoformat(clean)
-            except Exception as e:
-                print(f"LOG: Market date parse error: {e}")
-
-        print(f"\nLOG: === Market {m_idx}: '{m_title}' (Date: {m_date}, Comp: {m_comp}) ===")
-        
+        m_date = parse_date(m_date_str)
+        if m_date_str and m_date is None:
+            log("debug", f"Market date parse error for '{m_title}': {m_date_str}")
+
+        log("debug", f"=== Market {m_idx}: '{m_title}' (Date: {m_date}, Comp: {m_comp}) ===")
+
         # Extract Market Teams (Normalized)
         m_teams_raw = m_val.get('participants', [])
         m_teams = []
@@ -114,92 +214,89 @@ def match_markets_to_events(request_data):
             m_name = canonical_team_name(t.get('name', ''))
             if m_name:
                 m_teams.append(m_name)
-        print(f"LOG: Market Teams: {m_teams}")
+        log("debug", f"Market Teams: {m_teams}")
+
+        # Block: events sharing no team with the market are dropped by the
+        # scoring contract, so only team candidates and teamless events survive.
+        if m_teams:
+            candidates = team_candidates(m_teams) | teamless_events
+        else:
+            candidates = set(range(len(events)))
+
+        # Block: events inside the ±24h window are scored first; everything
+        # else gets date_score 0 and is only scanned if it could still win.
+        if m_date is not None:
+            m_day = day_bucket(m_date)
+            in_window = set()
+            for day in (m_day - 1, m_day, m_day + 1):
+                for e_idx in events_by_day.get(day, ()):
+                    if e_idx in candidates and abs((m_date - prepared_events[e_idx][2]).total_seconds()) / 3600 < 24:
+                        in_window.add(e_idx)
+            passes = [(sorted(in_window), None)]
+            rest_bound = max(score(1.0, 1.0, 0.0), score(0.0, 1.0, 0.0)) if m_teams else score(0.0, 1.0, 0.0)
+            passes.append((None, rest_bound))
+        else:
+            passes = [(sorted(candidates), None)]
+            in_window = set()
 
-        best_event = None
+        best_idx = -1
         best_conf = 0.0
 
-        for e_idx, event in enumerate(events):
-            e_val = event.get("value", {})
-            e_title = e_val.get("title", "") or event.get("title", "")
-            e_search = normalize(e_title)
-            
-            # Date parsing (Event)
-            e_date_str = e_val.get("schema:startDate", "") or e_val.get("startDate", "")
-            e_date = None
-            if e_date_str:
-                try:
-                    clean = e_date_str.replace('ZT', 'T').replace('Z', '+00:00')
-                    e_date = datetime.fromisoformat(clean)
-                except:
-                    pass
-
-            # 1. Name Score (Normalized)
-            name_score = difflib.SequenceMatcher(None, m_search, e_search).ratio()
-            
-            # 2. Date Score
-            date_score = 0.0
-            if m_date and e_date:
-                dt = m_date - e_date
-                hours_diff = abs(dt.total_seconds()) / 3600
-                if hours_diff < 24: # 24h tolerance
-                    date_score = 1.0
-            elif not m_date and not e_date:
-                date_score = 0.5
-
-            # 3. Participant/Team Check (Normalized)
-            e_teams_raw = e_val.get('sport:competitors', []) or e_val.get('sport:competitor', []) or e_val.get('competitors', [])
-            e_teams = []
-            if isinstance(e_teams_raw, list):
-                for t in e_teams_raw:
-                    if isinstance(t, dict):
-                        e_name = canonical_team_name(t.get('name', ''))
-                    elif isinstance(t, str):
-                        e_name = canonical_team_name(t)
-                    else:
-                        continue
-                    if e_name:
-                        e_teams.append(e_name)
-
-            team_score = 0.0
-            if m_teams and e_teams:
-                matches_found = 0
-                for mt in m_teams:
-                    for et in e_teams:
-                        if mt in et or et in mt:
-                            matches_found += 1
-                            break
-                team_score = matches_found / max(len(m_teams), 1)
-
-            # If both sides have teams but there is zero overlap, hard drop this event.
-            if m_teams and e_teams and team_score == 0:
-                print("LOG:     Skipping due to zero team overlap despite teams present")
-                continue
+        for pass_indices, pass_bound in passes:
+            if pass_indices is None:
+                if pass_bound < best_conf:
+                    continue
+                pass_indices = sorted(candidates - in_window)
+
+            for e_idx in pass_indices:
+                event, e_title, e_date, e_teams, matcher = prepared_events[e_idx]
+
+                # Date Score
+                date_score = 0.0
+                if m_date and e_date:
+                    hours_diff = abs((m_date - e_date).total_seconds()) / 3600
+                    if hours_diff < 24: # 24h tolerance
+                        date_score = 1.0
+                elif not m_date and not e_date:
+                    date_score = 0.5
+
+                # Participant/Team Check (Normalized)
+                team_score = 0.0
+                if m_teams and e_teams:
+                    matches_found = 0
+                    for mt in m_teams:
+                        for et in e_teams:
+                            if mt in et or et in mt:
+                                matches_found += 1
+                                break
+                    team_score = matches_found / max(len(m_teams), 1)
 
-            # Total Confidence (favor team overlap more heavily)
-            if team_score > 0:
-                conf = (team_score * 0.6) + (name_score * 0.25) + (date_score * 0.15)
-            else:
-                # No team data on either side; fallback to name/date but with lower weight
-                conf = (name_score * 0.6) + (date_score * 0.4)
-
-            # Log ALL comparisons with details (for debugging)
-            print(f"LOG:   Event {e_idx}: '{e_title}' | Conf: {conf:.2f} (Name: {name_score:.2f}, Team: {team_score:.2f}, Date: {date_score})")
-            if e_teams:
-                print(f"LOG:     Event Teams: {e_teams}")
-            
-            if conf > 0.55: # Log close calls
-                print(f"LOG:     >>> Close call! Score above 0.55")
-
-            if conf > best_conf:
-                best_conf = conf
-                best_event = event
-                print(f"LOG:     >>> New best match! (prev: {best_conf:.2f})")
+                # If both sides have teams but there is zero overlap, hard drop this event.
+                if m_teams and e_teams and team_score == 0:
+                    continue
 
+                # Name Score only when the candidate can still beat the best match
+                if not can_win(score(team_score, 1.0, date_score), e_idx):
+                    continue
+                matcher.set_seq1(m_search)
+                if not can_win(score(team_score, matcher.real_quick_ratio(), date_score), e_idx):
+                    continue
+                if not can_win(score(team_score, matcher.quick_ratio(), date_score), e_idx):
+                    continue
+                name_score = matcher.ratio()
+                fuzzy_comparisons += 1
+
+                conf = score(team_score, name_score, date_score)
+                log("debug", f"  Event {e_idx}: '{e_title}' | Conf: {conf:.2f} (Name: {name_score:.2f}, Team: {team_score:.2f}, Date: {date_score})")
+
+                if can_win(conf, e_idx):
+                    best_conf = conf
+                    best_idx = e_idx
+                    log("debug", f"    >>> New best match! ({best_conf:.2f})")
+
+        best_event = prepared_events[best_idx][0] if best_idx >= 0 else None
         if best_event and best_conf > 0.5:
-            best_event_title = best_event.get("value", {}).get("title", "") or best_event.get("title", "")
-            print(f"LOG:   >>> ✓ MATCHED with confidence {best_conf:.2f}")
-            print(f"LOG:       Matched event: '{best_event_title}'")
+            log("debug", f"  >>> MATCHED '{m_title}' -> '{prepared_events[best_idx][1]}' with confidence {best_conf:.2f}")
             matches.append({
                 "market": market,
                 "event": best_event,
@@ -207,7 +304,9 @@ def match_markets_to_events(request_data):
                 "event_code": best_event.get("metadata", {}).get("event_code")
             })
         else:
-            print(f"LOG:   >>> ✗ NO MATCH found (best_conf: {best_conf:.2f}, threshold: 0.5, has_event: {best_event is not None})")
+            log("debug", f"  >>> NO MATCH for '{m_title}' (best_conf: {best_conf:.2f}, threshold: 0.5, has_event: {best_event is not None})")
+
+    log("info", f"Matched {len(matches)} of {len(match_markets)} markets with {fuzzy_comparisons} fuzzy comparisons")
 
     return {
         "status": True,
@@ -1,5 +1,33 @@
+import hashlib
+import json
+from collections import OrderedDict
 from difflib import SequenceMatcher
 
+
+MARKET_INDEX_VERSION = 3
+MARKET_INDEX_CACHE_SIZE = 8
+
+# Define popular market types (in order of preference)
+POPULAR_MARKET_TYPES = [
+    "3way",
+    "total",
+    # "handicap",  # Excluded per user request
+    "draw_no_bet",
+    "both_teams_to_score",
+    "double_chance",
+    "correct_score",
+    "over/under"  # Added to include Total Goals markets
+]
+
+# Define market name patterns to exclude
+EXCLUDED_MARKET_PATTERNS = [
+    "result after",  # Excludes "Result after 60:00 min", etc.
+    "after",         # Additional pattern to catch time-based markets
+    "handicap"       # Exclude handicap markets by name
+]
+
+_market_index_cache = OrderedDict()
+
 def extract_markets_from_events(request_data):
     """
     Extract all markets from events' market_data.
@@ -164,6 +192,254 @@ def extract_markets_from_events(request_data):
         }
 
 
+def _market_fingerprint(all_markets):
+    return hashlib.sha1(json.dumps(all_markets, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _build_market_index(all_markets, fingerprint=None):
+    """
+    Build a JSON-serializable index over a market list.
+
+    Every distinct lowercased market name and type is stored once, with a
+    word inverted index over them and the non-excluded markets bucketed
+    under each; markets carry their exclusion flag, so queries only do set
+    lookups plus one fuzzy comparison per distinct string. Per event the
+    non-excluded markets are pre-sorted by popularity.
+    """
+    markets = [m for m in all_markets if isinstance(m, dict)]
+    names, types = [], []
+    name_ids, type_ids = {}, {}
+    market_name_ids, market_type_ids, excluded, popularity = [], [], [], []
+    name_markets, type_markets, by_event = [], [], {}
+    # Dicts as insertion-ordered sets of labels
+    excluded_examples, all_market_types = {}, {}
+
+    for idx, market in enumerate(markets):
+        market_name = str(market.get("market_name") or "").lower()
+        market_type = str(market.get("market_type") or "").lower()
+
+        if market_name not in name_ids:
+            name_ids[market_name] = len(names)
+            names.append(market_name)
+            name_markets.append([])
+        if market_type not in type_ids:
+            type_ids[market_type] = len(types)
+            types.append(market_type)
+            type_markets.append([])
+        market_name_ids.append(name_ids[market_name])
+        market_type_ids.append(type_ids[market_type])
+
+        # Check if market name contains any excluded patterns
+        is_excluded = any(p in market_name or p in market_type for p in EXCLUDED_MARKET_PATTERNS)
+        excluded.append(is_excluded)
+
+        try:
+            rank = POPULAR_MARKET_TYPES.index(market_type)
+        except ValueError:
+            rank = len(POPULAR_MARKET_TYPES)
+        popularity.append(rank)
+
+        label = f"{market.get('market_type', 'unknown')}: {market.get('market_name', '')}"
+        all_market_types[label] = None
+        if is_excluded:
+            excluded_examples[label] = None
+            continue
+
+        name_markets[name_ids[market_name]].append(idx)
+        type_markets[type_ids[market_type]].append(idx)
+        by_event.setdefault(market.get("event_id"), []).append(idx)
+
+    name_words, type_words = {}, {}
+    name_lengths, type_lengths = {}, {}
+    for string_id, name in enumerate(names):
+        name_lengths.setdefault(len(name), []).append(string_id)
+    for string_id, market_type in enumerate(types):
+        type_lengths.setdefault(len(market_type), []).append(string_id)
+    for string_id, name in enumerate(names):
+        for word in set(name.split()):
+            name_words.setdefault(word, []).append(string_id)
+    for string_id, market_type in enumerate(types):
+        for word in set(market_type.split()):
+            type_words.setdefault(word, []).append(string_id)
+
+    # Stable sort keeps the original market order within a popularity rank
+    event_order = [
+        sorted(indices, key=lambda i: popularity[i])
+        for indices in by_event.values()
+    ]
+
+    return {
+        "version": MARKET_INDEX_VERSION,
+        "fingerprint": fingerprint or _market_fingerprint(markets),
+        "markets": markets,
+        "names": names,
+        "types": types,
+        "market_name_ids": market_name_ids,
+        "market_type_ids": market_type_ids,
+        "excluded": excluded,
+        "name_words": name_words,
+        "type_words": type_words,
+        "name_lengths": sorted(name_lengths.items()),
+        "type_lengths": sorted(type_lengths.items()),
+        "name_markets": name_markets,
+        "type_markets": type_markets,
+        "event_order": event_order,
+        "excluded_count": sum(excluded),
+        "excluded_examples": list(excluded_examples),
+        "all_market_types": list(all_market_types),
+    }
+
+
+def _load_market_index(params):
+    """
+    Return the market index from `market_index` or (cached) from `all_markets`.
+
+    A passed index is only used when it is current: if `all_markets` is passed
+    as well, its fingerprint must match the index's.
+    """
+    all_markets = params.get("all_markets", [])
+    if not isinstance(all_markets, list):
+        all_markets = []
+    markets = [m for m in all_markets if isinstance(m, dict)]
+    fingerprint = _market_fingerprint(markets) if markets else None
+
+    market_index = params.get("market_index")
+    if isinstance(market_index, str) and market_index:
+        market_index = json.loads(market_index)
+    if isinstance(market_index, dict) and market_index.get("version") == MARKET_INDEX_VERSION:
+        if fingerprint is None or market_index.get("fingerprint") == fingerprint:
+            return market_index
+
+    if fingerprint is None:
+        fingerprint = _market_fingerprint(markets)
+
+    market_index = _market_index_cache.get(fingerprint)
+    if market_index is None:
+        market_index = _build_market_index(markets, fingerprint)
+        _market_index_cache[fingerprint] = market_index
+        while len(_market_index_cache) > MARKET_INDEX_CACHE_SIZE:
+            _market_index_cache.popitem(last=False)
+    else:
+        _market_index_cache.move_to_end(fingerprint)
+    return market_index
+
+
+def _similarity(query_lower, text, threshold):
+    """SequenceMatcher ratio, or 0.0 when the cheap upper bounds rule it out."""
+    matcher = SequenceMatcher(None, query_lower, text)
+    if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+        return 0.0
+    return matcher.ratio()
+
+
+def _fuzzy_hits(query_lower, strings, length_buckets, threshold):
+    """
+    string id -> ratio for the distinct strings scoring above threshold.
+
+    Only length buckets whose bound on the ratio (2 * shorter / total) can
+    exceed the threshold are visited.
+    """
+    query_len = len(query_lower)
+    hits = {}
+    for length, string_ids in length_buckets:
+        if 2.0 * min(query_len, length) / (query_len + length) <= threshold:
+            continue
+        for string_id in string_ids:
+            score = _similarity(query_lower, strings[string_id], threshold)
+            if score > threshold:
+                hits[string_id] = score
+    return hits
+
+
+def _query_markets(market_index, market_query, threshold=0.3):
+    """
+    Non-excluded markets scoring above threshold, best first, with relevance_score.
+
+    Candidates come from the word index and from the distinct names / types
+    that fuzzy score above the threshold; no other market is visited.
+    """
+    query_lower = market_query.strip().lower()
+    query_words = set(query_lower.split())
+    markets = market_index["markets"]
+    name_markets = market_index["name_markets"]
+    type_markets = market_index["type_markets"]
+
+    # Fuzzy score each distinct name / type once
+    name_scores = _fuzzy_hits(query_lower, market_index["names"], market_index["name_lengths"], threshold)
+    type_scores = _fuzzy_hits(query_lower, market_index["types"], market_index["type_lengths"], threshold)
+
+    # Check if query words are in market name or type via the word index
+    word_hits = {}
+    for word in query_words:
+        with_word = set()
+        for string_id in market_index["name_words"].get(word, ()):
+            with_word.update(name_markets[string_id])
+        for string_id in market_index["type_words"].get(word, ()):
+            with_word.update(type_markets[string_id])
+        for idx in with_word:
+            word_hits[idx] = word_hits.get(idx, 0) + 1
+
+    # Only non-excluded markets are bucketed, so candidates are never excluded
+    candidates = set(word_hits)
+    for string_id in name_scores:
+        candidates.update(name_markets[string_id])
+    for string_id in type_scores:
+        candidates.update(type_markets[string_id])
+
+    market_name_ids = market_index["market_name_ids"]
+    market_type_ids = market_index["market_type_ids"]
+    filtered_markets = []
+    for idx in sorted(candidates):
+        word_match_score = word_hits.get(idx, 0) / len(query_words) if query_words else 0
+
+        # Combined score (prioritize word matches)
+        combined_score = max(
+            name_scores.get(market_name_ids[idx], 0.0),
+            type_scores.get(market_type_ids[idx], 0.0),
+            word_match_score,
+        )
+
+        if combined_score > threshold:  # Threshold for relevance
+            filtered_markets.append({
+                **markets[idx],
+                "relevance_score": combined_score
+            })
+
+    # Sort by relevance score
+    filtered_markets.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+    return filtered_markets
+
+
+def build_market_index(request_data):
+    """
+    Build a reusable market index from all_markets.
+    Pass the returned market_index back to filter_and_summarize_markets
+    (instead of all_markets) to skip rebuilding it on the next turn.
+    """
+    try:
+        params = request_data.get("params", {}) if isinstance(request_data, dict) else {}
+        all_markets = params.get("all_markets", []) if isinstance(params, dict) else []
+        market_index = _load_market_index({"all_markets": all_markets})
+        return {
+            "status": True,
+            "data": {
+                "market_index": market_index,
+                "fingerprint": market_index["fingerprint"],
+                "total_markets": len(market_index["markets"]),
+                "excluded_markets_count": market_index["excluded_count"]
+            }
+        }
+
+    except Exception as e:
+        return {
+            "status": False,
+            "error": f"Error building market index: {str(e)}",
+            "data": {
+                "market_index": None
+            }
+        }
+
+
 def filter_and_summarize_markets(request_data):
     """
     Filter markets by market_query or popular market types.
@@ -207,105 +483,23 @@ def filter_and_summarize_markets(request_data):
         if reasoning_market_query:
             market_query = reasoning_market_query
         
-        if not isinstance(all_markets, list):
-            all_markets = []
-        
-        # Define popular market types (in order of preference)
-        popular_market_types = [
-            "3way",
-            "total",
-            # "handicap",  # Excluded per user request
-            "draw_no_bet",
-            "both_teams_to_score",
-            "double_chance",
-            "correct_score",
-            "over/under"  # Added to include Total Goals markets
-        ]
-        
-        # Define market name patterns to exclude
-        excluded_market_patterns = [
-            "result after",  # Excludes "Result after 60:00 min", etc.
-            "after",         # Additional pattern to catch time-based markets
-            "handicap"       # Exclude handicap markets by name
-        ]
+        # Build (or reuse) the market index once per market list
+        market_index = _load_market_index(params)
+        all_markets = market_index["markets"]
+        excluded_market_patterns = EXCLUDED_MARKET_PATTERNS
         
         filtered_markets = []
         
-        # Helper function to check if market should be excluded
-        def should_exclude_market(market):
-            market_name = market.get("market_name", "").lower()
-            market_type = market.get("market_type", "").lower()
-            
-            # Check if market name contains any excluded patterns
-            for pattern in excluded_market_patterns:
-                if pattern in market_name or pattern in market_type:
-                    return True
-            
-            return False
-        
         # Strategy 1: If market_query is provided, use fuzzy matching
         if market_query and isinstance(market_query, str) and market_query.strip():
-            query_lower = market_query.strip().lower()
-            
-            for market in all_markets:
-                # Skip excluded markets
-                if should_exclude_market(market):
-                    continue
-                
-                market_name = market.get("market_name", "").lower()
-                market_type = market.get("market_type", "").lower()
-                
-                # Calculate similarity scores
-                name_similarity = SequenceMatcher(None, query_lower, market_name).ratio()
-                type_similarity = SequenceMatcher(None, query_lower, market_type).ratio()
-                
-                # Check if query words are in market name or type
-                query_words = set(query_lower.split())
-                name_words = set(market_name.split())
-                type_words = set(market_type.split())
-                
-                word_match_score = len(query_words & (name_words | type_words)) / len(query_words) if query_words else 0
-                
-                # Combined score (prioritize word matches)
-                combined_score = max(name_similarity, type_similarity, word_match_score)
-                
-                if combined_score > 0.3:  # Threshold for relevance
-                    filtered_markets.append({
-                        **market,
-                        "relevance_score": combined_score
-                    })
-            
-            # Sort by relevance score
-            filtered_markets.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+            filtered_markets = _query_markets(market_index, market_query)
         
         # Strategy 2: If no matches or no query, use popular market types
         if not filtered_markets:
-            # Group markets by event
-            markets_by_event = {}
-            for market in all_markets:
-                # Skip excluded markets
-                if should_exclude_market(market):
-                    continue
-                
-                event_id = market.get("event_id")
-                if event_id not in markets_by_event:
-                    markets_by_event[event_id] = []
-                markets_by_event[event_id].append(market)
-            
-            # For each event, select popular markets
-            for event_id, event_markets in markets_by_event.items():
-                # Sort markets by popularity (based on market type order)
-                def get_popularity_rank(market):
-                    market_type = market.get("market_type", "").lower()
-                    try:
-                        return popular_market_types.index(market_type)
-                    except ValueError:
-                        return len(popular_market_types)
-                
-                event_markets.sort(key=get_popularity_rank)
-                
-                # Take top N markets per event
-                filtered_markets.extend(event_markets[:top_n_markets])
+            # Markets are pre-grouped by event and sorted by popularity;
+            # take top N markets per event
+            for event_markets in market_index["event_order"]:
+                filtered_markets.extend(all_markets[i] for i in event_markets[:top_n_markets])
         
         # Limit overall results
         filtered_markets = filtered_markets[:top_n_markets * 3]  # Allow more results across multiple events
@@ -314,12 +508,15 @@ def filter_and_summarize_markets(request_data):
         if reasoning_filters:
             reasoning_filtered = []
             
+            # Lowercase the recommended market types once
+            recommended_types = None
+            if recommended_market_types and isinstance(recommended_market_types, list):
+                recommended_types = {str(t).lower() for t in recommended_market_types}
+            
             for market in filtered_markets:
                 # Filter by recommended market types
-                if recommended_market_types and isinstance(recommended_market_types, list):
-                    market_type = market.get("market_type", "").lower()
-                    if market_type not in [t.lower() for t in recommended_market_types]:
-                        continue
+                if recommended_types is not None and str(market.get("market_type") or "").lower() not in recommended_types:
+                    continue
                 
                 # Filter by odds range
                 if odds_range and isinstance(odds_range, dict):
@@ -506,19 +703,10 @@ def filter_and_summarize_markets(request_data):
         # Return structured data (markets_parsed) - use translated markets
         markets_parsed = translated_markets
         
-        # Collect statistics about excluded markets
-        excluded_count = 0
-        excluded_types = set()
-        all_market_types = set()
-        
-        for market in all_markets:
-            market_type = market.get("market_type", "unknown")
-            market_name = market.get("market_name", "")
-            all_market_types.add(f"{market_type}: {market_name}")
-            
-            if should_exclude_market(market):
-                excluded_count += 1
-                excluded_types.add(f"{market_type}: {market_name}")
+        # Statistics about excluded markets come precomputed with the index
+        excluded_count = market_index["excluded_count"]
+        excluded_types = market_index["excluded_examples"]
+        all_market_types = market_index["all_market_types"]
         
         return {
             "status": True,
@@ -530,11 +718,12 @@ def filter_and_summarize_markets(request_data):
                 "translations_applied": bool(translations and isinstance(translations, dict)),
                 "under_options_shown": show_under,
                 "reasoning_filters_applied": bool(reasoning_filters),
+                "market_index_fingerprint": market_index["fingerprint"],
                 "debug_info": {
                     "total_markets_before_filter": len(all_markets),
                     "excluded_markets_count": excluded_count,
-                    "excluded_market_examples": list(excluded_types)[:5],  # Show first 5 excluded
-                    "all_unique_market_types": list(all_market_types)[:20],  # Show first 20 types
+                    "excluded_market_examples": excluded_types[:5],  # Show first 5 excluded
+                    "all_unique_market_types": all_market_types[:20],  # Show first 20 types
                     "excluded_patterns": excluded_market_patterns,
                     "options_filter": "showing only OVER options (default)" if not show_under else "showing both OVER and UNDER options (user requested)",
                     "reasoning_filters": {
@@ -1,14 +1,358 @@
+import difflib
+import hashlib
+import json
+
+
+TEAM_INDEX_VERSION = 2
+TEAM_INDEX_GRAM_SIZE = 3
+DEFAULT_TOP_K = 10
+
+
+def _team_name_variants(doc):
+    """Collect the normalized name variants of a team document (first seen wins)."""
+    value = doc.get("value", {})
+    if not isinstance(value, dict):
+        value = {}
+
+    raw_names = [
+        doc.get("title"),
+        value.get("title"),
+        value.get("name"),
+        value.get("sport:shortName"),
+        value.get("sport:officialName"),
+        value.get("schema:name"),
+    ]
+
+    variants = []
+    for raw in raw_names:
+        if not raw:
+            continue
+        name = str(raw).lower().strip()
+        if name and name not in variants:
+            variants.append(name)
+    return variants
+
+
+def _name_grams(name):
+    """Padded character n-grams so short names still index."""
+    padded = f" {name} "
+    size = TEAM_INDEX_GRAM_SIZE
+    return {padded[i:i + size] for i in range(max(len(padded) - size + 1, 1))}
+
+
+def _index_entries(team_documents):
+    """Yield (doc, variants) for every indexable team document, in order."""
+    for doc in team_documents:
+        if isinstance(doc, dict):
+            yield doc, _team_name_variants(doc)
+
+
+def _fingerprint(documents, variants):
+    return hashlib.sha1(
+        json.dumps([[d.get("_id"), d.get("title")] for d in documents] + variants, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _documents_key(team_documents):
+    """Cheap identity of a document list: count plus a hash of the ids and titles."""
+    documents = [doc for doc in team_documents if isinstance(doc, dict)]
+    digest = hashlib.sha1(
+        json.dumps([[d.get("_id"), d.get("title")] for d in documents], default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{len(documents)}:{digest}"
+
+
+def _build_team_index(team_documents):
+    """
+    Build a JSON-serializable team-name index from team documents.
+
+    The index keeps a slim copy of each document (the fields returned to the
+    caller), every normalized name variant and an n-gram inverted index over
+    the variants, so it can be cached by the workflow and reused across turns.
+    Variants are stored as [name, doc_idx, gram_count]; `names` maps each
+    variant name to its ids and `lengths` lists [length, variant ids] buckets.
+    """
+    documents = []
+    variants = []
+    grams = {}
+    names_index = {}
+    lengths = {}
+
+    for doc, names in _index_entries(team_documents):
+        doc_idx = len(documents)
+        documents.append({
+            "_id": doc.get("_id"),
+            "name": doc.get("name"),
+            "title": doc.get("title"),
+            "value": doc.get("value", {}),
+            "metadata": doc.get("metadata", {}),
+        })
+
+        for name in names:
+            variant_idx = len(variants)
+            name_grams = _name_grams(name)
+            variants.append([name, doc_idx, len(name_grams)])
+            for gram in name_grams:
+                grams.setdefault(gram, []).append(variant_idx)
+            names_index.setdefault(name, []).append(variant_idx)
+            lengths.setdefault(len(name), []).append(variant_idx)
+
+    return {
+        "version": TEAM_INDEX_VERSION,
+        "fingerprint": _fingerprint(documents, variants),
+        "documents_key": _documents_key(team_documents),
+        "documents": documents,
+        "variants": variants,
+        "grams": grams,
+        "names": names_index,
+        "lengths": sorted(lengths.items()),
+    }
+
+
+def _load_team_index(params):
+    """
+    Return (index, built) from a cached `team_index` param or `team_documents`.
+
+    A cached index is only used when it is current: if `team_documents` are
+    passed as well, their count and id hash must match the index's.
+    """
+    team_documents = params.get("team_documents", []) or []
+    team_index = params.get("team_index")
+    if isinstance(team_index, str) and team_index:
+        team_index = json.loads(team_index)
+    if isinstance(team_index, dict) and team_index.get("version") == TEAM_INDEX_VERSION:
+        if not team_documents or team_index.get("documents_key") == _documents_key(team_documents):
+            return team_index, False
+    return _build_team_index(team_documents), True
+
+
+def _gram_overlap(team_index, query):
+    """variant id -> number of n-grams shared with the query."""
+    index_grams = team_index["grams"]
+    overlap = {}
+    for gram in _name_grams(query):
+        for variant_idx in index_grams.get(gram, ()):
+            overlap[variant_idx] = overlap.get(variant_idx, 0) + 1
+    return overlap
+
+
+def _shortlist(team_index, query, overlap, top_k):
+    """Variant ids sharing the most n-grams with the query, best first."""
+    query_size = len(_name_grams(query))
+    variants = team_index["variants"]
+    ranked = []
+    for variant_idx, shared in overlap.items():
+        variant_size = variants[variant_idx][2]
+        # Containment first so substring matches (boosted to 0.85) are kept
+        containment = shared / min(query_size, variant_size)
+        dice = 2.0 * shared / (query_size + variant_size)
+        ranked.append((-containment, -dice, variant_idx))
+    ranked.sort()
+    return [variant_idx for _, _, variant_idx in ranked[:top_k]]
+
+
+def _substring_variants(team_index, query, overlap):
+    """Variant ids that contain the query or are contained in it."""
+    found = set()
+    # Variants inside the query: look every substring of the query up by name
+    names_index = team_index["names"]
+    for start in range(len(query)):
+        for end in range(start + 1, len(query) + 1):
+            found.update(names_index.get(query[start:end], ()))
+
+    # Variants containing the query hold every n-gram inside it, so they share
+    # at least that many; queries shorter than an n-gram have none to filter on
+    variants = team_index["variants"]
+    inner = len(query) - TEAM_INDEX_GRAM_SIZE + 1
+    if inner > 0:
+        candidates = (variant_idx for variant_idx, shared in overlap.items() if shared >= inner)
+    else:
+        candidates = range(len(variants))
+    found.update(variant_idx for variant_idx in candidates if query in variants[variant_idx][0])
+    return found
+
+
+def _consider(team_index, query_name_lower, variant_idx, best_match):
+    """Score one variant and return the better of it and `best_match`."""
+    name_variant, doc_idx, _ = team_index["variants"][variant_idx]
+
+    # Calculate similarity ratio
+    ratio = difflib.SequenceMatcher(None, query_name_lower, name_variant).ratio()
+
+    # Boost exact matches
+    if query_name_lower == name_variant:
+        ratio = 1.0
+    # Boost partial matches (substring)
+    elif query_name_lower in name_variant or name_variant in query_name_lower:
+        ratio = max(ratio, 0.85)
+
+    # Keep the better match; ties keep the earlier variant, which also means
+    # the earlier document since variants are stored in document order
+    if best_match is None or ratio > best_match["match_ratio"] or (
+            ratio == best_match["match_ratio"] and variant_idx < best_match["variant_idx"]):
+        return {
+            "doc": team_index["documents"][doc_idx],
+            "doc_idx": doc_idx,
+            "variant_idx": variant_idx,
+            "match_ratio": ratio,
+            "matched_name": name_variant
+        }
+    return best_match
+
+
+def _match_one(team_index, query_team_name, threshold, top_k):
+    """
+    Best match scoring at least `threshold` for one name, as {"doc",
+    "match_ratio", "matched_name"}, or None.
+
+    Only variants that can reach the threshold are visited: the n-gram
+    shortlist, substring variants (boosted to 0.85) and the length buckets
+    whose bound on the ratio (2 * shorter / total) reaches the threshold,
+    where a character count bound skips most of the rest unscored.
+    """
+    query_name_lower = str(query_team_name).lower().strip()
+    if not query_name_lower:
+        return None
+
+    overlap = _gram_overlap(team_index, query_name_lower)
+    candidates = _shortlist(team_index, query_name_lower, overlap, top_k)
+    if threshold <= 0.85:
+        candidates += sorted(_substring_variants(team_index, query_name_lower, overlap))
+
+    best_match = None
+    scored = set()
+    for variant_idx in candidates:
+        if variant_idx not in scored:
+            scored.add(variant_idx)
+            best_match = _consider(team_index, query_name_lower, variant_idx, best_match)
+
+    variants = team_index["variants"]
+    query_len = len(query_name_lower)
+    query_chars = {}
+    for char in query_name_lower:
+        query_chars[char] = query_chars.get(char, 0) + 1
+
+    for length, bucket in team_index["lengths"]:
+        total = query_len + length
+        if 2.0 * min(query_len, length) / total < threshold:
+            continue
+        for variant_idx in bucket:
+            if variant_idx in scored:
+                continue
+            name_variant = variants[variant_idx][0]
+            # Upper bound on the ratio from shared characters (quick_ratio)
+            available = dict(query_chars)
+            shared = 0
+            for char in name_variant:
+                count = available.get(char, 0)
+                if count:
+                    available[char] = count - 1
+                    shared += 1
+            bound = 2.0 * shared / total
+            if bound < threshold:
+                continue
+            if best_match is not None and (bound < best_match["match_ratio"] or (
+                    bound == best_match["match_ratio"] and variant_idx > best_match["variant_idx"])):
+                continue
+            best_match = _consider(team_index, query_name_lower, variant_idx, best_match)
+
+    if best_match is None or best_match["match_ratio"] <= 0.0 or best_match["match_ratio"] < threshold:
+        return None
+    return best_match
+
+
+def _match_names(team_index, team_names, threshold, top_k):
+    """Resolve many names against one index; repeated names are matched once."""
+    resolved = {}
+    results = []
+    for query_team_name in team_names:
+        key = str(query_team_name).lower().strip()
+        if key not in resolved:
+            resolved[key] = _match_one(team_index, key, threshold, top_k)
+        results.append((query_team_name, resolved[key]))
+    return results
+
+
+def _matched_team(best_match):
+    best_doc = best_match["doc"]
+    return {
+        "_id": best_doc.get("_id"),
+        "name": best_doc.get("name"),
+        "title": best_doc.get("title"),
+        "value": best_doc.get("value", {}),
+        "metadata": best_doc.get("metadata", {}),
+        "match_ratio": best_match["match_ratio"],
+        "matched_name": best_match["matched_name"]
+    }
+
+
+def _team_id(best_match):
+    doc_value = best_match["doc"].get("value", {})
+    if isinstance(doc_value, dict):
+        return doc_value.get("@id", "")
+    return ""
+
+
+def build_team_index(request_data):
+    """
+    Build a reusable team-name index from team documents.
+
+    Args:
+        request_data (dict): Request data containing:
+            - params (dict):
+                - team_documents (list): List of team documents to index
+
+    Returns:
+        dict: Response containing:
+            - status (bool): Success status
+            - data (dict):
+                - team_index (dict): Serializable index, pass it back as
+                  `team_index` to the match commands to skip rebuilding
+                - fingerprint (str): Hash of the indexed names and ids
+                - team_count (int): Number of indexed documents
+                - variant_count (int): Number of indexed name variants
+    """
+    try:
+        params = request_data.get("params", {})
+        team_index = _build_team_index(params.get("team_documents", []) or [])
+        return {
+            "status": True,
+            "data": {
+                "team_index": team_index,
+                "fingerprint": team_index["fingerprint"],
+                "team_count": len(team_index["documents"]),
+                "variant_count": len(team_index["variants"])
+            }
+        }
+
+    except Exception as e:
+        import traceback
+        return {
+            "status": False,
+            "error": str(e),
+            "message": f"Error building team index: {str(e)}",
+            "traceback": traceback.format_exc()
+        }
+
+
 def match_teams_by_name(request_data):
     """
     Match team names from user query to team documents using fuzzy matching.
-    
+
     Args:
         request_data (dict): Request data containing:
             - params (dict):
                 - team_names (list): List of team names to match
                 - team_documents (list): List of team documents to search
+                - team_index (dict, optional): Index from `build_team_index`,
+                  used instead of team_documents when present
                 - threshold (float): Minimum similarity ratio (default: 0.6)
-    
+                - top_k (int): Candidates fuzzy scored first per name; other
+                  variants are only scored if they can still reach the
+                  threshold and win (default: 10)
+                - return_index (bool): Include the built index in the response
+                  so it can be cached for the next turn (default: False)
+
     Returns:
         dict: Response containing:
             - status (bool): Success status
@@ -17,15 +361,13 @@ def match_teams_by_name(request_data):
                 - team_ids (list): List of matched team IDs
                 - match_count (int): Number of matches found
     """
-    import difflib
-    
     try:
         params = request_data.get("params", {})
         team_names = params.get("team_names", [])
-        team_documents = params.get("team_documents", [])
         threshold = float(params.get("threshold", 0.6))
-        
-        if not team_names or not team_documents:
+        top_k = int(params.get("top_k", DEFAULT_TOP_K))
+
+        if not team_names or not (params.get("team_documents") or params.get("team_index")):
             return {
                 "status": True,
                 "data": {
@@ -33,101 +375,93 @@ def match_teams_by_name(request_data):
                     "team_ids": []
                 }
             }
-        
+
+        team_index, built = _load_team_index(params)
+
         matched_teams = []
         team_ids = []
-        
-        # Match each team name from query
-        for query_team_name in team_names:
-            query_name_lower = str(query_team_name).lower().strip()
-            best_match = None
-            best_ratio = 0.0
-            
-            # Find best match across all documents
-            for doc in team_documents:
-                if not isinstance(doc, dict):
-                    continue
-                
-                value = doc.get("value", {})
-                if not isinstance(value, dict):
-                    value = {}
-                
-                # Collect all possible name variations
-                names = []
-                
-                # Document title
-                if doc.get("title"):
-                    names.append(str(doc.get("title")).lower().strip())
-                
-                # Value fields
-                if value.get("title"):
-                    names.append(str(value.get("title")).lower().strip())
-                if value.get("name"):
-                    names.append(str(value.get("name")).lower().strip())
-                if value.get("sport:shortName"):
-                    names.append(str(value.get("sport:shortName")).lower().strip())
-                if value.get("sport:officialName"):
-                    names.append(str(value.get("sport:officialName")).lower().strip())
-                if value.get("schema:name"):
-                    names.append(str(value.get("schema:name")).lower().strip())
-                
-                # Remove duplicates and empty strings
-                names = [n for n in list(set(names)) if n]
-                
-                # Try matching against all name variations
-                for name_variant in names:
-                    if not name_variant:
-                        continue
-                    
-                    # Calculate similarity ratio
-                    ratio = difflib.SequenceMatcher(None, query_name_lower, name_variant).ratio()
-                    
-                    # Boost exact matches
-                    if query_name_lower == name_variant:
-                        ratio = 1.0
-                    # Boost partial matches (substring)
-                    elif query_name_lower in name_variant or name_variant in query_name_lower:
-                        ratio = max(ratio, 0.85)
-                    
-                    # Update best match if this is better
-                    if ratio > best_ratio:
-                        best_ratio = ratio
-                        best_match = {
-                            "doc": doc,
-                            "match_ratio": ratio,
-                            "matched_name": name_variant
-                        }
-            
-            # Add match if above threshold
-            if best_match and best_match["match_ratio"] >= threshold:
-                best_doc = best_match["doc"]
-                
-                matched_teams.append({
-                    "_id": best_doc.get("_id"),
-                    "name": best_doc.get("name"),
-                    "title": best_doc.get("title"),
-                    "value": best_doc.get("value", {}),
-                    "metadata": best_doc.get("metadata", {}),
-                    "match_ratio": best_match["match_ratio"],
-                    "matched_name": best_match["matched_name"]
-                })
-                
-                # Extract team ID
-                doc_value = best_doc.get("value", {})
-                if isinstance(doc_value, dict):
-                    team_id = doc_value.get("@id", "")
-                    if team_id:
-                        team_ids.append(team_id)
-        
+        for _, best_match in _match_names(team_index, team_names, threshold, top_k):
+            if not best_match:
+                continue
+            matched_teams.append(_matched_team(best_match))
+            team_id = _team_id(best_match)
+            if team_id:
+                team_ids.append(team_id)
+
+        data = {
+            "matched_teams": matched_teams,
+            "team_ids": list(set(team_ids)),
+            "match_count": len(matched_teams)
+        }
+        if built and params.get("return_index"):
+            data["team_index"] = team_index
+
+        return {
+            "status": True,
+            "data": data
+        }
+
+    except Exception as e:
+        import traceback
+        return {
+            "status": False,
+            "error": str(e),
+            "message": f"Error matching teams: {str(e)}",
+            "traceback": traceback.format_exc()
+        }
+
+
+def match_teams_batch(request_data):
+    """
+    Resolve many team names at once, keeping one result per input name.
+
+    Args:
+        request_data (dict): Request data containing:
+            - params (dict):
+                - team_names (list): List of team names to match
+                - team_index (dict) or team_documents (list): What to match against
+                - threshold (float): Minimum similarity ratio (default: 0.6)
+                - top_k (int): Candidates fuzzy scored first per name; other
+                  variants are only scored if they can still reach the
+                  threshold and win (default: 10)
+
+    Returns:
+        dict: Response containing:
+            - status (bool): Success status
+            - data (dict):
+                - results (list): {"query", "matched", "team"} per input name,
+                  `team` is None when nothing passed the threshold
+                - team_ids (list): List of matched team IDs
+                - match_count (int): Number of names matched
+    """
+    try:
+        params = request_data.get("params", {})
+        team_names = params.get("team_names", []) or []
+        threshold = float(params.get("threshold", 0.6))
+        top_k = int(params.get("top_k", DEFAULT_TOP_K))
+
+        team_index, _ = _load_team_index(params)
+
+        results = []
+        team_ids = []
+        for query_team_name, best_match in _match_names(team_index, team_names, threshold, top_k):
+            if not best_match:
+                results.append({"query": query_team_name, "matched": False, "team": None})
+                continue
+            results.append({"query": query_team_name, "matched": True, "team": _matched_team(best_match)})
+            team_id = _team_id(best_match)
+            if team_id:
+                team_ids.append(team_id)
+
         return {
             "status": True,
             "data": {
-                "matched_teams": matched_teams,
+                "results": results,
                 "team_ids": list(set(team_ids)),
-                "match_count": len(matched_teams)
+                "match_count": sum(1 for r in results if r["matched"])
             }
         }
-    
+
     except Exception as e:
         import traceback
         return {
@@ -136,4 +470,3 @@ def match_teams_by_name(request_data):
             "message": f"Error matching teams: {str(e)}",
             "traceback": traceback.format_exc()
         }
-
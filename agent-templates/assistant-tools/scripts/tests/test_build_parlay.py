@@ -0,0 +1,88 @@
+"""Tests for build_parlay: the branch and bound search against exhaustive enumeration."""
+import importlib.util
+import itertools
+import math
+import os
+import random
+from collections import Counter
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "build_parlay",
+    os.path.join(_parent_dir, "build_parlay.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+invoke_build_parlay = _module.invoke_build_parlay
+
+
+def _allowed(combo):
+    """Diversification rules: one runner per event across events, max 2 per market type."""
+    events = [r.get("event-id") for r in combo if r.get("event-id")]
+    if len(set(events)) > 1 and len(set(events)) != len(events):
+        return False
+    return max(Counter(r.get("marketType") for r in combo).values()) <= 2
+
+
+def _exhaustive(runners, target, max_legs, tolerance, top_k):
+    """(distance, legs) of the best top_k combinations over every subset."""
+    ordered = sorted(runners, key=lambda r: r["price"])
+    found = []
+    for legs in range(2, max_legs + 1):
+        for combo in itertools.combinations(ordered, legs):
+            if not _allowed(combo):
+                continue
+            total = math.exp(sum(math.log(r["price"]) for r in combo))
+            if target * (1 - tolerance) <= total <= target * (1 + tolerance):
+                found.append((abs(round(total, 2) - target), legs))
+    found.sort()
+    return found[:top_k]
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_matches_exhaustive_search(seed):
+    rnd = random.Random(seed)
+    runners = [
+        {
+            "price": round(rnd.uniform(1.05, 4), 2),
+            "event-id": rnd.choice(["a", "b", "c", "d", None]),
+            "marketType": rnd.choice(["x", "y", "z", None]),
+            "name": str(i),
+        }
+        for i in range(rnd.randint(2, 11))
+    ]
+    target = round(rnd.uniform(1.5, 40), 2)
+    tolerance = rnd.choice([0.05, 0.2, 0.5])
+    max_legs = rnd.randint(2, 5)
+    top_k = rnd.randint(1, 6)
+
+    result = invoke_build_parlay({"params": {
+        "available-runners": runners, "target-odd": target, "max-legs": max_legs,
+        "tolerance": tolerance, "top-k": top_k,
+    }})
+
+    got = [(round(abs(c["total_odd"] - target), 6), c["leg_count"]) for c in result["data"]["parlay-combinations"]]
+    expected = [(round(d, 6), legs) for d, legs in _exhaustive(runners, target, max_legs, tolerance, top_k)]
+    assert got == expected
+    assert result["data"]["search-complete"] is True
+
+
+def test_node_budget_returns_partial_result():
+    rnd = random.Random(7)
+    runners = [
+        {"price": round(rnd.uniform(1.1, 6), 2), "event-id": f"e{rnd.randint(0, 60)}", "marketType": rnd.choice(["1x2", "ou", "btts"])}
+        for _ in range(200)
+    ]
+    result = invoke_build_parlay({"params": {"available-runners": runners, "target-odd": 30, "node-budget": 50}})
+    assert result["status"] is True
+    assert result["data"]["search-complete"] is False
+    assert result["data"]["nodes-explored"] <= 50 + 1
+
+
+def test_rejects_runners_without_valid_prices():
+    result = invoke_build_parlay({"params": {"available-runners": [{"price": 1.0}, {"name": "x"}]}})
+    assert result["status"] is False
+    assert result["data"]["parlay-combinations"] == []
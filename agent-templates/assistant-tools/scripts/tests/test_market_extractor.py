@@ -0,0 +1,116 @@
+"""Tests for market-extractor: the market index against the original linear scan.
+
+Expected results were recorded from the implementation that scanned and
+fuzzy-matched every market on each call, before markets were indexed.
+"""
+import copy
+import importlib.util
+import json
+import os
+import random
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "market_extractor",
+    os.path.join(_parent_dir, "market-extractor.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+build_market_index = _module.build_market_index
+filter_and_summarize_markets = _module.filter_and_summarize_markets
+
+_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+NAMES = ["Match Result", "Total Goals", "Both Teams to Score", "Double Chance", "Correct Score", "Result after 60:00 min",
+         "Handicap 1", "Draw No Bet", "Over/Under 2.5", "First Goalscorer", "Half Time Result", "Corners Total"]
+TYPES = ["3way", "total", "both_teams_to_score", "double_chance", "correct_score", "3way",
+         "handicap", "draw_no_bet", "over/under", "goalscorer", "3way", "total"]
+QUERIES = ["", "total goals", "resultado", "btts", "over", "double chance", "correct", "xyz", "Match result 2", "under 2.5"]
+FILTERS = [
+    {},
+    {"recommended_market_types": ["3way", "Total"]},
+    {"odds_range": {"min_odds": 1.5, "max_odds": 3}},
+    {"runner_filter": "home"},
+    {"runner_filter": "draw"},
+    {"market_query": "goals", "runner_filter": "draw"},
+]
+TRANSLATIONS = {"market_types": {"3way": "Resultado"}, "market_names": {"total": "Total"}, "option_names": {"draw": "Empate"}}
+
+
+def _request_params(seed):
+    rnd = random.Random(seed)
+    markets = []
+    for e in range(rnd.randint(0, 4)):
+        for j in rnd.sample(range(len(NAMES)), 6):
+            suffix = f" {rnd.randint(1, 3)}" if rnd.random() < 0.3 else ""
+            markets.append({
+                "event_id": rnd.choice([e, str(e)]),
+                "event_title": f"Team{e}A vs Team{e}B",
+                "market_id": f"{e}-{j}",
+                "market_name": NAMES[j] + suffix,
+                "market_type": TYPES[j],
+                "options": [
+                    {"id": k, "name": rnd.choice(["1", "X", "2", "Over 2.5", "Under 2.5", f"team{e}a", "Draw", "Home"]),
+                     "odds": round(rnd.uniform(1.1, 9), 2)}
+                    for k in range(3)
+                ],
+            })
+    return {
+        "all_markets": markets,
+        "market_query": rnd.choice(QUERIES),
+        "top_n_markets": rnd.randint(1, 5),
+        "reasoning_filters": rnd.choice(FILTERS),
+        "translations": rnd.choice([{}, TRANSLATIONS]),
+    }
+
+
+def _summary(data):
+    return {
+        "filter_method": data["filter_method"],
+        "total_filtered": data["total_filtered"],
+        "under_options_shown": data["under_options_shown"],
+        "excluded_markets_count": data["debug_info"]["excluded_markets_count"],
+        "markets_docs": data["markets_docs"],
+        "markets": [[m.get("market_id"), m.get("relevance_score")] for m in data["markets_parsed"]],
+    }
+
+
+with open(os.path.join(_FIXTURES, "market_extractor_expected.json")) as _f:
+    _EXPECTED = json.load(_f)
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_matches_linear_scan(seed):
+    result = filter_and_summarize_markets({"params": _request_params(int(seed))})
+    assert result["status"] is True
+    assert _summary(result["data"]) == _EXPECTED[seed]
+
+
+@pytest.mark.parametrize("seed", range(0, 40, 4))
+def test_passed_index_matches_all_markets(seed):
+    params = _request_params(seed)
+    index = build_market_index({"params": {"all_markets": params["all_markets"]}})["data"]["market_index"]
+    # The index travels through workflow state as JSON
+    index = json.loads(json.dumps(index))
+    with_index = dict(params, market_index=index)
+    del with_index["all_markets"]
+
+    expected = filter_and_summarize_markets({"params": copy.deepcopy(params)})
+    result = filter_and_summarize_markets({"params": with_index})
+    assert _summary(result["data"]) == _summary(expected["data"])
+    assert result["data"]["market_index_fingerprint"] == index["fingerprint"]
+
+
+def test_stale_index_is_rebuilt_from_all_markets():
+    stale = _request_params(1)
+    current = _request_params(3)
+    assert stale["all_markets"] and current["all_markets"]
+    index = build_market_index({"params": {"all_markets": stale["all_markets"]}})["data"]["market_index"]
+
+    expected = filter_and_summarize_markets({"params": copy.deepcopy(current)})
+    result = filter_and_summarize_markets({"params": dict(current, market_index=index)})
+    assert _summary(result["data"]) == _summary(expected["data"])
+    assert result["data"]["market_index_fingerprint"] != index["fingerprint"]
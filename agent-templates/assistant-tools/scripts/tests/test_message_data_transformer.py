@@ -0,0 +1,117 @@
+"""Tests for message-data-transformer: compiled normalizers and cached summaries.
+
+Expected payloads were recorded from the implementation that normalized and
+formatted every event on each call, before the normalizer was compiled and
+event summaries were cached.
+"""
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import os
+import random
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "message_data_transformer",
+    os.path.join(_parent_dir, "message-data-transformer.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+summarize_message_data = _module.summarize_message_data
+
+_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+TEAMS = ["SC Internacional RS", "Sao Paulo FC", "CR Flamengo", "Gremio FB Porto Alegrense", "EC Vitoria Salvador",
+         "Ceara SC", "Atletico MG", "fc porto", "Real Madrid", "  Santos  FC ", "Mirassol FC SP"]
+DATES = ["2025-12-07T19:00:00Z", "2025-12-07ZT19:00:00Z", "2025-12-07T19:00:00", "2025-12-07T19:00:00-03:00",
+         "bad", "2025-12-07Tbad", "", None, 20251207]
+MARKET_NAMES = ["Match Result", "Total Goals Over/Under 2.5", "both teams to score", "Odd Market", "", None]
+RUNNERS = ["Over 2.5", "under 1.5", "X", "draw", "SE Palmeiras", "Sao Paulo FC", "Nautico", "", None]
+
+
+def _event(rnd, key):
+    home, away = rnd.sample(TEAMS, 2)
+    value = {
+        "sport:competitors": [{"name": home, "sport:qualifier": "home"}, {"name": away, "sport:qualifier": "away"}],
+        "sport:competition": {"name": "Brasileirão"},
+        "schema:startDate": rnd.choice(DATES),
+        "sport:status": rnd.choice(["Fixture", "Closed"]),
+        "sport:score": {"sport:homeScore": 1, "sport:awayScore": 2,
+                        "sport:penalties": {"sport:homeScore": 4, "sport:awayScore": 3}},
+        "schema:statistics": [
+            {"sport:statistics": [{"sport:statLabel": "Corner Kicks", "sport:statValue": 3},
+                                  {"sport:statLabel": "Weird", "sport:statValue": 0}]},
+            {"sport:statistics": [{"sport:statLabel": "Possession", "sport:statValue": 55}]},
+        ],
+        "schema:timeline": [
+            {"type": "score_change", "competitor": "home", "sport:minutesElapsed": 10,
+             "sport:participation": [{"sport:participationBy": {"sport:label": "Joe"}},
+                                     {"sport:participationBy": {"sport:label": "Ann"}}]},
+            {"type": "yellow_card", "competitor": "away", "sport:minutesElapsed": 33,
+             "sport:participation": [{"sport:participationBy": {"sport:label": "Bo"}}]},
+            {"type": "penalty_shootout", "competitor": "away", "sport:penaltyStatus": "scored"},
+        ],
+    }
+    if rnd.random() < 0.7:
+        value["@id"] = key
+        value["updated_at"] = "2025-01-01"
+    return value
+
+
+def _request_params(seed):
+    rnd = random.Random(seed)
+    events = [_event(rnd, f"ev{seed}-{i}") for i in range(4)] + ["already a summary", 5]
+    return {
+        "last_user_msg": {"matched-teams": [{"value": {"name": "Gremio"}, "match_ratio": 0.91}, {"title": "x"}],
+                          "content": "q", "reasoning": {"short_message": "s"}},
+        "fixture_events": events,
+        "played_events": events[:2],
+        "timezone": rnd.choice(["br", "es", "EN", "zz"]),
+        "markets_parsed": [
+            {"market_name": rnd.choice(MARKET_NAMES),
+             "event_title": rnd.choice(["Sao Paulo FC - CR Flamengo", "A vs B", None]),
+             "options": [{"name": rnd.choice(RUNNERS), "odds": 1.5, "id": 1}]}
+            for _ in range(3)
+        ],
+        "season_standings": [{"rank": 1, "competitor": {"name": rnd.choice(TEAMS), "abbreviation": "X", "form": "WWL"},
+                              "points": 3, "goals_diff": 2, "points_per_game": 1.5}],
+        "leaders_data": [{"leaders": [{"rank": 1, "players": [{"name": "P", "competitors": [
+            {"name": rnd.choice(TEAMS), "datapoints": [{"type": "goals", "value": 3}]}]}]}]}],
+    }
+
+
+def _summarize(params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return summarize_message_data({"params": copy.deepcopy(params)})
+
+
+with open(os.path.join(_FIXTURES, "message_data_transformer_expected.json"), encoding="utf-8") as _f:
+    _EXPECTED = json.load(_f)
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_matches_uncached_formatting(seed):
+    params = _request_params(int(seed))
+    _module._event_summary_cache.clear()
+    assert _summarize(params) == _EXPECTED[seed]
+    # Second call is answered from the summary cache
+    assert _summarize(params) == _EXPECTED[seed]
+
+
+def test_changed_updated_at_reformats_event():
+    params = _request_params(0)
+    event = next(e for e in params["fixture_events"] if isinstance(e, dict) and e.get("@id"))
+    first = _summarize(params)["data"]["fixture_events_summary"]
+
+    event["sport:competition"] = {"name": "Copa do Brasil"}
+    assert _summarize(params)["data"]["fixture_events_summary"] == first
+
+    event["updated_at"] = "2025-01-02"
+    changed = _summarize(params)["data"]["fixture_events_summary"]
+    assert changed != first
+    assert any("Copa do Brasil" in summary for summary in changed)
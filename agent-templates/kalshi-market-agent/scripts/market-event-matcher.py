@@ -1,16 +1,40 @@
 def match_markets_to_events(request_data):
     """
-    Simplified matcher with verbose logging and accent normalization.
+    Blocked, indexed matcher with level-gated logging and accent normalization.
+
+    Events are normalized, date-parsed and indexed once per call: by day bucket
+    (for the ±24h date window) and by team-name trigrams. Likely candidates
+    (same window, overlapping teams) are scored first; every other event is
+    only fuzzy scored while its best possible confidence can still beat the
+    current best match, so the result is the same as a full scan.
+
+    Dates without a UTC offset are read as UTC. The full scan compared them
+    as given and failed on a naive/aware pair; feeds that send local naive
+    times will be off by their offset in the ±24h window.
+
+    Optional params:
+        log_level: "debug" | "info" (default) | "warning"
     """
     import difflib
     import unicodedata
-    from datetime import datetime
+    from datetime import datetime, timezone
+
+    params = request_data.get("params", {})
+    markets = params.get("markets", [])
+    events = params.get("events", [])
+
+    log_levels = {"debug": 10, "info": 20, "warning": 30}
+    log_threshold = log_levels.get(str(params.get("log_level") or "info").lower(), 20)
+
+    def log(level, message):
+        if log_levels[level] >= log_threshold:
+            print(f"LOG: {message}")
 
     def normalize(text):
         if not text: return ""
         # Remove accents and lowercase
         return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8').lower().strip()
-    
+
     def looks_like_match_title(text):
         t = normalize(text)
         # Simple heuristics to catch matchup strings even when participants are missing
@@ -40,93 +64,156 @@ def match_markets_to_events(request_data):
 
     def is_outright_market(market):
         """Check if this is an outright/season market rather than a match market"""
-        m_val = market.get("value", {})
-        # Prefer originalTitle/subtitle for matchup text; fallback to title
+        m_val = market.get("value", {}) or {}
         m_title = m_val.get("title", "") or market.get("title", "")
-        m_title_primary = m_val.get("originalTitle", "") or m_val.get("subtitle", "") or m_title
-        m_title_clean = strip_code_prefix(m_title_primary or m_title)
         m_title_norm = normalize(m_title)
         m_alt_title = m_val.get("originalTitle", "") or m_val.get("subtitle", "")
-        m_alt_title_norm = normalize(m_alt_title)
-        
+
         # Check for outright keywords
         outright_keywords = ['outright', 'winner', 'champion', 'top scorer', 'relegation', 'vencedor']
         if any(keyword in m_title_norm for keyword in outright_keywords):
             return True
-        
+
         # If participants are missing, but the title looks like a matchup, treat as match market
         participants = m_val.get('participants', [])
         if len(participants) < 2:
             if looks_like_match_title(m_title) or looks_like_match_title(m_alt_title):
                 return False
             return True
-            
+
         return False
 
-    print("LOG: Starting match_markets_to_events (v3 - normalized + outright filter)")
-    
-    params = request_data.get("params", {})
-    markets = params.get("markets", [])
-    events = params.get("events", [])
-    
-    print(f"LOG: Total markets received: {len(markets)}")
-    print(f"LOG: Total events received: {len(events)}")
-    
-    # Filter out outright markets
-    match_markets = [m for m in markets if not is_outright_market(m)]
-    outright_count = len(markets) - len(match_markets)
-    
-    if outright_count > 0:
-        print(f"LOG: Filtered out {outright_count} outright/season markets")
-    
-    print(f"LOG: Processing {len(match_markets)} match markets against {len(events)} events")
-    
-    # Check if any event carries a date (some Kalshi events have none)
     def parse_date_safe(date_str):
         if not date_str:
             return None
         try:
             clean = date_str.replace('ZT', 'T').replace('Z', '+00:00')
-            return datetime.fromisoformat(clean)
+            parsed = datetime.fromisoformat(clean)
         except Exception:
             return None
+        # Naive timestamps are treated as UTC so they compare with aware ones
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    def day_bucket(date):
+        return int(date.timestamp() // 86400)
 
-    event_dates_available = False
-    for ev in events:
-        ev_val = ev.get("value", {}) or {}
-        ev_date = parse_date_safe(ev_val.get("schema:startDate", "") or ev_val.get("startDate", ""))
-        if ev_date:
-            event_dates_available = True
-            break
-
-    # Debug: print all events received
-    for idx, event in enumerate(events[:5]):  # Show first 5
-        e_val = event.get("value", {})
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    log("info", "Starting match_markets_to_events (v4 - blocked + indexed)")
+    log("info", f"Total markets received: {len(markets)}")
+    log("info", f"Total events received: {len(events)}")
+
+    # Filter out outright markets
+    match_markets = [m for m in markets if not is_outright_market(m)]
+    outright_count = len(markets) - len(match_markets)
+
+    if outright_count > 0:
+        log("info", f"Filtered out {outright_count} outright/season markets")
+
+    log("info", f"Processing {len(match_markets)} match markets against {len(events)} events")
+
+    # Pre-normalize, pre-parse and index every event once
+    prepared_events = []
+    events_by_day = {}
+    short_team_events = set()
+    team_events = set()
+    team_gram_index = {}
+    team_head_index = {}
+
+    for e_idx, event in enumerate(events):
+        e_val = event.get("value", {}) or {}
         e_title = e_val.get("title", "") or event.get("title", "")
-        e_date = e_val.get("schema:startDate", "") or e_val.get("startDate", "")
-        print(f"LOG: Event {idx}: '{e_title}' | Date: {e_date or 'N/A'}")
+        e_search = normalize(e_title)
+        e_date = parse_date_safe(e_val.get("schema:startDate", "") or e_val.get("startDate", ""))
+
+        e_teams_raw = e_val.get('sport:competitors', []) or e_val.get('sport:competitor', []) or e_val.get('competitors', [])
+        e_teams = []
+        if isinstance(e_teams_raw, list):
+            for t in e_teams_raw:
+                if isinstance(t, dict):
+                    e_teams.append(normalize(t.get('name', '')))
+                elif isinstance(t, str):
+                    e_teams.append(normalize(t))
+
+        # SequenceMatcher caches its analysis of seq2, so keep one per event
+        # and only swap the market side in per comparison.
+        matcher = difflib.SequenceMatcher(None, "", e_search)
+        prepared_events.append((event, e_title, e_date, e_teams, matcher))
+
+        if e_date is not None:
+            events_by_day.setdefault(day_bucket(e_date), []).append(e_idx)
+
+        if e_teams:
+            team_events.add(e_idx)
+        for e_name in e_teams:
+            if len(e_name) < 3:
+                short_team_events.add(e_idx)
+                continue
+            # Every trigram finds events containing a market team; the
+            # leading trigram finds events contained in a market team.
+            for gram in trigrams(e_name):
+                team_gram_index.setdefault(gram, set()).add(e_idx)
+            team_head_index.setdefault(e_name[:3], set()).add(e_idx)
+
+    # Some Kalshi events have no date at all; then the date score is ignored
+    event_dates_available = bool(events_by_day)
+
+    # Debug: print the first events received
+    for idx, (_, e_title, e_date, _, _) in enumerate(prepared_events[:5]):
+        log("debug", f"Event {idx}: '{e_title}' | Date: {e_date or 'N/A'}")
 
     if not event_dates_available:
-        print("LOG: No event dates detected — date score will be ignored.")
+        log("info", "No event dates detected — date score will be ignored.")
 
+    def team_candidates(m_teams):
+        """Superset of events whose teams can overlap (substring) a market team."""
+        candidates = set(short_team_events)
+        for mt in m_teams:
+            if len(mt) < 3:
+                # A short name can be a substring of any event team.
+                return set(team_events)
+            candidates |= team_gram_index.get(mt[:3], set())
+            for gram in trigrams(mt):
+                candidates |= team_head_index.get(gram, set())
+        return candidates
+
+    def score(team_score, name_score, date_score):
+        # Total Confidence
+        if event_dates_available:
+            if team_score > 0:
+                return (team_score * 0.5) + (name_score * 0.3) + (date_score * 0.2)
+            return (name_score * 0.7) + (date_score * 0.3)
+        if team_score > 0:
+            return (team_score * 0.6) + (name_score * 0.4)
+        return name_score
+
+    def can_win(bound, e_idx):
+        # Ties keep the earliest event, as a full in-order scan would
+        return bound > best_conf or (bound == best_conf and e_idx < best_idx)
+
+    all_events = set(range(len(events)))
     matches = []
+    fuzzy_comparisons = 0
+    best_idx = -1
+    best_conf = 0.0
 
     for m_idx, market in enumerate(match_markets):
-        m_val = market.get("value", {})
+        m_val = market.get("value", {}) or {}
         m_title = m_val.get("title", "") or market.get("title", "")
         m_title_primary = m_val.get("originalTitle", "") or m_val.get("subtitle", "") or m_title
         m_title_clean = strip_code_prefix(m_title_primary or m_title)
         m_comp = m_val.get("competition", "")
         m_search = normalize(f"{m_title_clean} {m_comp}")
-        
+
         # Date parsing (Market)
         m_date_str = m_val.get("startDate") or m_val.get("startDateUtc", "")
         m_date = parse_date_safe(m_date_str)
         if m_date_str and m_date is None:
-            print(f"LOG: Market date parse error for '{m_title}': {m_date_str}")
+            log("debug", f"Market date parse error for '{m_title}': {m_date_str}")
+
+        log("debug", f"=== Market {m_idx}: '{m_title}' (Date: {m_date}, Comp: {m_comp}) ===")
 
-        print(f"\nLOG: === Market {m_idx}: '{m_title}' (Date: {m_date}, Comp: {m_comp}) ===")
-        
         # Extract Market Teams (Normalized)
         m_teams_raw = m_val.get('participants', [])
         m_teams = [normalize(t.get('name', '')) for t in m_teams_raw if isinstance(t, dict)]
@@ -134,83 +221,82 @@ def match_markets_to_events(request_data):
             # Try to derive from title/originalTitle/subtitle for Kalshi formats
             derived = extract_teams_from_title(m_title_primary) or extract_teams_from_title(m_val.get("originalTitle", "")) or extract_teams_from_title(m_val.get("subtitle", "")) or extract_teams_from_title(m_title)
             m_teams = derived
-        print(f"LOG: Market Teams: {m_teams}")
+        log("debug", f"Market Teams: {m_teams}")
+
+        # Events without team overlap are still scored on name/date here, so
+        # blocking only orders the scan: likely candidates first, so the
+        # best match is found early and the remaining events prune cheaply.
+        likely = team_candidates(m_teams) if m_teams else set()
+        passes = []
+        if event_dates_available and m_date is not None:
+            m_day = day_bucket(m_date)
+            in_window = set()
+            for day in (m_day - 1, m_day, m_day + 1):
+                for e_idx in events_by_day.get(day, ()):
+                    if abs((m_date - prepared_events[e_idx][2]).total_seconds()) / 3600 < 24:
+                        in_window.add(e_idx)
+            passes.append((in_window & likely, None))
+            passes.append((in_window - likely, None))
+            # Outside the window date_score is 0
+            rest = all_events - in_window
+            passes.append((rest, max(score(1.0, 1.0, 0.0), score(0.0, 1.0, 0.0))))
+        else:
+            passes.append((likely, None))
+            passes.append((all_events - likely, None))
 
-        best_event = None
+        best_idx = -1
         best_conf = 0.0
 
-        for e_idx, event in enumerate(events):
-            e_val = event.get("value", {})
-            e_title = e_val.get("title", "") or event.get("title", "")
-            e_search = normalize(e_title)
-            
-            # Date parsing (Event)
-            e_date_str = e_val.get("schema:startDate", "") or e_val.get("startDate", "")
-            e_date = parse_date_safe(e_date_str)
-
-            # 1. Name Score (Normalized)
-            name_score = difflib.SequenceMatcher(None, m_search, e_search).ratio()
-            
-            # 2. Date Score
-            date_score = 0.0
-            if event_dates_available:
-                if m_date and e_date:
-                    dt = m_date - e_date
-                    hours_diff = abs(dt.total_seconds()) / 3600
-                    if hours_diff < 24: # 24h tolerance
-                        date_score = 1.0
-                elif not m_date and not e_date:
-                    date_score = 0.5
-
-            # 3. Participant/Team Check (Normalized)
-            e_teams_raw = e_val.get('sport:competitors', []) or e_val.get('sport:competitor', []) or e_val.get('competitors', [])
-            e_teams = []
-            if isinstance(e_teams_raw, list):
-                for t in e_teams_raw:
-                    if isinstance(t, dict):
-                        e_teams.append(normalize(t.get('name', '')))
-                    elif isinstance(t, str):
-                        e_teams.append(normalize(t))
-
-            team_score = 0.0
-            if m_teams and e_teams:
-                matches_found = 0
-                for mt in m_teams:
-                    for et in e_teams:
-                        if mt in et or et in mt:
-                            matches_found += 1
-                            break
-                team_score = matches_found / max(len(m_teams), 1)
-
-            # Total Confidence
-            if event_dates_available:
-                if team_score > 0:
-                    conf = (team_score * 0.5) + (name_score * 0.3) + (date_score * 0.2)
-                else:
-                    conf = (name_score * 0.7) + (date_score * 0.3)
-            else:
-                if team_score > 0:
-                    conf = (team_score * 0.6) + (name_score * 0.4)
-                else:
-                    conf = name_score
-
-            # Log ALL comparisons with details (for debugging)
-            print(f"LOG:   Event {e_idx}: '{e_title}' | Conf: {conf:.2f} (Name: {name_score:.2f}, Team: {team_score:.2f}, Date: {date_score if event_dates_available else 'ignored'})")
-            if e_teams:
-                print(f"LOG:     Event Teams: {e_teams}")
-            
-            if conf > 0.55: # Log close calls
-                print(f"LOG:     >>> Close call! Score above 0.55")
-
-            if conf > best_conf:
-                best_conf = conf
-                best_event = event
-                print(f"LOG:     >>> New best match! (prev: {best_conf:.2f})")
+        for pass_indices, pass_bound in passes:
+            if pass_bound is not None and pass_bound < best_conf:
+                continue
+
+            for e_idx in sorted(pass_indices):
+                event, e_title, e_date, e_teams, matcher = prepared_events[e_idx]
+
+                # Date Score
+                date_score = 0.0
+                if event_dates_available:
+                    if m_date and e_date:
+                        hours_diff = abs((m_date - e_date).total_seconds()) / 3600
+                        if hours_diff < 24: # 24h tolerance
+                            date_score = 1.0
+                    elif not m_date and not e_date:
+                        date_score = 0.5
+
+                # Participant/Team Check (Normalized)
+                team_score = 0.0
+                if m_teams and e_teams:
+                    matches_found = 0
+                    for mt in m_teams:
+                        for et in e_teams:
+                            if mt in et or et in mt:
+                                matches_found += 1
+                                break
+                    team_score = matches_found / max(len(m_teams), 1)
 
+                # Name Score only when the candidate can still beat the best match
+                if not can_win(score(team_score, 1.0, date_score), e_idx):
+                    continue
+                matcher.set_seq1(m_search)
+                if not can_win(score(team_score, matcher.real_quick_ratio(), date_score), e_idx):
+                    continue
+                if not can_win(score(team_score, matcher.quick_ratio(), date_score), e_idx):
+                    continue
+                name_score = matcher.ratio()
+                fuzzy_comparisons += 1
+
+                conf = score(team_score, name_score, date_score)
+                log("debug", f"  Event {e_idx}: '{e_title}' | Conf: {conf:.2f} (Name: {name_score:.2f}, Team: {team_score:.2f}, Date: {date_score if event_dates_available else 'ignored'})")
+
+                if can_win(conf, e_idx):
+                    best_conf = conf
+                    best_idx = e_idx
+                    log("debug", f"    >>> New best match! ({best_conf:.2f})")
+
+        best_event = prepared_events[best_idx][0] if best_idx >= 0 else None
         if best_event and best_conf > 0.5:
-            best_event_title = best_event.get("value", {}).get("title", "") or best_event.get("title", "")
-            print(f"LOG:   >>> ✓ MATCHED with confidence {best_conf:.2f}")
-            print(f"LOG:       Matched event: '{best_event_title}'")
+            log("debug", f"  >>> MATCHED '{m_title}' -> '{prepared_events[best_idx][1]}' with confidence {best_conf:.2f}")
             matches.append({
                 "market": market,
                 "event": best_event,
@@ -218,7 +304,9 @@ def match_markets_to_events(request_data):
                 "event_code": best_event.get("metadata", {}).get("event_code")
             })
         else:
-            print(f"LOG:   >>> ✗ NO MATCH found (best_conf: {best_conf:.2f}, threshold: 0.5, has_event: {best_event is not None})")
+            log("debug", f"  >>> NO MATCH for '{m_title}' (best_conf: {best_conf:.2f}, threshold: 0.5, has_event: {best_event is not None})")
+
+    log("info", f"Matched {len(matches)} of {len(match_markets)} markets with {fuzzy_comparisons} fuzzy comparisons")
 
     return {
         "status": True,
@@ -0,0 +1,135 @@
+"""Tests for market-event-matcher: pins the ranking of the original full-scan matcher.
+
+Expected matches (including which of several equally scored events wins)
+were recorded from the full scan that scored every market against every
+event, before candidates were blocked and indexed. Dates are all UTC-aware
+or missing, since the full scan could not compare naive and aware dates.
+"""
+import importlib.util
+import json
+import os
+import random
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "market_event_matcher",
+    os.path.join(_parent_dir, "market-event-matcher.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+match_markets_to_events = _module.match_markets_to_events
+
+_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+TEAMS = ["Inter Milan", "Internazionale", "PSV Eindhoven", "PSV", "Manchester Utd", "Manchester City", "Ajax",
+         "Benfica", "Porto", "São Paulo", "Flamengo", "AC", "Real Madrid", "Barcelona", "Atlético Madrid",
+         "Celtic", "Rangers", "Bayern", "Dortmund", "Lyon", "Monaco"]
+
+
+def _event(code, title, date, competitors=None):
+    value = {"title": title, "schema:startDate": date}
+    if competitors is not None:
+        value["sport:competitors"] = competitors
+    return {"value": value, "metadata": {"event_code": code}}
+
+
+def _market(title, date="", participants=None, **extra):
+    value = {"title": title, "startDate": date, **extra}
+    if participants is not None:
+        value["participants"] = [{"name": p} for p in participants]
+    return {"value": value}
+
+
+def _fixed_catalog():
+    events = [
+        _event("E0", "Inter Milan vs PSV", "2025-03-04T20:00:00Z", [{"name": "Inter Milan"}, {"name": "PSV"}]),
+        _event("E1", "Inter Milan vs PSV", "2025-03-04T20:00:00Z", [{"name": "Inter Milan"}, {"name": "PSV"}]),
+        _event("E2", "Internazionale vs PSV Eindhoven", "2025-03-04T20:00:00Z", ["Internazionale", "PSV Eindhoven"]),
+        _event("E3", "Ajax vs Benfica", "2025-03-05T20:00:00Z", [{"name": "Ajax"}, {"name": "Benfica"}]),
+        _event("E4", "Ajax vs Benfica", "2025-03-07T20:00:00Z", [{"name": "Ajax"}, {"name": "Benfica"}]),
+        _event("E5", "Porto vs Celtic", "", [{"name": "Porto"}, {"name": "Celtic"}]),
+        _event("E6", "Real Madrid vs Barcelona", "2025-03-05T18:00:00Z"),
+        _event("E7", "São Paulo vs Flamengo", "2025-03-06T00:00:00Z", ["São Paulo", "Flamengo"]),
+        _event("E8", "Porto vs Celtic", "", [{"name": "Porto"}, {"name": "Celtic"}]),
+    ]
+    markets = [
+        _market("Inter Milan vs PSV", "2025-03-04T19:00:00Z", ["Internazionale", "PSV Eindhoven"]),
+        _market("Ajax vs Benfica", "2025-03-07T21:00:00Z", ["Ajax", "Benfica"]),
+        _market("Porto x Celtic", "", ["Porto", "Celtic"]),
+        _market("Real Madrid vs Barcelona", "2025-03-05T18:30:00Z", ["Real Madrid", "Barcelona"]),
+        _market("Sao Paulo - Flamengo", "2025-03-05T23:00:00Z", ["Sao Paulo"]),
+        _market("Premier League outright winner", "2025-03-05T00:00:00Z", ["Arsenal", "Liverpool"]),
+        _market("Bayern vs Dortmund", "2025-03-05T20:00:00Z", ["Bayern", "Dortmund"]),
+        _market("Ajax vs Benfica", "2025-03-05T21:00:00Z"),
+        _market("Inter Milan x PSV", "", ["Inter Milan", "PSV"], competition="Champions League"),
+    ]
+    return markets, events
+
+
+def _random_catalog(seed):
+    rnd = random.Random(seed)
+    undated = rnd.choice([0.2, 1.0, 0.0])
+
+    def date():
+        if rnd.random() < undated:
+            return ""
+        return f"2025-03-{rnd.randint(1, 9):02d}T{rnd.randint(0, 23):02d}:00:00Z"
+
+    events = []
+    for i in range(rnd.randint(0, 25)):
+        teams = rnd.sample(TEAMS, 2)
+        title = f"{teams[0]} vs {teams[1]}" if rnd.random() < 0.9 else rnd.choice(TEAMS)
+        competitors = None
+        if rnd.random() < 0.8:
+            competitors = [{"name": t} if rnd.random() < 0.5 else t for t in teams]
+        events.append(_event(f"E{i}", title, date(), competitors))
+    markets = []
+    for _ in range(rnd.randint(0, 15)):
+        teams = rnd.sample(TEAMS, 2)
+        title = rnd.choice([f"{teams[0]} vs {teams[1]}", f"{teams[0]} x {teams[1]}", f"{teams[1]} - {teams[0]}", "Outright winner", teams[0]])
+        participants = teams[:rnd.choice([1, 2, 2])] if rnd.random() < 0.8 else None
+        markets.append(_market(title, date(), participants, competition=rnd.choice(["Serie A", "", None]),
+                               originalTitle=rnd.choice(["", "KX - " + teams[0] + " vs " + teams[1]])))
+    return markets, events
+
+
+def _matches(markets, events):
+    """[market index, event code, confidence] per match."""
+    result = match_markets_to_events({"params": {"markets": markets, "events": events, "log_level": "warning"}})
+    assert result["status"] is True
+    positions = {id(m): i for i, m in enumerate(markets)}
+    return [[positions[id(m["market"])], m["event"]["metadata"]["event_code"], round(m["confidence"], 6)]
+            for m in result["data"]["matches"]]
+
+
+def test_fixed_catalog_ranking_and_ties():
+    markets, events = _fixed_catalog()
+    assert _matches(markets, events) == [
+        [0, "E2", 0.871429],   # no alias table, so only the spelled-out names overlap
+        [1, "E4", 1.0],        # only E4 falls inside the ±24h window
+        [2, "E5", 0.868966],   # E5 and E8 tie, undated on both sides
+        [3, "E6", 1.0],        # teamless event
+        [6, "E6", 0.566667],   # no team overlap anywhere, teamless event on name and date
+        [7, "E3", 1.0],        # teams derived from the title
+        [8, "E0", 0.684615],   # E0 and E1 tie, the earliest event wins
+    ]
+
+
+with open(os.path.join(_FIXTURES, "market_event_matcher_expected.json")) as _f:
+    _EXPECTED = json.load(_f)
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_random_catalog_matches_full_scan(seed):
+    markets, events = _random_catalog(int(seed))
+    assert _matches(markets, events) == _EXPECTED[seed]
+
+
+def test_naive_dates_are_read_as_utc():
+    markets, events = _fixed_catalog()
+    naive = [_market("Inter Milan vs PSV", "2025-03-04T19:00:00", ["Internazionale", "PSV Eindhoven"])]
+    aware = [_market("Inter Milan vs PSV", "2025-03-04T19:00:00Z", ["Internazionale", "PSV Eindhoven"])]
+    assert _matches(naive, events) == _matches(aware, events) == [[0, "E2", 0.871429]]
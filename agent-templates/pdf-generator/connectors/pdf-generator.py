@@ -2,7 +2,9 @@
 
 Renders a structured payload as a multi-page PDF and returns the result as
 base64 so it can be handed straight to the `google-storage` connector
-(which accepts Data URI / raw base64 inputs).
+(which accepts Data URI / raw base64 inputs). With `output_mode: path` the
+PDF stays in the work directory and only its path is returned, which
+google-storage also accepts, so large reports never travel as strings.
 
 Four layouts are bundled out of the box — they're meant as starting
 points for brand teams, sales, producers, and ops/analytics:
@@ -21,6 +23,7 @@ canonical "PDF · 14pp · brand assets" deliverable shape.
 from __future__ import annotations
 
 import base64
+import hashlib
 import io
 import json
 import mimetypes
@@ -28,8 +31,11 @@ import os
 import tempfile
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from PIL import Image as PILImage
+
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
@@ -70,30 +76,146 @@ def _pagesize(name):
     return letter
 
 
-def _resolve_image(src):
-    """Return a local file path for an image src (URL or path).
+IMAGE_CACHE_DIR = os.environ.get(
+    "PDF_GENERATOR_IMAGE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "pdf-generator-images"),
+)
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_IMAGE_DPI = 150
+DEFAULT_IMAGE_TIMEOUT = 15
+DEFAULT_IMAGE_WORKERS = 8
+
 
-    Returns a tuple `(path, cleanup_path_or_None)`. The caller is
-    responsible for deleting the cleanup path when done.
-    """
+def _image_options(params):
+    """Prefetch knobs from the request: image_dpi, image_timeout, image_workers."""
+    def number(key, default, cast):
+        try:
+            return cast(params.get(key) or default)
+        except (TypeError, ValueError):
+            return default
+
+    return {
+        "dpi": number("image_dpi", DEFAULT_IMAGE_DPI, float),
+        "timeout": number("image_timeout", DEFAULT_IMAGE_TIMEOUT, float),
+        "workers": max(1, number("image_workers", DEFAULT_IMAGE_WORKERS, int)),
+    }
+
+
+def _read_image_bytes(src, timeout):
+    """Raw bytes for an image src (URL or local path), or None."""
     if not src:
-        return None, None
+        return None
     src = str(src)
     if src.startswith("http://") or src.startswith("https://"):
         try:
             req = urllib.request.Request(src, headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                data = resp.read()
-            suffix = os.path.splitext(urllib.parse.urlparse(src).path)[1] or ".img"
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            tmp.write(data)
-            tmp.close()
-            return tmp.name, tmp.name
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return resp.read()
         except Exception:
-            return None, None
+            return None
     if os.path.exists(src):
-        return src, None
-    return None, None
+        with open(src, "rb") as f:
+            return f.read()
+    return None
+
+
+def _thumbnail(data, box_w, box_h, dpi):
+    """Path of a cached copy of `data` downsampled to fit a box (in points).
+
+    Thumbnails are keyed by the source content hash and target pixel size, so
+    recurring reports reuse them no matter where the image came from. Images
+    that already fit are cached as-is; nothing is ever upscaled.
+    """
+    max_w = max(1, int(round(box_w / 72.0 * dpi)))
+    max_h = max(1, int(round(box_h / 72.0 * dpi)))
+    key = hashlib.sha256(data).hexdigest()
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+
+    for ext in (".jpg", ".png", ".img"):
+        cached = os.path.join(IMAGE_CACHE_DIR, f"{key}-{max_w}x{max_h}{ext}")
+        if os.path.exists(cached):
+            os.utime(cached)
+            return cached
+
+    try:
+        img = PILImage.open(io.BytesIO(data))
+        img.load()
+    except Exception:
+        return None
+
+    if img.width <= max_w and img.height <= max_h:
+        out_img, ext, save_kwargs = None, ".img", {}
+    else:
+        out_img = img.copy()
+        out_img.thumbnail((max_w, max_h), PILImage.LANCZOS)
+        if out_img.mode in ("RGBA", "LA", "P") or "transparency" in out_img.info:
+            ext, save_kwargs = ".png", {"format": "PNG", "optimize": True}
+        else:
+            out_img = out_img.convert("RGB")
+            ext, save_kwargs = ".jpg", {"format": "JPEG", "quality": 85, "optimize": True}
+
+    path = os.path.join(IMAGE_CACHE_DIR, f"{key}-{max_w}x{max_h}{ext}")
+    tmp = tempfile.NamedTemporaryFile(delete=False, dir=IMAGE_CACHE_DIR, suffix=".part")
+    try:
+        if out_img is None:
+            tmp.write(data)
+            tmp.close()
+        else:
+            tmp.close()
+            out_img.save(tmp.name, **save_kwargs)
+        os.replace(tmp.name, path)
+    except Exception:
+        tmp.close()
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+        return None
+    return path
+
+
+def _trim_image_cache():
+    """Drop least recently used cache files until the cache fits its budget."""
+    try:
+        entries = []
+        for name in os.listdir(IMAGE_CACHE_DIR):
+            path = os.path.join(IMAGE_CACHE_DIR, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= IMAGE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _prefetch_images(requests, options):
+    """Resolve many images concurrently.
+
+    `requests` is a list of `(src, box_w, box_h)`; returns a list of local
+    paths (or None) in the same order, each downsampled to its box. Identical
+    requests are fetched once.
+    """
+    options = options or _image_options({})
+    unique = list(dict.fromkeys(requests))
+
+    def fetch(request):
+        src, box_w, box_h = request
+        data = _read_image_bytes(src, options["timeout"])
+        if not data:
+            return None
+        return _thumbnail(data, box_w, box_h, options["dpi"])
+
+    paths = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(options["workers"], len(unique))) as executor:
+            paths = dict(zip(unique, executor.map(fetch, unique)))
+        _trim_image_cache()
+    return [paths.get(request) for request in requests]
 
 
 def _styles(brand_color):
@@ -133,11 +255,23 @@ def _styles(brand_color):
 # ---------------------------------------------------------------------------
 
 
-def _build_brand_assets(content, pagesize, brand_color):
+def _build_brand_assets(content, pagesize, brand_color, image_options=None):
     """Return (page_builder, story) for brand-assets layout."""
     s = _styles(brand_color)
     story = []
 
+    # Fetch every logo and imagery sample up front, sized to its frame
+    logos = (content.get("logos") or [])[:4]
+    imagery = content.get("imagery")
+    samples = (imagery.get("samples", []) if isinstance(imagery, dict) else imagery or [])[:4]
+    image_paths = _prefetch_images(
+        [((logo.get("url") if isinstance(logo, dict) else logo), 10 * cm, 5 * cm) for logo in logos]
+        + [(url, 8 * cm, 5 * cm) for url in samples],
+        image_options,
+    )
+    logo_paths = image_paths[:len(logos)]
+    sample_paths = image_paths[len(logos):]
+
     brand_name = content.get("brand_name") or content.get("title") or "Brand Guidelines"
     tagline = content.get("tagline") or ""
     issued = content.get("issued") or datetime.utcnow().strftime("%B %Y")
@@ -176,12 +310,7 @@ def _build_brand_assets(content, pagesize, brand_color):
     if content.get("logos"):
         story.append(Paragraph("03 · Logo", s["h1"]))
         story.append(Paragraph("Primary, secondary, and clear-space variants.", s["body"]))
-        cleanup_paths = []
-        for logo in content["logos"][:4]:
-            src = logo.get("url") if isinstance(logo, dict) else logo
-            path, cleanup = _resolve_image(src)
-            if cleanup:
-                cleanup_paths.append(cleanup)
+        for logo, path in zip(logos, logo_paths):
             if path:
                 story.append(Spacer(1, 6 * mm))
                 try:
@@ -271,10 +400,8 @@ def _build_brand_assets(content, pagesize, brand_color):
             content["imagery"].get("description", "") if isinstance(content["imagery"], dict) else "",
             s["body"],
         ))
-        urls = (content["imagery"].get("samples", []) if isinstance(content["imagery"], dict) else content["imagery"])[:4]
         cells = []
-        for url in urls:
-            path, _cleanup = _resolve_image(url)
+        for path in sample_paths:
             if path:
                 try:
                     cells.append(Image(path, width=8 * cm, height=5 * cm, kind="proportional"))
@@ -527,8 +654,11 @@ def _build_metrics_report(content, pagesize, brand_color):
 # ---------------------------------------------------------------------------
 
 
-def _build_contact_sheet_canvas(content, pagesize, brand_color, output_path):
-    """contact-sheet uses raw canvas drawing for tighter grid control."""
+def _build_contact_sheet_canvas(content, pagesize, brand_color, output_path, image_options=None):
+    """contact-sheet uses raw canvas drawing for tighter grid control.
+
+    Returns the number of pages drawn.
+    """
     title = content.get("title") or "Contact Sheet"
     images = content.get("images") or []
     columns = int(content.get("columns") or 4)
@@ -547,7 +677,14 @@ def _build_contact_sheet_canvas(content, pagesize, brand_color, output_path):
     img_pad = 4
     caption_h = 10 if show_captions else 0
 
-    cleanup_paths = []
+    # Download and downsample the whole sheet concurrently before drawing
+    avail_w = cell_w - 2 * img_pad
+    avail_h = cell_h - 2 * img_pad - caption_h
+    image_paths = _prefetch_images(
+        [((item.get("url") if isinstance(item, dict) else item), avail_w, avail_h) for item in images],
+        image_options,
+    )
+
     per_page = columns * rows
     page_no = 0
     total_pages = max(1, (len(images) + per_page - 1) // per_page)
@@ -575,18 +712,13 @@ def _build_contact_sheet_canvas(content, pagesize, brand_color, output_path):
             x = margin + col * cell_w
             y = page_h - margin - header_h - (row + 1) * cell_h
 
-            url = item.get("url") if isinstance(item, dict) else item
             caption = item.get("caption", "") if isinstance(item, dict) else ""
 
-            path, cleanup = _resolve_image(url)
-            if cleanup:
-                cleanup_paths.append(cleanup)
+            path = image_paths[page_no * per_page + idx]
             if path:
                 try:
                     img = ImageReader(path)
                     iw, ih = img.getSize()
-                    avail_w = cell_w - 2 * img_pad
-                    avail_h = cell_h - 2 * img_pad - caption_h
                     scale = min(avail_w / iw, avail_h / ih)
                     draw_w = iw * scale
                     draw_h = ih * scale
@@ -611,14 +743,10 @@ def _build_contact_sheet_canvas(content, pagesize, brand_color, output_path):
             break
         c.showPage()
 
+    page_count = c.getPageNumber()
     c.showPage()
     c.save()
-
-    for p in cleanup_paths:
-        try:
-            os.unlink(p)
-        except Exception:
-            pass
+    return page_count
 
 
 # ---------------------------------------------------------------------------
@@ -635,8 +763,29 @@ def _coerce_content(content):
     return content or {}
 
 
+OUTPUT_MODES = ("inline", "path")
+ENCODINGS = ("base64", "data_uri")
+
+
+def _output_dir():
+    """pdf-generator/ inside the sandboxed work directory (cwd when unset)."""
+    root = os.environ.get("MACHINA_WORK_DIR") or os.getcwd()
+    output_dir = os.path.join(root, "pdf-generator")
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+def _encode_file(path, encoding):
+    """Base64 (or Data URI) of a file, encoded in 3-byte aligned blocks."""
+    parts = ["data:application/pdf;base64,"] if encoding == "data_uri" else []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(3 * 256 * 1024), b""):
+            parts.append(base64.b64encode(block).decode("ascii"))
+    return "".join(parts)
+
+
 def invoke_generate(request_data):
-    """Generate a PDF and return it as base64 (Data URI).
+    """Generate a PDF and return it as base64 (Data URI) or as a file path.
 
     Inputs (under `params` or `inputs`):
       - template:    one of "brand-assets", "rate-card", "contact-sheet"
@@ -644,6 +793,14 @@ def invoke_generate(request_data):
       - filename:    optional output filename (defaults to <template>-<ts>.pdf)
       - page_size:   "A4" or "Letter" (default Letter)
       - brand_color: hex color used for accents (default "#111111")
+      - image_dpi:   resolution images are downsampled to (default 150)
+      - image_timeout / image_workers: per-image download timeout in seconds
+                     (default 15) and concurrent downloads (default 8)
+      - output_mode: "inline" (default) returns `data_uri` + `base64`;
+                     "path" leaves the PDF under
+                     $MACHINA_WORK_DIR/pdf-generator/ and returns `file_path`
+      - encoding:    with output_mode "path", also return "base64" or
+                     "data_uri" (default: no encoding)
 
     Returns:
       {
@@ -652,9 +809,11 @@ def invoke_generate(request_data):
           "filename": "<name>.pdf",
           "content_type": "application/pdf",
           "size_bytes": <int>,
-          "page_count_estimate": <int>,
-          "data_uri": "data:application/pdf;base64,...",
-          "base64": "...",   # raw base64 (no Data URI prefix)
+          "page_count": <int>,            # counted while building
+          "page_count_estimate": <int>,   # same value, kept for old callers
+          "data_uri": "data:application/pdf;base64,...",   # inline mode
+          "base64": "...",   # raw base64 (no Data URI prefix), inline mode
+          "file_path": "/.../pdf-generator/<name>.pdf",    # path mode
         }
       }
     """
@@ -667,14 +826,28 @@ def invoke_generate(request_data):
         filename = filename + ".pdf"
     pagesize = _pagesize(params.get("page_size", "Letter"))
     brand_color = _hex_to_color(params.get("brand_color"), "#111111")
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    image_options = _image_options(params)
+
+    output_mode = str(params.get("output_mode") or "inline").strip().lower()
+    if output_mode not in OUTPUT_MODES:
+        return {"status": "error", "message": f"output_mode must be one of {', '.join(OUTPUT_MODES)}."}
+    encoding = str(params.get("encoding") or "").strip().lower() or None
+    if encoding and encoding not in ENCODINGS:
+        return {"status": "error", "message": f"encoding must be one of {', '.join(ENCODINGS)}."}
+
+    if output_mode == "path":
+        output_dir = _output_dir()
+        file_path = os.path.join(output_dir, os.path.basename(filename))
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=output_dir)
+    else:
+        file_path = None
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
     tmp_path = tmp.name
     tmp.close()
 
     try:
         if template == "contact-sheet":
-            _build_contact_sheet_canvas(content, pagesize, brand_color, tmp_path)
+            page_count = _build_contact_sheet_canvas(content, pagesize, brand_color, tmp_path, image_options)
         else:
             doc = SimpleDocTemplate(
                 tmp_path,
@@ -690,32 +863,28 @@ def invoke_generate(request_data):
             elif template == "metrics-report":
                 story = _build_metrics_report(content, pagesize, brand_color)
             else:
-                story = _build_brand_assets(content, pagesize, brand_color)
+                story = _build_brand_assets(content, pagesize, brand_color, image_options)
             doc.build(story)
+            page_count = doc.page
+
+        data = {
+            "filename": filename,
+            "content_type": "application/pdf",
+            "size_bytes": os.path.getsize(tmp_path),
+            "page_count": page_count,
+            "page_count_estimate": page_count,
+        }
 
-        with open(tmp_path, "rb") as f:
-            pdf_bytes = f.read()
-
-        encoded = base64.b64encode(pdf_bytes).decode("ascii")
-        data_uri = f"data:application/pdf;base64,{encoded}"
+        if output_mode == "path":
+            os.replace(tmp_path, file_path)
+            data["file_path"] = file_path
+            if encoding:
+                data[encoding] = _encode_file(file_path, encoding)
+        else:
+            data["base64"] = _encode_file(tmp_path, "base64")
+            data["data_uri"] = "data:application/pdf;base64," + data["base64"]
 
-        # Rough page count: count "/Type /Page" markers (not /Pages)
-        try:
-            page_count = pdf_bytes.count(b"/Type /Page\n") + pdf_bytes.count(b"/Type /Page ")
-        except Exception:
-            page_count = 0
-
-        return {
-            "status": True,
-            "data": {
-                "filename": filename,
-                "content_type": "application/pdf",
-                "size_bytes": len(pdf_bytes),
-                "page_count_estimate": page_count,
-                "data_uri": data_uri,
-                "base64": encoded,
-            },
-        }
+        return {"status": True, "data": data}
     except Exception as e:
         return {"status": "error", "message": f"Failed to generate PDF: {e}"}
     finally:
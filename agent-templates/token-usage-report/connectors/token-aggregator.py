@@ -31,8 +31,21 @@ Inputs (all optional except api_base_url + api_key):
     project_label    display name for the report header
     page_size_cap    max executions to scan per source (default 5000;
                      bumps over this paginate)
+    max_workers      concurrent page scans (default 16). The four scans
+                     (workflow/agent × current/previous window) of every
+                     pod run side by side; see `_run_fetches`.
     include_failed   include failed executions in token totals? default True
     brand_color      hex accent color for downstream PDF render
+    use_rollups      answer both windows from the local rollup store and
+                     only page rows newer than its high-water mark
+                     (default False; weekly / monthly windows only —
+                     rolling_days falls back to a full scan; see
+                     "Rollup store" below)
+    rollup_path      SQLite file for the rollup store
+                     (default /tmp/token-usage-rollups.sqlite3)
+    rollup_settle_minutes
+                     rows younger than this are left for the next run so
+                     still-running executions aren't frozen (default 15)
 
 Returns the metrics-report payload + a few raw fields callers might
 want (total_tokens, total_runs, period_from, period_to) so the
@@ -47,11 +60,15 @@ instead of crashing the whole chain.
 
 from __future__ import annotations
 
+import hashlib
 import json
+import math
+import sqlite3
 import statistics
 import urllib.error
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 
@@ -100,7 +117,7 @@ def _parse_row_date(row):
     return None
 
 
-def _fetch_executions(base_url, api_key, endpoint, since_iso, until_iso, page_size_cap):
+def _fetch_executions(base_url, api_key, endpoint, since_iso, until_iso, page_size_cap, prefetch=True):
     """Page through one of /execution/workflow-search or
     /execution/agent-search.
 
@@ -114,6 +131,11 @@ def _fetch_executions(base_url, api_key, endpoint, since_iso, until_iso, page_si
     `page_size_cap` is a hard ceiling on COLLECTED matching rows; we
     stop accepting more once we've seen that many. Doesn't apply to
     skipped (pre-window) rows.
+
+    With `prefetch` the request for page N+1 is already in flight while
+    page N is being window-filtered (a ~2s server round trip hides the
+    client-side work). Costs at most one wasted page when the early-exit
+    or the cap fires.
     """
 
     url = f"{base_url.rstrip('/')}/{endpoint}"
@@ -147,44 +169,61 @@ def _fetch_executions(base_url, api_key, endpoint, since_iso, until_iso, page_si
     max_pages = 20
     truncated_at_max_pages = False
 
-    while len(collected) < page_size_cap and page <= max_pages:
+    def request_page(page_number):
         body = {
             "filters": {},
-            "page": page,
+            "page": page_number,
             "page_size": per_page,
         }
-        resp = _http_post(url, headers, body)
-        if resp.get("_error"):
-            return collected, resp["_error"]
-        rows = resp.get("data") or []
-        if not rows:
-            break
-
-        # Window filter + early-exit detection.
-        last_row_date = None
-        page_had_in_window = False
-        for row in rows:
-            parsed = _parse_row_date(row)
-            if parsed is None:
-                # Unparseable — keep it; we can't filter so don't filter.
-                collected.append(row)
-                continue
-            if since_dt <= parsed <= until_dt:
-                collected.append(row)
-                page_had_in_window = True
-            last_row_date = parsed if last_row_date is None else min(last_row_date, parsed)
-
-        # If the OLDEST row on this page is already older than the
-        # window AND none of the rows fell into the window, the rest
-        # of the table is irrelevant — stop paginating.
-        if last_row_date is not None and last_row_date < since_dt and not page_had_in_window:
-            break
-
-        # Last page reached.
-        if len(rows) < per_page:
-            break
-
-        page += 1
+        return _http_post(url, headers, body)
+
+    # Dedicated single-thread pager: the prefetch must never wait on a
+    # slot of the caller's (bounded) pool, or pod scans could deadlock.
+    pager = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = pager.submit(request_page, page) if pager else None
+
+    try:
+        while len(collected) < page_size_cap and page <= max_pages:
+            resp = pending.result() if pending else request_page(page)
+            pending = None
+            if resp.get("_error"):
+                return collected, resp["_error"]
+            rows = resp.get("data") or []
+            if not rows:
+                break
+
+            # Pipeline the next page while this one is filtered.
+            if pager and len(rows) >= per_page and page < max_pages:
+                pending = pager.submit(request_page, page + 1)
+
+            # Window filter + early-exit detection.
+            last_row_date = None
+            page_had_in_window = False
+            for row in rows:
+                parsed = _parse_row_date(row)
+                if parsed is None:
+                    # Unparseable — keep it; we can't filter so don't filter.
+                    collected.append(row)
+                    continue
+                if since_dt <= parsed <= until_dt:
+                    collected.append(row)
+                    page_had_in_window = True
+                last_row_date = parsed if last_row_date is None else min(last_row_date, parsed)
+
+            # If the OLDEST row on this page is already older than the
+            # window AND none of the rows fell into the window, the rest
+            # of the table is irrelevant — stop paginating.
+            if last_row_date is not None and last_row_date < since_dt and not page_had_in_window:
+                break
+
+            # Last page reached.
+            if len(rows) < per_page:
+                break
+
+            page += 1
+    finally:
+        if pager:
+            pager.shutdown(wait=False, cancel_futures=True)
 
     # Flag if we exited due to page ceiling rather than reaching the
     # end of the window — callers (the report payload) can surface
@@ -195,6 +234,65 @@ def _fetch_executions(base_url, api_key, endpoint, since_iso, until_iso, page_si
     return collected, ("max_pages_hit" if truncated_at_max_pages else None)
 
 
+# The four scans every report needs per pod: (endpoint, window) pairs.
+_SCANS = (
+    ("execution/workflow-search", "current"),
+    ("execution/agent-search", "current"),
+    ("execution/workflow-search", "previous"),
+    ("execution/agent-search", "previous"),
+)
+
+
+def _run_scans(jobs, page_size_cap, max_workers, prefetch=True):
+    """Run page scans on one bounded thread pool.
+
+    `jobs` is a list of (api_base_url, api_key, endpoint, since, until);
+    returns one (rows, error) per job, in job order. `prefetch` is
+    passed through to `_fetch_executions`.
+
+    Isolation: `_fetch_executions` already turns HTTP failures into an
+    error string, and anything else a scan raises is caught here and
+    reported the same way, so one bad pod never sinks the others.
+    """
+
+    def scan(base_url, api_key, endpoint, since, until):
+        try:
+            return _fetch_executions(
+                base_url, api_key, endpoint,
+                since.isoformat(), until.isoformat(), page_size_cap,
+                prefetch=prefetch,
+            )
+        except Exception as e:
+            return [], f"{type(e).__name__}: {e}"
+
+    if not jobs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        futures = [pool.submit(scan, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def _run_fetches(pods, windows, page_size_cap, max_workers):
+    """Run every pod × `_SCANS` page scan concurrently (see `_run_scans`).
+
+    `pods` is a list of (api_base_url, api_key); `windows` maps
+    "current"/"previous" to (since, until). Returns one dict per pod,
+    in input order, keyed by (endpoint, window) → (rows, error).
+    """
+
+    keys = [(i, endpoint, window)
+            for i in range(len(pods))
+            for endpoint, window in _SCANS]
+    jobs = [(pods[i][0], pods[i][1], endpoint) + windows[window]
+            for i, endpoint, window in keys]
+
+    results = [{} for _ in pods]
+    for (i, endpoint, window), result in zip(keys, _run_scans(jobs, page_size_cap, max_workers)):
+        results[i][(endpoint, window)] = result
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Aggregation
 # ---------------------------------------------------------------------------
@@ -280,6 +378,426 @@ def _by_day(rows, since_dt, until_dt):
     return [{"date": k, "runs": v["runs"], "tokens": v["tokens"]} for k, v in sorted(days.items())]
 
 
+_SUCCESS_STATUSES = ("executed", "completed", "success")
+
+
+def _percentiles(samples_sorted):
+    """(p50, p95, max) of an ascending list of per-run token costs."""
+    if not samples_sorted:
+        return None
+    p50 = samples_sorted[len(samples_sorted) // 2]
+    p95 = samples_sorted[min(len(samples_sorted) - 1, int(len(samples_sorted) * 0.95))]
+    return p50, p95, samples_sorted[-1]
+
+
+def _summarize_rows(rows, since_dt, until_dt, include_failed):
+    """Everything the report sections need, computed from raw rows.
+
+    Same shape as `_summarize_rollups` so the payload builders don't
+    care where the numbers came from:
+      tokens, runs, by_name, by_day, status_counts,
+      percentiles  (p50, p95, max) or None,
+      top_runs     up to 5 of {pod, name, tokens, date}.
+    """
+    status_counts = {}
+    for r in rows:
+        s = r.get("status") or "unknown"
+        status_counts[s] = status_counts.get(s, 0) + 1
+
+    expensive = sorted(rows, key=_row_tokens, reverse=True)[:5]
+    return {
+        "tokens": sum(_row_tokens(r) for r in rows),
+        "runs": len(rows),
+        "by_name": _aggregate(rows, include_failed),
+        "by_day": _by_day(rows, since_dt, until_dt),
+        "status_counts": status_counts,
+        "percentiles": _percentiles(sorted(t for t in (_row_tokens(r) for r in rows) if t > 0)),
+        "top_runs": [
+            {"pod": r.get("_pod", "?"), "name": _row_name(r), "tokens": _row_tokens(r), "date": _row_date(r)}
+            for r in expensive
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rollup store — incremental alternative to re-paging whole windows
+#
+# With `use_rollups`, every run only pages the rows newer than the pod's
+# high-water mark (usually one page), folds them into a local SQLite
+# file of per-hour × workflow × status aggregates, and answers BOTH the
+# current and the previous window from there. Day/week/month windows
+# are whole hours, so the numbers match a full scan; percentiles come
+# from a 1%-wide log histogram (max is exact).
+#
+# Coverage per (pod, source) is one contiguous [low_water, high_water)
+# range. Rows are only ingested into the uncovered part, re-checked
+# under a write lock, so overlapping runs never double count. A scan
+# that errors ingests nothing (the next run retries); a scan that hits
+# max_pages ingests what it got and records the missing span in `gaps`.
+#
+# A pod is keyed by its URL plus a hash of its API key: two keys on the
+# same URL can see different executions, so they never share coverage.
+# ---------------------------------------------------------------------------
+
+
+_ENDPOINTS = ("execution/workflow-search", "execution/agent-search")
+_ROLLUP_SYNC_CAP = 10 ** 9  # let max_pages bound sync scans, not the row cap
+_HIST_BASE = 1.01
+_TOP_RUNS_PER_HOUR = 5
+
+_ROLLUP_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS rollups (
+        pod TEXT, source TEXT, hour TEXT, name TEXT, status TEXT,
+        runs INTEGER, tokens INTEGER, max_tokens INTEGER,
+        PRIMARY KEY (pod, source, hour, name, status))""",
+    """CREATE TABLE IF NOT EXISTS token_hist (
+        pod TEXT, source TEXT, hour TEXT, bucket INTEGER, runs INTEGER,
+        PRIMARY KEY (pod, source, hour, bucket))""",
+    """CREATE TABLE IF NOT EXISTS top_runs (
+        pod TEXT, source TEXT, hour TEXT, name TEXT, tokens INTEGER, ts TEXT)""",
+    "CREATE INDEX IF NOT EXISTS top_runs_hour ON top_runs (pod, source, hour)",
+    """CREATE TABLE IF NOT EXISTS watermarks (
+        pod TEXT, source TEXT, low_water TEXT, high_water TEXT,
+        PRIMARY KEY (pod, source))""",
+    """CREATE TABLE IF NOT EXISTS gaps (
+        pod TEXT, source TEXT, gap_from TEXT, gap_to TEXT)""",
+)
+
+
+def _pod_key(base_url, api_key):
+    digest = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+    return f"{base_url.rstrip('/')}#{digest}"
+
+
+def _hour_key(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+def _open_rollups(path):
+    # Autocommit; `_sync_rollups` manages its own write transactions.
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    for stmt in _ROLLUP_SCHEMA:
+        conn.execute(stmt)
+    return conn
+
+
+def _coverage(conn, pod, source):
+    row = conn.execute(
+        "SELECT low_water, high_water FROM watermarks WHERE pod = ? AND source = ?",
+        (pod, source),
+    ).fetchone()
+    if not row:
+        return None
+    return datetime.fromisoformat(row[0]), datetime.fromisoformat(row[1])
+
+
+def _uncovered(coverage, need_since, cutoff):
+    """Half-open [lo, hi) ranges of [need_since, cutoff) not yet ingested."""
+    if coverage is None:
+        return [(need_since, cutoff)] if need_since < cutoff else []
+    low, high = coverage
+    ranges = []
+    if need_since < low:
+        ranges.append((need_since, low))
+    if high < cutoff:
+        ranges.append((high, cutoff))
+    return ranges
+
+
+def _ingest_rows(conn, pod, source, rows, ranges):
+    """Fold rows that fall inside `ranges` into the rollup tables."""
+    aggregates = {}
+    hist = {}
+    top = {}
+    ingested = 0
+    for row in rows:
+        d = _row_date(row)
+        if d is None or not any(lo <= d < hi for lo, hi in ranges):
+            continue
+        ingested += 1
+        hour = _hour_key(d)
+        tokens = _row_tokens(row)
+        name = _row_name(row)
+        key = (hour, name, row.get("status") or "unknown")
+        agg = aggregates.setdefault(key, [0, 0, 0])
+        agg[0] += 1
+        agg[1] += tokens
+        agg[2] = max(agg[2], tokens)
+        if tokens > 0:
+            bucket = int(math.floor(math.log(tokens) / math.log(_HIST_BASE)))
+            hist[(hour, bucket)] = hist.get((hour, bucket), 0) + 1
+        top.setdefault(hour, []).append((tokens, name, d.isoformat()))
+
+    conn.executemany(
+        """INSERT INTO rollups (pod, source, hour, name, status, runs, tokens, max_tokens)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (pod, source, hour, name, status) DO UPDATE SET
+             runs = runs + excluded.runs,
+             tokens = tokens + excluded.tokens,
+             max_tokens = MAX(max_tokens, excluded.max_tokens)""",
+        [(pod, source, h, n, st, a[0], a[1], a[2]) for (h, n, st), a in aggregates.items()],
+    )
+    conn.executemany(
+        """INSERT INTO token_hist (pod, source, hour, bucket, runs) VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (pod, source, hour, bucket) DO UPDATE SET runs = runs + excluded.runs""",
+        [(pod, source, h, b, n) for (h, b), n in hist.items()],
+    )
+    conn.executemany(
+        "INSERT INTO top_runs (pod, source, hour, name, tokens, ts) VALUES (?, ?, ?, ?, ?, ?)",
+        [(pod, source, h, name, tokens, ts)
+         for h, runs in top.items()
+         for tokens, name, ts in sorted(runs, reverse=True)[:_TOP_RUNS_PER_HOUR]],
+    )
+    # An hour can be filled across several syncs — keep its top N only.
+    conn.execute(
+        """DELETE FROM top_runs WHERE rowid IN (
+             SELECT rowid FROM (
+               SELECT rowid, ROW_NUMBER() OVER (
+                 PARTITION BY hour ORDER BY tokens DESC, ts DESC) AS rn
+               FROM top_runs WHERE pod = ? AND source = ?)
+             WHERE rn > ?)""",
+        (pod, source, _TOP_RUNS_PER_HOUR),
+    )
+    return ingested
+
+
+def _sync_rollups(conn, pods, need_since, cutoff, max_workers):
+    """Bring every pod's coverage up to [need_since, cutoff).
+
+    `pods` is a list of (api_base_url, api_key). Only rows newer than
+    the high-water mark (or older than the low-water mark, when a longer
+    window is asked for the first time) are paged. Returns
+    ({(pod_key, endpoint): error}, rows_ingested).
+    """
+    jobs = []
+    targets = []
+    for base_url, api_key in pods:
+        pod = _pod_key(base_url, api_key)
+        for endpoint in _ENDPOINTS:
+            ranges = _uncovered(_coverage(conn, pod, endpoint), need_since, cutoff)
+            if ranges:
+                jobs.append((base_url, api_key, endpoint, min(lo for lo, _ in ranges), cutoff))
+                targets.append((pod, endpoint))
+
+    # Incremental syncs usually stop on the first page, so a speculative
+    # second page would be wasted load on the pod.
+    scans = _run_scans(jobs, _ROLLUP_SYNC_CAP, max_workers, prefetch=False)
+
+    errors = {}
+    ingested = 0
+    for (pod, endpoint), (rows, err) in zip(targets, scans):
+        if err and err != "max_pages_hit":
+            errors[(pod, endpoint)] = err
+            continue
+
+        # Re-read coverage under the write lock: a concurrent run may
+        # have ingested part of this range while we were paging.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            coverage = _coverage(conn, pod, endpoint)
+            ranges = _uncovered(coverage, need_since, cutoff)
+            ingested += _ingest_rows(conn, pod, endpoint, rows, ranges)
+            low = min(need_since, coverage[0]) if coverage else need_since
+            high = max(cutoff, coverage[1]) if coverage else cutoff
+            if err == "max_pages_hit":
+                # Pages run newest first, so only [oldest, cutoff) was read.
+                dated = [d for d in (_row_date(r) for r in rows) if d is not None]
+                floor = max(min(dated), need_since) if dated else cutoff
+                if coverage and floor > coverage[1]:
+                    # Rows between the old high-water mark and `floor` were
+                    # never read and no later scan can reach past the newer
+                    # ones, so the span is recorded as a permanent gap.
+                    conn.execute(
+                        "INSERT INTO gaps (pod, source, gap_from, gap_to) VALUES (?, ?, ?, ?)",
+                        (pod, endpoint, coverage[1].isoformat(), floor.isoformat()),
+                    )
+                    low = coverage[0]
+                else:
+                    # Coverage only reaches down to what was read; the next
+                    # run pages for [need_since, floor) again.
+                    low = min(coverage[0], floor) if coverage else floor
+                errors[(pod, endpoint)] = err
+            conn.execute(
+                """INSERT INTO watermarks (pod, source, low_water, high_water) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (pod, source) DO UPDATE SET
+                     low_water = excluded.low_water, high_water = excluded.high_water""",
+                (pod, endpoint, low.isoformat(), high.isoformat()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return errors, ingested
+
+
+def _window_end(until_dt):
+    """Exclusive end of a window whose `until` is inclusive."""
+    return until_dt + timedelta(microseconds=1)
+
+
+def _on_hours(windows):
+    """True when every window starts and ends on an hour boundary, i.e.
+    the hourly rollups can answer it exactly."""
+    return all(
+        dt.minute == dt.second == dt.microsecond == 0
+        for since_dt, until_dt in windows.values()
+        for dt in (since_dt, _window_end(until_dt))
+    )
+
+
+def _rollup_where(pod_keys, since_dt, until_dt):
+    # Half-open hour range: adjacent windows never share an hour.
+    marks = ",".join("?" for _ in pod_keys)
+    return (
+        f"pod IN ({marks}) AND hour >= ? AND hour < ?",
+        list(pod_keys) + [_hour_key(since_dt), _hour_key(_window_end(until_dt))],
+    )
+
+
+def _rollup_totals(conn, pod_keys, since_dt, until_dt):
+    """(tokens, runs) for some pods over a window."""
+    where, args = _rollup_where(pod_keys, since_dt, until_dt)
+    tokens, runs = conn.execute(
+        f"SELECT COALESCE(SUM(tokens), 0), COALESCE(SUM(runs), 0) FROM rollups WHERE {where}", args,
+    ).fetchone()
+    return int(tokens), int(runs)
+
+
+def _rollup_gaps(conn, pod_keys, since_dt, until_dt):
+    """Recorded ingestion gaps overlapping a window."""
+    marks = ",".join("?" for _ in pod_keys)
+    rows = conn.execute(
+        f"SELECT pod, source, gap_from, gap_to FROM gaps WHERE pod IN ({marks})", list(pod_keys),
+    ).fetchall()
+    # Compared as datetimes: ISO strings with different offsets or
+    # fractional seconds don't sort chronologically.
+    return [
+        row for row in rows
+        if datetime.fromisoformat(row[2]) < until_dt and datetime.fromisoformat(row[3]) > since_dt
+    ]
+
+
+def _summarize_rollups(conn, pod_keys, since_dt, until_dt, include_failed, pod_labels=None):
+    """`_summarize_rows` equivalent answered from the rollup tables."""
+    where, args = _rollup_where(pod_keys, since_dt, until_dt)
+    tokens, runs = _rollup_totals(conn, pod_keys, since_dt, until_dt)
+
+    name_where = where
+    name_args = list(args)
+    if not include_failed:
+        name_where += " AND status IN (?, ?, ?)"
+        name_args += list(_SUCCESS_STATUSES)
+    by_name = []
+    for name, n_runs, n_tokens in conn.execute(
+        f"SELECT name, SUM(runs), SUM(tokens) FROM rollups WHERE {name_where} GROUP BY name", name_args,
+    ):
+        avg = int(n_tokens / n_runs) if n_runs > 0 else 0
+        by_name.append({"name": name, "runs": n_runs, "tokens": n_tokens, "avg": avg})
+    by_name.sort(key=lambda r: r["tokens"], reverse=True)
+
+    days = {d["date"]: d for d in _by_day([], since_dt, until_dt)}
+    for day, d_runs, d_tokens in conn.execute(
+        f"SELECT substr(hour, 1, 10), SUM(runs), SUM(tokens) FROM rollups WHERE {where} GROUP BY 1", args,
+    ):
+        if day in days:
+            days[day]["runs"] = d_runs
+            days[day]["tokens"] = d_tokens
+
+    status_counts = dict(conn.execute(
+        f"SELECT status, SUM(runs) FROM rollups WHERE {where} GROUP BY status", args,
+    ).fetchall())
+
+    percentiles = None
+    hist = conn.execute(
+        f"SELECT bucket, SUM(runs) FROM token_hist WHERE {where} GROUP BY bucket ORDER BY bucket", args,
+    ).fetchall()
+    samples = sum(n for _, n in hist)
+    if samples:
+        p_max = conn.execute(
+            f"SELECT MAX(max_tokens) FROM rollups WHERE {where}", args,
+        ).fetchone()[0]
+
+        def at_rank(rank):
+            seen = 0
+            for bucket, n in hist:
+                seen += n
+                if seen > rank:
+                    return min(int(_HIST_BASE ** (bucket + 0.5)), p_max)
+            return p_max
+
+        percentiles = (at_rank(samples // 2), at_rank(min(samples - 1, int(samples * 0.95))), p_max)
+
+    pod_labels = pod_labels or {}
+    top_runs = [
+        {"pod": pod_labels.get(pod, pod), "name": name, "tokens": t, "date": datetime.fromisoformat(ts)}
+        for pod, name, t, ts in conn.execute(
+            f"SELECT pod, name, tokens, ts FROM top_runs WHERE {where} ORDER BY tokens DESC, ts DESC LIMIT 5", args,
+        )
+    ]
+
+    return {
+        "tokens": tokens,
+        "runs": runs,
+        "by_name": by_name,
+        "by_day": [days[k] for k in sorted(days)],
+        "status_counts": status_counts,
+        "percentiles": percentiles,
+        "top_runs": top_runs,
+    }
+
+
+_DEFAULT_ROLLUP_PATH = "/tmp/token-usage-rollups.sqlite3"
+
+_ROLLUPS_SKIPPED_NOTE = "use_rollups ignored: rolling_days windows don't fall on whole hours, so this report used a full scan"
+
+
+def _rollup_report(pods, pod_labels, windows, now, inputs, include_failed, max_workers):
+    """Sync the rollup store for `pods`, then answer both windows from it.
+
+    `pods` is a list of (api_base_url, api_key), `pod_labels` maps pod
+    key → display label, `windows` is the same dict `_run_fetches`
+    takes. Returns (summary, per_pod, errors, notes) where per_pod maps
+    pod key → {tokens, runs, tokens_prev} and errors maps
+    (pod key, endpoint) → sync error.
+    """
+    path = inputs.get("rollup_path") or _DEFAULT_ROLLUP_PATH
+    settle = inputs.get("rollup_settle_minutes")
+    cutoff = now - timedelta(minutes=int(15 if settle is None else settle))
+    since, until = windows["current"]
+    prev_since, prev_until = windows["previous"]
+    pod_keys = [_pod_key(base_url, api_key) for base_url, api_key in pods]
+
+    conn = _open_rollups(path)
+    try:
+        errors, ingested = _sync_rollups(conn, pods, prev_since, cutoff, max_workers)
+        summary = _summarize_rollups(conn, pod_keys, since, until, include_failed, pod_labels)
+        per_pod = {}
+        for key in pod_keys:
+            tokens, runs = _rollup_totals(conn, [key], since, until)
+            per_pod[key] = {
+                "tokens": tokens,
+                "runs": runs,
+                "tokens_prev": _rollup_totals(conn, [key], prev_since, prev_until)[0],
+            }
+        gaps = _rollup_gaps(conn, pod_keys, prev_since, until) if pod_keys else []
+        short = [
+            (pod, source, coverage[0])
+            for pod in pod_keys
+            for source in _ENDPOINTS
+            for coverage in [_coverage(conn, pod, source)]
+            if coverage and coverage[0] > prev_since
+        ]
+    finally:
+        conn.close()
+
+    notes = [f"Rollups: {path} (+{ingested:,} rows synced, complete through {cutoff.isoformat()})"]
+    for pod, source, gap_from, gap_to in gaps:
+        notes.append(f"{pod_labels.get(pod, pod)}: {source} rollup gap {gap_from} → {gap_to} (max_pages_hit during sync)")
+    for pod, source, low in short:
+        notes.append(f"{pod_labels.get(pod, pod)}: {source} rollups only reach back to {low.isoformat()} (max_pages_hit during sync; retried next run)")
+    return summary, per_pod, errors, notes
+
+
 # ---------------------------------------------------------------------------
 # Window computation per period_mode
 # ---------------------------------------------------------------------------
@@ -359,6 +877,8 @@ def invoke_aggregate(request_data, *_, **__):
     page_size_cap = int(inputs.get("page_size_cap") or 2000)
     include_failed = bool(inputs.get("include_failed", True))
     brand_color = inputs.get("brand_color") or "#0A2540"
+    max_workers = int(inputs.get("max_workers") or 16)
+    use_rollups = bool(inputs.get("use_rollups", False))
 
     if not api_base_url or not api_key:
         return {
@@ -379,32 +899,41 @@ def invoke_aggregate(request_data, *_, **__):
     now = datetime.now(timezone.utc)
     since, until, prev_since, prev_until, mode_label = _compute_window(period_mode, period_days, now)
 
-    # --- Current window ------------------------------------------------
-    wf_rows, wf_err = _fetch_executions(
-        api_base_url, api_key, "execution/workflow-search",
-        since.isoformat(), until.isoformat(), page_size_cap,
-    )
-    ag_rows, ag_err = _fetch_executions(
-        api_base_url, api_key, "execution/agent-search",
-        since.isoformat(), until.isoformat(), page_size_cap,
-    )
+    rollup_notes = []
+    if use_rollups and not _on_hours({"current": (since, until), "previous": (prev_since, prev_until)}):
+        use_rollups = False
+        rollup_notes.append(_ROLLUPS_SKIPPED_NOTE)
+    if use_rollups:
+        summary, per_pod, errors, rollup_notes = _rollup_report(
+            [(api_base_url, api_key)], {_pod_key(api_base_url, api_key): api_base_url.rstrip("/")},
+            {"current": (since, until), "previous": (prev_since, prev_until)},
+            now, inputs, include_failed, max_workers,
+        )
+        pod = _pod_key(api_base_url, api_key)
+        total_tokens_prev = per_pod[pod]["tokens_prev"]
+        wf_err = errors.get((pod, "execution/workflow-search"))
+        ag_err = errors.get((pod, "execution/agent-search"))
+    else:
+        # Both endpoints × both windows are scanned concurrently.
+        scans = _run_fetches(
+            [(api_base_url, api_key)],
+            {"current": (since, until), "previous": (prev_since, prev_until)},
+            page_size_cap, max_workers,
+        )[0]
 
-    # --- Previous window (for period-over-period delta) ---------------
-    wf_prev, _ = _fetch_executions(
-        api_base_url, api_key, "execution/workflow-search",
-        prev_since.isoformat(), prev_until.isoformat(), page_size_cap,
-    )
-    ag_prev, _ = _fetch_executions(
-        api_base_url, api_key, "execution/agent-search",
-        prev_since.isoformat(), prev_until.isoformat(), page_size_cap,
-    )
+        # --- Current window --------------------------------------------
+        wf_rows, wf_err = scans[("execution/workflow-search", "current")]
+        ag_rows, ag_err = scans[("execution/agent-search", "current")]
 
-    rows = wf_rows + ag_rows
-    rows_prev = wf_prev + ag_prev
+        # --- Previous window (for period-over-period delta) -----------
+        wf_prev, _ = scans[("execution/workflow-search", "previous")]
+        ag_prev, _ = scans[("execution/agent-search", "previous")]
 
-    total_tokens = sum(_row_tokens(r) for r in rows)
-    total_runs = len(rows)
-    total_tokens_prev = sum(_row_tokens(r) for r in rows_prev) or 0
+        summary = _summarize_rows(wf_rows + ag_rows, since, until, include_failed)
+        total_tokens_prev = sum(_row_tokens(r) for r in wf_prev + ag_prev) or 0
+
+    total_tokens = summary["tokens"]
+    total_runs = summary["runs"]
 
     # Period-over-period delta. Avoid div-by-zero by printing absolute
     # when prev is 0. Delta noun matches the mode so the card reads
@@ -425,23 +954,13 @@ def invoke_aggregate(request_data, *_, **__):
     avg_tokens_per_run = int(total_tokens / total_runs) if total_runs > 0 else 0
 
     # Percentile distribution of per-run token cost
-    samples = [_row_tokens(r) for r in rows if _row_tokens(r) > 0]
-    if samples:
-        samples_sorted = sorted(samples)
-        p50 = samples_sorted[len(samples_sorted) // 2]
-        p95 = samples_sorted[min(len(samples_sorted) - 1, int(len(samples_sorted) * 0.95))]
-        p_max = samples_sorted[-1]
-    else:
-        p50 = p95 = p_max = 0
+    p50, p95, p_max = summary["percentiles"] or (0, 0, 0)
 
-    by_name = _aggregate(rows, include_failed)
-    by_day = _by_day(rows, since, until)
+    by_name = summary["by_name"]
+    by_day = summary["by_day"]
 
     # Status breakdown
-    status_counts = {}
-    for r in rows:
-        s = r.get("status") or "unknown"
-        status_counts[s] = status_counts.get(s, 0) + 1
+    status_counts = summary["status_counts"]
     success_rate = (
         100.0 * (status_counts.get("executed", 0) + status_counts.get("completed", 0) + status_counts.get("success", 0))
         / total_runs
@@ -524,7 +1043,7 @@ def invoke_aggregate(request_data, *_, **__):
         })
 
     # 3. Distribution stats
-    if samples:
+    if summary["percentiles"]:
         sections.append({
             "title": "Distribution (tokens per run)",
             "stats": [
@@ -535,12 +1054,12 @@ def invoke_aggregate(request_data, *_, **__):
         })
 
     # 4. Top 5 most expensive runs
-    expensive = sorted(rows, key=_row_tokens, reverse=True)[:5]
-    if expensive and _row_tokens(expensive[0]) > 0:
+    expensive = summary["top_runs"]
+    if expensive and expensive[0]["tokens"] > 0:
         sections.append({
             "title": "Top consuming runs",
             "bullets": [
-                f"{_row_name(r)} — {_format_number(_row_tokens(r))} tokens ({(_row_date(r) or until).strftime('%b %-d %H:%M')})"
+                f"{r['name']} — {_format_number(r['tokens'])} tokens ({(r['date'] or until).strftime('%b %-d %H:%M')})"
                 for r in expensive
             ],
         })
@@ -563,6 +1082,7 @@ def invoke_aggregate(request_data, *_, **__):
     if ag_err:
         notes.append(f"agent-search partial: {ag_err}")
     notes.append(f"Source: {api_base_url}/execution/{{workflow,agent}}-search")
+    notes.extend(rollup_notes)
     notes.append(f"Window: {since.isoformat()} → {until.isoformat()}")
     notes.append(f"Mode: {period_mode}")
 
@@ -599,7 +1119,7 @@ def invoke_aggregate(request_data, *_, **__):
 
 # ---------------------------------------------------------------------------
 # Multi-pod aggregation — for billing-grade reports that span an entire
-# org. Takes a list of pod configs, queries each in turn, produces a
+# org. Takes a list of pod configs, queries them concurrently, produces a
 # hierarchical (org → project → workflow) metrics-report payload.
 # ---------------------------------------------------------------------------
 
@@ -618,6 +1138,9 @@ def invoke_aggregate_multi(request_data, *_, **__):
                      project_label appears as the per-pod row label in
                      the report; api_base_url + api_key authenticate
                      against that pod's /execution/* endpoints.
+      max_workers  — concurrent page scans across all pods (default 16)
+      use_rollups, rollup_path, rollup_settle_minutes
+                   — same as invoke_aggregate; one store serves all pods
 
     Returns a payload shaped for pdf-generator's metrics-report layout
     with:
@@ -629,8 +1152,11 @@ def invoke_aggregate_multi(request_data, *_, **__):
       - Section "Top consuming workflows": top 15 across ALL pods
       - Section "By day": org-wide daily timeseries
 
-    Each pod is queried in series; a per-pod fetch failure is logged
-    as a `notes` entry but doesn't abort the report. Billing
+    All pods are queried concurrently on one bounded pool (4 scans per
+    pod, see `_run_fetches`), so latency tracks the slowest pod rather
+    than the sum. Results are folded back in `pods` order, so the
+    report is identical to a serial run. A per-pod fetch failure is
+    logged as a `notes` entry but doesn't abort the report. Billing
     accountability requires we always emit something — partial data
     with explicit gaps is more useful than a hard failure.
     """
@@ -647,6 +1173,8 @@ def invoke_aggregate_multi(request_data, *_, **__):
     pods = inputs.get("pods") or []
     page_size_cap = int(inputs.get("page_size_cap") or 2000)
     include_failed = bool(inputs.get("include_failed", True))
+    max_workers = int(inputs.get("max_workers") or 16)
+    use_rollups = bool(inputs.get("use_rollups", False))
 
     if not pods:
         return {
@@ -670,6 +1198,28 @@ def invoke_aggregate_multi(request_data, *_, **__):
     all_rows = []         # for cross-pod top-workflows ranking
     all_rows_by_pod = {}  # for cross-pod per-day rollup
     notes = []
+    windows = {"current": (since, until), "previous": (prev_since, prev_until)}
+
+    # Fan out every credentialed pod's scans up front, then fold the
+    # results back in input order.
+    fetchable = []
+    pod_labels = {}
+    for pod_cfg in pods:
+        api_base_url = pod_cfg.get("api_base_url") or ""
+        api_key = pod_cfg.get("api_key") or ""
+        if api_base_url and api_key:
+            fetchable.append((api_base_url, api_key))
+            pod_labels[_pod_key(api_base_url, api_key)] = pod_cfg.get("project_label") or pod_cfg.get("name") or "(unnamed)"
+    rollup_notes = []
+    if use_rollups and not _on_hours(windows):
+        use_rollups = False
+        rollup_notes.append(_ROLLUPS_SKIPPED_NOTE)
+    if use_rollups:
+        org_summary, rollup_per_pod, rollup_errors, rollup_notes = _rollup_report(
+            fetchable, pod_labels, windows, now, inputs, include_failed, max_workers,
+        )
+    else:
+        pod_scans = iter(_run_fetches(fetchable, windows, page_size_cap, max_workers))
 
     for pod_cfg in pods:
         project_label = pod_cfg.get("project_label") or pod_cfg.get("name") or "(unnamed)"
@@ -686,46 +1236,44 @@ def invoke_aggregate_multi(request_data, *_, **__):
             })
             continue
 
-        # Current window
-        wf_rows, wf_err = _fetch_executions(
-            api_base_url, api_key, "execution/workflow-search",
-            since.isoformat(), until.isoformat(), page_size_cap,
-        )
-        ag_rows, ag_err = _fetch_executions(
-            api_base_url, api_key, "execution/agent-search",
-            since.isoformat(), until.isoformat(), page_size_cap,
-        )
-
-        # Previous window for delta
-        wf_prev, _ = _fetch_executions(
-            api_base_url, api_key, "execution/workflow-search",
-            prev_since.isoformat(), prev_until.isoformat(), page_size_cap,
-        )
-        ag_prev, _ = _fetch_executions(
-            api_base_url, api_key, "execution/agent-search",
-            prev_since.isoformat(), prev_until.isoformat(), page_size_cap,
-        )
-
-        rows = wf_rows + ag_rows
-        rows_prev = wf_prev + ag_prev
-        # Annotate each row with its source pod so cross-pod rankings
-        # can disambiguate same-named workflows running in different
-        # projects (e.g. "wc-bracket-event-details" exists in both
-        # sbot-stg and sports-interaction-v2 with different costs).
-        for r in rows:
-            r["_pod"] = project_label
-
-        pod_tokens = sum(_row_tokens(r) for r in rows)
-        pod_tokens_prev = sum(_row_tokens(r) for r in rows_prev)
-        pod_runs = len(rows)
+        if use_rollups:
+            pod = _pod_key(api_base_url, api_key)
+            pod_tokens = rollup_per_pod[pod]["tokens"]
+            pod_tokens_prev = rollup_per_pod[pod]["tokens_prev"]
+            pod_runs = rollup_per_pod[pod]["runs"]
+            wf_err = rollup_errors.get((pod, "execution/workflow-search"))
+            ag_err = rollup_errors.get((pod, "execution/agent-search"))
+        else:
+            scans = next(pod_scans)
+
+            # Current window
+            wf_rows, wf_err = scans[("execution/workflow-search", "current")]
+            ag_rows, ag_err = scans[("execution/agent-search", "current")]
+
+            # Previous window for delta
+            wf_prev, _ = scans[("execution/workflow-search", "previous")]
+            ag_prev, _ = scans[("execution/agent-search", "previous")]
+
+            rows = wf_rows + ag_rows
+            rows_prev = wf_prev + ag_prev
+            # Annotate each row with its source pod so cross-pod rankings
+            # can disambiguate same-named workflows running in different
+            # projects (e.g. "wc-bracket-event-details" exists in both
+            # sbot-stg and sports-interaction-v2 with different costs).
+            for r in rows:
+                r["_pod"] = project_label
+
+            pod_tokens = sum(_row_tokens(r) for r in rows)
+            pod_tokens_prev = sum(_row_tokens(r) for r in rows_prev)
+            pod_runs = len(rows)
+
+            all_rows.extend(rows)
+            all_rows_by_pod[project_label] = rows
 
         org_total_tokens += pod_tokens
         org_total_runs += pod_runs
         org_total_tokens_prev += pod_tokens_prev
 
-        all_rows.extend(rows)
-        all_rows_by_pod[project_label] = rows
-
         per_pod_results.append({
             "project_label": project_label,
             "runs": pod_runs,
@@ -739,6 +1287,9 @@ def invoke_aggregate_multi(request_data, *_, **__):
         if ag_err:
             notes.append(f"{project_label}: agent-search partial — {ag_err}")
 
+    if not use_rollups:
+        org_summary = _summarize_rows(all_rows, since, until, include_failed)
+
     # ---- Build metrics-report payload -----------------------------
 
     if period_mode == "previous_month":
@@ -797,7 +1348,7 @@ def invoke_aggregate_multi(request_data, *_, **__):
     })
 
     # 2. Top workflows across the org
-    by_name = _aggregate(all_rows, include_failed)
+    by_name = org_summary["by_name"]
     if by_name:
         head = by_name[:15]
         rows_for_table = [
@@ -822,7 +1373,7 @@ def invoke_aggregate_multi(request_data, *_, **__):
         })
 
     # 3. Per-day timeseries org-wide
-    by_day = _by_day(all_rows, since, until)
+    by_day = org_summary["by_day"]
     if by_day:
         sections.append({
             "title": "By day (org-wide)",
@@ -836,12 +1387,8 @@ def invoke_aggregate_multi(request_data, *_, **__):
         })
 
     # 4. Distribution stats org-wide
-    samples = [_row_tokens(r) for r in all_rows if _row_tokens(r) > 0]
-    if samples:
-        samples.sort()
-        p50 = samples[len(samples) // 2]
-        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
-        p_max = samples[-1]
+    if org_summary["percentiles"]:
+        p50, p95, p_max = org_summary["percentiles"]
         sections.append({
             "title": "Distribution (tokens per run, org-wide)",
             "stats": [
@@ -852,16 +1399,17 @@ def invoke_aggregate_multi(request_data, *_, **__):
         })
 
     # 5. Top consuming individual runs (highest single costs)
-    expensive = sorted(all_rows, key=_row_tokens, reverse=True)[:5]
-    if expensive and _row_tokens(expensive[0]) > 0:
+    expensive = org_summary["top_runs"]
+    if expensive and expensive[0]["tokens"] > 0:
         sections.append({
             "title": "Top consuming runs",
             "bullets": [
-                f"{r.get('_pod', '?')} · {_row_name(r)} — {_format_number(_row_tokens(r))} tokens ({(_row_date(r) or until).strftime('%b %-d %H:%M')})"
+                f"{r['pod']} · {r['name']} — {_format_number(r['tokens'])} tokens ({(r['date'] or until).strftime('%b %-d %H:%M')})"
                 for r in expensive
             ],
         })
 
+    notes.extend(rollup_notes)
     notes.append(f"Window: {since.isoformat()} → {until.isoformat()}")
     notes.append(f"Mode: {period_mode}")
     notes.append(f"Pods queried: {len(pods)}")
@@ -1,163 +1,303 @@
-def grep_nfl_markets(request_data):
+import hashlib
+import json
+import marshal
+import re
+import threading
+from collections import OrderedDict
+
+
+# NFL Market Configuration
+NFL_CONFIG = {
+    "moneyline": {
+        "market_types": ["money line period y", "moneyline", "money line"],
+        "periods": ["fulltime", "game", "match"]
+    },
+    "spread": {
+        "market_types": ["handicap period y", "spread", "point spread"],
+        "periods": ["fulltime", "game", "match"]
+    },
+    "total": {
+        "market_types": ["over/under points period y", "total period y", "total points"],
+        "periods": ["fulltime", "game", "match"],
+        "preferred_values": ["45.5", "47.5", "44.5", "46.5", "48.5", "43.5", "43", "45", "47"]
+    }
+}
+
+# (marketType, period), lowercased -> category
+_CATEGORY_BY_TYPE_PERIOD = {
+    (market_type.lower(), period.lower()): category
+    for category, config in NFL_CONFIG.items()
+    for market_type in config["market_types"]
+    for period in config["periods"]
+}
+
+_MARKET_TYPES = frozenset(market_type for market_type, _ in _CATEGORY_BY_TYPE_PERIOD)
+
+# Lower rank = higher priority
+_TOTAL_RANK = {value: rank for rank, value in enumerate(NFL_CONFIG["total"]["preferred_values"])}
+
+_VALUE_RE = re.compile(r'(\d+\.?\d*)')
+
+# Feed versions whose index / filter results are kept
+INDEX_CACHE_SIZE = 2
+RESULT_CACHE_SIZE = 16
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30}
+
+# feed hash -> _FeedIndex
+_index_cache = OrderedDict()
+
+# (feed hash, sport_id, competition_ids) -> JSON of the response data
+_result_cache = OrderedDict()
+
+_cache_lock = threading.Lock()
+
+
+def _feed_hash(fixtures):
+    """Content hash of the fixtures payload; any change in the feed changes it."""
+    try:
+        # Payloads decoded from equal JSON marshal to equal bytes; a layout
+        # difference could only cause a cache miss, never a false hit
+        payload = marshal.dumps(fixtures)
+    except ValueError:
+        payload = json.dumps(fixtures, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _ref_id(value):
+    """Id of a {"id": ...} reference, or the value itself."""
+    if isinstance(value, dict):
+        value = value.get("id")
+    return "" if value is None else str(value)
+
+
+def _cache_put(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+class _FeedIndex:
     """
-    Filter NFL markets from Bwin fixtures.
-    Returns: Moneyline, Spread (Point Spread), Total (Total Points)
-    
-    Extracts exactly 3 markets per game:
-    - 1 Moneyline (Money Line)
-    - 1 Spread (Point Spread)
-    - 1 Total (Total Points - preferring 45.5, 47.5, 44.5)
+    NFL-relevant markets of one feed version, indexed by sport, competition
+    and marketType.
+
+    ``markets[sport][competition][market_type]`` lists (fixture_pos,
+    market_pos, category) in feed order; only market types that can match a
+    category are indexed. ``fixtures`` holds per-fixture data by position.
     """
-    print("🔍 Filtering NFL markets...")
-    
-    params = request_data.get("params", {})
-    fixtures = params.get("fixtures", [])
-    
-    # NFL Market Configuration
-    NFL_CONFIG = {
-        "moneyline": {
-            "market_types": ["money line period y", "moneyline", "money line"],
-            "periods": ["fulltime", "game", "match"]
-        },
-        "spread": {
-            "market_types": ["handicap period y", "spread", "point spread"],
-            "periods": ["fulltime", "game", "match"]
-        },
-        "total": {
-            "market_types": ["over/under points period y", "total period y", "total points"],
-            "periods": ["fulltime", "game", "match"],
-            "preferred_values": ["45.5", "47.5", "44.5", "46.5", "48.5", "43.5", "43", "45", "47"]
-        }
-    }
-    
+
+    __slots__ = ("fixtures", "markets")
+
+    def __init__(self, fixtures):
+        self.fixtures = []
+        self.markets = {}
+
+        for fixture_pos, fixture in enumerate(fixtures):
+            fixture_id = str(fixture.get("id", {}).get("full", ""))
+            fixture_name = fixture.get("name", {}).get("text", "")
+            competition_name = fixture.get("competition", {}).get("name", {}).get("text", "")
+            markets = fixture.get("markets", [])
+            self.fixtures.append((fixture_id, fixture_name, competition_name, markets))
+
+            by_type = None
+            for market_pos, market in enumerate(markets):
+                market_type = market.get("marketType", "").lower()
+                if market_type not in _MARKET_TYPES:
+                    continue
+                category = _CATEGORY_BY_TYPE_PERIOD.get((market_type, market.get("period", "").lower()))
+                if category is None:
+                    continue
+                if by_type is None:
+                    by_competition = self.markets.setdefault(_ref_id(fixture.get("sport")), {})
+                    by_type = by_competition.setdefault(_ref_id(fixture.get("competition")), {})
+                by_type.setdefault(market_type, []).append((fixture_pos, market_pos, category))
+
+    def candidates(self, sport_id=None, competition_ids=None):
+        """Matching (fixture_pos, market_pos, category) in feed order."""
+        if sport_id is None:
+            by_competition_list = list(self.markets.values())
+        else:
+            by_competition_list = [self.markets.get(str(sport_id), {})]
+
+        found = []
+        for by_competition in by_competition_list:
+            if competition_ids is None:
+                by_type_list = by_competition.values()
+            else:
+                by_type_list = [by_competition[c] for c in competition_ids if c in by_competition]
+            for by_type in by_type_list:
+                for market_type in _MARKET_TYPES:
+                    found.extend(by_type.get(market_type, ()))
+        found.sort()
+        return found
+
+
+def _feed_index(feed_hash, fixtures):
+    with _cache_lock:
+        index = _index_cache.get(feed_hash)
+        if index is not None:
+            _index_cache.move_to_end(feed_hash)
+            return index
+
+    index = _FeedIndex(fixtures)
+
+    with _cache_lock:
+        _cache_put(_index_cache, feed_hash, index, INDEX_CACHE_SIZE)
+
+    return index
+
+
+def _market_value(market):
+    market_value = str(market.get("value", ""))
+
+    # For markets without 'value', try to extract from first option name (e.g., "Over 43")
+    if not market_value:
+        options = market.get("options", [])
+        if options:
+            first_option_name = options[0].get("name", {}).get("text", "")
+            # Extract number from "Over 43" or "Under 43.5"
+            match = _VALUE_RE.search(first_option_name)
+            if match:
+                market_value = match.group(1)
+
+    return market_value
+
+
+def _select_markets(index, sport_id, competition_ids, log):
+    """Pick one market per fixture and category, as data for the response."""
     # Store one market per fixture per category
     market_by_fixture_category = {}
-    
-    for fixture in fixtures:
-        fixture_id = str(fixture.get("id", {}).get("full", ""))
-        fixture_name = fixture.get("name", {}).get("text", "")
-        competition_name = fixture.get("competition", {}).get("name", {}).get("text", "")
-        
-        markets = fixture.get("markets", [])
-        
-        for market in markets:
-            market_type = market.get("marketType", "").lower()
-            period = market.get("period", "").lower()
-            market_value = str(market.get("value", ""))
-            
-            # For markets without 'value', try to extract from first option name (e.g., "Over 43")
-            if not market_value or market_value == "":
-                options = market.get("options", [])
-                if options and len(options) > 0:
-                    first_option_name = options[0].get("name", {}).get("text", "")
-                    # Extract number from "Over 43" or "Under 43.5"
-                    import re
-                    match = re.search(r'(\d+\.?\d*)', first_option_name)
-                    if match:
-                        market_value = match.group(1)
-            
-            # Determine market category
-            matched_category = None
-            
-            # Check Moneyline
-            if market_type in [mt.lower() for mt in NFL_CONFIG["moneyline"]["market_types"]]:
-                if period in [p.lower() for p in NFL_CONFIG["moneyline"]["periods"]]:
-                    matched_category = "moneyline"
-            
-            # Check Spread
-            elif market_type in [mt.lower() for mt in NFL_CONFIG["spread"]["market_types"]]:
-                if period in [p.lower() for p in NFL_CONFIG["spread"]["periods"]]:
-                    matched_category = "spread"
-            
-            # Check Total
-            elif market_type in [mt.lower() for mt in NFL_CONFIG["total"]["market_types"]]:
-                if period in [p.lower() for p in NFL_CONFIG["total"]["periods"]]:
-                    matched_category = "total"
-            
-            # Skip if not matched
-            if not matched_category:
-                continue
-            
-            # Deduplication key: fixture + category
-            dedup_key = f"{fixture_id}-{matched_category}"
-            
-            # Special handling for Total markets - prefer certain values
-            if matched_category == "total":
-                preferred_values = NFL_CONFIG["total"]["preferred_values"]
-                
-                should_use = False
-                
-                if dedup_key not in market_by_fixture_category:
-                    # No total yet, use this one
-                    should_use = True
-                else:
-                    # Compare with existing total
-                    existing_value = str(market_by_fixture_category[dedup_key].get("value", ""))
-                    
-                    # Calculate priority (lower index = higher priority)
-                    current_priority = preferred_values.index(market_value) if market_value in preferred_values else 999
-                    existing_priority = preferred_values.index(existing_value) if existing_value in preferred_values else 999
-                    
-                    # Replace if current is better
-                    if current_priority < existing_priority:
-                        should_use = True
-                        print(f"   → Replacing total {existing_value} with preferred {market_value} for {fixture_id}")
-                
-                if not should_use:
-                    print(f"   ⏭️  Skipping total {market_value} (keeping {market_by_fixture_category[dedup_key].get('value', '')})")
+    # Value of the stored total per dedup key
+    total_values = {}
+
+    for fixture_pos, market_pos, matched_category in index.candidates(sport_id, competition_ids):
+        fixture_id, fixture_name, competition_name, markets = index.fixtures[fixture_pos]
+        market = markets[market_pos]
+        market_value = _market_value(market)
+
+        # Deduplication key: fixture + category
+        dedup_key = f"{fixture_id}-{matched_category}"
+
+        # Special handling for Total markets - prefer certain values
+        if matched_category == "total":
+            if dedup_key in market_by_fixture_category:
+                existing_value = total_values[dedup_key]
+
+                # Replace only if current is better
+                if _TOTAL_RANK.get(market_value, 999) >= _TOTAL_RANK.get(existing_value, 999):
+                    log("debug", f"   ⏭️  Skipping total {market_value} (keeping {existing_value})")
                     continue
-            
-            # For moneyline and spread, skip duplicates
-            elif dedup_key in market_by_fixture_category:
-                print(f"   ⏭️  Skipping duplicate {matched_category} for {fixture_id}")
-                continue
-            
-            # Create unique market_id
-            market_name = market.get("name", {}).get("text", "").lower().replace(" ", "-")
-            market_value_clean = market_value.replace(" ", "")
-            unique_market_id = f"{fixture_id}-{matched_category}-{market_name}-{market_value_clean}"
-            
-            # Build market data object
-            market_data = {
-                **market,
-                "value": market_value,  # Add extracted value
-                "metadata": {
-                    "market_id": unique_market_id,
-                    "fixture_id": fixture_id,
-                    "sport_id": "11",
-                    "market_category": matched_category,
-                    "fixture_name": fixture_name,
-                    "competition_name": competition_name
-                },
-                "competition_name": competition_name,
-                "title": f"{fixture_name} | {market.get('name', {}).get('text', '')} {market_value}"
-            }
-            
-            # Store this market
-            market_by_fixture_category[dedup_key] = market_data
-            
-            print(f"✓ {matched_category.upper()}: {unique_market_id} | Value: {market_value}")
-    
-    # Convert dict to lists
+
+                log("debug", f"   → Replacing total {existing_value} with preferred {market_value} for {fixture_id}")
+
+            total_values[dedup_key] = market_value
+
+        # For moneyline and spread, skip duplicates
+        elif dedup_key in market_by_fixture_category:
+            log("debug", f"   ⏭️  Skipping duplicate {matched_category} for {fixture_id}")
+            continue
+
+        # Create unique market_id
+        market_name = market.get("name", {}).get("text", "").lower().replace(" ", "-")
+        market_value_clean = market_value.replace(" ", "")
+        unique_market_id = f"{fixture_id}-{matched_category}-{market_name}-{market_value_clean}"
+
+        # Build market data object
+        market_by_fixture_category[dedup_key] = {
+            **market,
+            "value": market_value,  # Add extracted value
+            "metadata": {
+                "market_id": unique_market_id,
+                "fixture_id": fixture_id,
+                "sport_id": "11",
+                "market_category": matched_category,
+                "fixture_name": fixture_name,
+                "competition_name": competition_name
+            },
+            "competition_name": competition_name,
+            "title": f"{fixture_name} | {market.get('name', {}).get('text', '')} {market_value}"
+        }
+
+        log("debug", f"✓ {matched_category.upper()}: {unique_market_id} | Value: {market_value}")
+
     market_odds = list(market_by_fixture_category.values())
-    market_ids = [m.get("metadata", {}).get("market_id", "") for m in market_odds]
-    
+    market_ids = [m["metadata"]["market_id"] for m in market_odds]
+
     # Count by category
     category_counts = {}
     for market in market_odds:
-        category = market.get("metadata", {}).get("market_category", "other")
+        category = market["metadata"]["market_category"]
         category_counts[category] = category_counts.get(category, 0) + 1
-    
-    print(f"\n✅ Filtered {len(market_odds)} NFL markets from {len(fixtures)} fixtures")
-    print(f"   Market breakdown: {category_counts}")
-    print(f"   Expected: {len(fixtures)} fixtures × 3 categories = {len(fixtures) * 3} markets")
-    
+
     return {
-        "status": True,
-        "data": {
-            "market_ids": market_ids,
-            "market_odds": market_odds,
-            "total_markets": len(market_odds),
-            "category_counts": category_counts
-        }
+        "market_ids": market_ids,
+        "market_odds": market_odds,
+        "total_markets": len(market_odds),
+        "category_counts": category_counts
     }
+
+
+def grep_nfl_markets(request_data):
+    """
+    Filter NFL markets from Bwin fixtures.
+    Returns: Moneyline, Spread (Point Spread), Total (Total Points)
+
+    Extracts exactly 3 markets per game:
+    - 1 Moneyline (Money Line)
+    - 1 Spread (Point Spread)
+    - 1 Total (Total Points - preferring 45.5, 47.5, 44.5)
+
+    The feed is hashed on every call. An unchanged feed returns the cached
+    result; a new feed version is indexed once by sport, competition and
+    marketType, and each filter only reads the matching index buckets.
+
+    Optional params:
+        sport_id: only fixtures of this sport (default: all)
+        competition_ids: only fixtures of these competitions (default: all)
+        log_level: "debug" | "info" (default) | "warning"
+    """
+    params = request_data.get("params", {})
+    fixtures = params.get("fixtures", [])
+
+    sport_id = params.get("sport_id")
+    sport_id = None if sport_id in (None, "") else str(sport_id)
+
+    competition_ids = params.get("competition_ids")
+    if isinstance(competition_ids, str):
+        competition_ids = [c.strip() for c in competition_ids.split(",") if c.strip()]
+    competition_ids = tuple(sorted(str(c) for c in competition_ids)) if competition_ids else None
+
+    log_threshold = LOG_LEVELS.get(str(params.get("log_level") or "info").lower(), 20)
+
+    def log(level, message):
+        if LOG_LEVELS[level] >= log_threshold:
+            print(message)
+
+    log("info", "🔍 Filtering NFL markets...")
+
+    feed_hash = _feed_hash(fixtures)
+    result_key = (feed_hash, sport_id, competition_ids)
+
+    with _cache_lock:
+        cached = _result_cache.get(result_key)
+        if cached is not None:
+            _result_cache.move_to_end(result_key)
+
+    if cached is not None:
+        data = json.loads(cached)
+        log("info", f"✅ Feed unchanged, reusing {data['total_markets']} NFL markets from {len(fixtures)} fixtures")
+        return {"status": True, "data": {**data, "cache_hit": True}}
+
+    index = _feed_index(feed_hash, fixtures)
+    data = _select_markets(index, sport_id, competition_ids, log)
+
+    with _cache_lock:
+        _cache_put(_result_cache, result_key, json.dumps(data, ensure_ascii=False, default=str), RESULT_CACHE_SIZE)
+
+    log("info", f"\n✅ Filtered {len(data['market_odds'])} NFL markets from {len(fixtures)} fixtures")
+    log("info", f"   Market breakdown: {data['category_counts']}")
+    log("info", f"   Expected: {len(fixtures)} fixtures × 3 categories = {len(fixtures) * 3} markets")
+
+    return {"status": True, "data": {**data, "cache_hit": False}}
@@ -1,16 +1,293 @@
+import functools
+import hashlib
+import json
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+# Entries kept per option, oldest dropped first
+HISTORY_SIZE = 100
+
+# Markets whose history is kept in memory between polls
+STORE_MAX_MARKETS = 5000
+
+# Entries written in one poll share a timestamp, so few distinct values are live
+TS_CACHE_SIZE = 4096
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30}
+
+_EPOCH = datetime(1970, 1, 1)
+
+_NAN = float("nan")
+
+# market_id -> _MarketHistory, least recently polled first
+_store = OrderedDict()
+
+_store_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=TS_CACHE_SIZE)
+def _parse_ts(ts):
+    """
+    ISO timestamp -> (microseconds since epoch as naive UTC, exact), where
+    exact tells whether formatting the micros gives ``ts`` back.
+    """
+    try:
+        parsed = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return 0, False
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    micros = (parsed - _EPOCH) // timedelta(microseconds=1)
+    return micros, _format_ts(micros) == ts
+
+
+@functools.lru_cache(maxsize=TS_CACHE_SIZE)
+def _format_ts(micros):
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _pack(value):
+    return _NAN if value is None else float(value)
+
+
+def _unpack(value):
+    return None if math.isnan(value) else value
+
+
+def _unpack_us(value):
+    # American odds are whole numbers
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def _entry_values(entry):
+    """(ts, odds, var, us, us_var) of a stored history entry, or None if unreadable."""
+    if isinstance(entry, dict):
+        us = entry.get("us")
+        if us is None:
+            us = entry.get("us_odds")  # Support old key
+        return entry.get("ts"), entry.get("odds"), entry.get("var", 0), us, entry.get("us_var", 0)
+    if isinstance(entry, list):
+        # Legacy format: [odds, variation, timestamp, usOdds]
+        return (
+            entry[2] if len(entry) > 2 else None,
+            entry[0] if len(entry) > 0 else None,
+            entry[1] if len(entry) > 1 else 0,
+            entry[3] if len(entry) > 3 else None,
+            0
+        )
+    return None
+
+
+class _OddsRing:
+    """
+    Bounded history of one option, in packed arrays.
+
+    Slot i holds (ts, odds, var, us, us_var); ts is microseconds since epoch,
+    missing values are NaN. Arrays grow up to ``size`` and are then
+    overwritten oldest first. Timestamps that do not round-trip through that
+    form are kept as-is in ``raw_ts`` so seeded history is written back
+    unchanged.
+
+    A ring seeded from a document starts out pending: it only knows the
+    newest prices and the entry count, and reads the rest of the stored
+    history with ``load`` once the option is about to be written again.
+    """
+
+    __slots__ = ("size", "ts", "odds", "var", "us", "us_var", "raw_ts", "start", "pending")
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.ts = array("q")
+        self.odds = array("d")
+        self.var = array("d")
+        self.us = array("d")
+        self.us_var = array("d")
+        self.raw_ts = None
+        self.start = 0
+        # (count, odds, us) while the stored history is not loaded
+        self.pending = None
+
+    @classmethod
+    def from_history(cls, history):
+        ring = cls()
+        if history:
+            values = _entry_values(history[-1])
+            odds, us = (values[1], values[3]) if values else (None, None)
+            ring.pending = (len(history), odds, us)
+        return ring
+
+    @property
+    def count(self):
+        return self.pending[0] if self.pending else len(self.ts)
+
+    def load(self, history):
+        """Fill a pending ring from the stored history it was seeded from."""
+        self.pending = None
+        rows = [values for values in map(_entry_values, history[-self.size:]) if values is not None]
+        raw_ts = {}
+        micros_column = []
+        for slot, row in enumerate(rows):
+            micros, exact = _parse_ts(row[0]) if isinstance(row[0], str) else (0, False)
+            micros_column.append(micros)
+            if not exact:
+                raw_ts[slot] = row[0]
+        self.ts = array("q", micros_column)
+        self.odds = array("d", [_pack(row[1]) for row in rows])
+        self.var = array("d", [_pack(row[2]) for row in rows])
+        self.us = array("d", [_pack(row[3]) for row in rows])
+        self.us_var = array("d", [_pack(row[4]) for row in rows])
+        self.raw_ts = raw_ts or None
+        self.start = 0
+
+    def append(self, ts, odds, var, us, us_var):
+        micros, exact = _parse_ts(ts) if isinstance(ts, str) else (0, False)
+
+        values = (micros, _pack(odds), _pack(var), _pack(us), _pack(us_var))
+        columns = (self.ts, self.odds, self.var, self.us, self.us_var)
+        if len(self.ts) < self.size:
+            slot = len(self.ts)
+            for column, value in zip(columns, values):
+                column.append(value)
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.size
+            for column, value in zip(columns, values):
+                column[slot] = value
+
+        if self.raw_ts:
+            self.raw_ts.pop(slot, None)
+        if not exact:
+            if self.raw_ts is None:
+                self.raw_ts = {}
+            self.raw_ts[slot] = ts
+
+    def last(self):
+        """(odds, us) of the newest entry, or (None, None) when empty."""
+        if self.pending:
+            return self.pending[1], self.pending[2]
+        if not self.ts:
+            return None, None
+        slot = (self.start - 1) % len(self.ts)
+        return _unpack(self.odds[slot]), _unpack_us(self.us[slot])
+
+    def entries(self):
+        """History in the stored document format, oldest first."""
+        start = self.start
+        columns = [column[start:] + column[:start] for column in (self.ts, self.odds, self.var, self.us, self.us_var)]
+        history = [
+            {
+                "odds": None if odds != odds else odds,
+                "var": None if var != var else var,
+                "us": None if us != us else int(us) if us.is_integer() else us,
+                "us_var": None if us_var != us_var else int(us_var) if us_var.is_integer() else us_var,
+                "ts": _format_ts(ts)
+            }
+            for ts, odds, var, us, us_var in zip(*columns)
+        ]
+        if self.raw_ts:
+            for slot, raw in self.raw_ts.items():
+                history[(slot - start) % len(history)]["ts"] = raw
+        return history
+
+
+class _MarketHistory:
+
+    __slots__ = ("options", "synced", "fields")
+
+    def __init__(self):
+        self.options = {}
+        # version_control.last_updated of the last document written for this market
+        self.synced = None
+        # _fields_hash of the market as last written
+        self.fields = None
+
+
+def _fields_hash(market):
+    """
+    Hash of everything in a market except option histories and version
+    control, so status, name or price metadata changes are seen even when
+    the odds are unchanged.
+    """
+    fields = {key: value for key, value in market.items() if key not in ("options", "version_control")}
+    fields["options"] = [
+        {key: value for key, value in option.items() if key != "history"} if isinstance(option, dict) else option
+        for option in market.get("options", [])
+    ]
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+def _option_histories(existing_doc):
+    """option id -> stored history array of a market document."""
+    if not existing_doc:
+        return {}
+    return {
+        existing_option.get("id"): existing_option.get("history") or []
+        for existing_option in existing_doc.get("value", {}).get("options", [])
+    }
+
+
+def _seed_market(existing_doc):
+    """Market history as stored in its document (empty for a new market)."""
+    market_history = _MarketHistory()
+    if existing_doc:
+        for option_id, history in _option_histories(existing_doc).items():
+            market_history.options[option_id] = _OddsRing.from_history(history)
+        market_history.synced = existing_doc.get("value", {}).get("version_control", {}).get("last_updated")
+        market_history.fields = _fields_hash(existing_doc.get("value", {}))
+    return market_history
+
+
+def _market_history(market_id, existing_doc):
+    """
+    In-memory history for a market, reseeded from its document unless the
+    document is the one this script wrote last.
+    """
+    doc_version = None
+    if existing_doc:
+        doc_version = existing_doc.get("value", {}).get("version_control", {}).get("last_updated")
+
+    market_history = _store.get(market_id) if market_id else None
+    if market_history is None or doc_version is None or market_history.synced != doc_version:
+        market_history = _seed_market(existing_doc)
+
+    if market_id:
+        _store[market_id] = market_history
+        _store.move_to_end(market_id)
+        while len(_store) > STORE_MAX_MARKETS:
+            _store.popitem(last=False)
+
+    return market_history
+
+
 def calculate_odds_delta(request_data):
     """
     Calculate odds delta and maintain history for market options.
-    
+
+    Option history lives in fixed-size ring buffers (last HISTORY_SIZE
+    entries) kept in memory between polls. A market's stored document is
+    only parsed again when it is not the one this script wrote last. An
+    entry is appended only when the price changes, and only markets whose
+    prices, options or other fields changed are returned, so unchanged
+    markets are not written again.
+
     Args:
         request_data (dict): Dictionary containing:
             - params (dict): Dictionary with:
                 - current_markets (list): List of current market data from API
                 - existing_documents (list): List of existing documents from DB
-    
+                - include_unchanged (bool): Also return markets without changes (default: False)
+                - log_level (str): "debug" | "info" (default) | "warning"
+
     Returns:
-        dict: Updated markets with history arrays in each option
-        
+        dict: Changed markets with history arrays in each option
+
     History format: Array of objects with structure:
         {
             "odds": 2.45,           # Decimal odds
@@ -20,140 +297,125 @@ def calculate_odds_delta(request_data):
             "ts": "2025-12-15T..."  # Timestamp (ISO 8601)
         }
     """
-    from datetime import datetime
-    
     params = request_data.get("params", {})
     current_markets = params.get("current_markets", [])
     existing_documents = params.get("existing_documents", [])
-    
-    print(f"Processing {len(current_markets)} markets")
-    print(f"Found {len(existing_documents)} existing docs")
-    
-    # Create a lookup dictionary for existing documents by market_id
+
+    include_unchanged = params.get("include_unchanged", False)
+    if isinstance(include_unchanged, str):
+        include_unchanged = include_unchanged.strip().lower() in ("1", "true", "yes")
+
+    log_threshold = LOG_LEVELS.get(str(params.get("log_level") or "info").lower(), 20)
+
+    def log(level, message):
+        if LOG_LEVELS[level] >= log_threshold:
+            print(message)
+
+    log("info", f"Processing {len(current_markets)} markets | {len(existing_documents)} existing docs")
+
     existing_lookup = {}
     for doc in existing_documents:
         market_id = doc.get("metadata", {}).get("market_id", "")
         if market_id:
             existing_lookup[str(market_id)] = doc
-            print(f"📚 Existing doc found: {market_id}")
-    
-    # Process each current market
+
     updated_markets = []
-    for market in current_markets:
-        market_id = str(market.get("metadata", {}).get("market_id", ""))
-        print(f"\n🔍 Processing market: {market_id}")
-        
-        # Find existing document for this market
-        existing_doc = existing_lookup.get(market_id)
-        print(f"   {'✓ Found existing doc' if existing_doc else '✗ No existing doc (new market)'}")
-        
-        # Process options in the market
-        options = market.get("options", [])
-        updated_options = []
-        
-        for option in options:
-            option_id = option.get("id")
-            price = option.get("price", {})
-            current_odds = price.get("odds", 0)
-            current_us_odds = price.get("usOdds", None)
-            
-            # Find matching option in existing document and copy its history
-            existing_history = []
-            previous_odds = None
-            previous_us_odds = None
-            
+    appended_count = 0
+    timestamp = datetime.utcnow().isoformat()
+
+    with _store_lock:
+
+        for market in current_markets:
+            market_id = str(market.get("metadata", {}).get("market_id", ""))
+            existing_doc = existing_lookup.get(market_id)
+            market_history = _market_history(market_id, existing_doc)
+
+            options = market.get("options", [])
+            rings = {}
+            appends = []
+
+            for option in options:
+                option_id = option.get("id")
+                price = option.get("price", {})
+                current_odds = price.get("odds", 0)
+                current_us_odds = price.get("usOdds", None)
+
+                ring = market_history.options.get(option_id)
+                if ring is None:
+                    ring = _OddsRing()
+                rings[option_id] = ring
+
+                previous_odds, previous_us_odds = ring.last()
+
+                if previous_odds is not None and current_odds is not None:
+                    odds_variation = round(current_odds - previous_odds, 2)
+                else:
+                    odds_variation = 0
+
+                if previous_us_odds is not None and current_us_odds is not None:
+                    us_odds_variation = current_us_odds - previous_us_odds
+                else:
+                    us_odds_variation = 0
+
+                # Only save to history if there's a variation OR it's the first entry
+                if ring.count == 0 or odds_variation != 0 or us_odds_variation != 0:
+                    appends.append((ring, current_odds, odds_variation, current_us_odds, us_odds_variation))
+                    log("debug", f"Market {market_id} | Option {option_id} | SAVED: odds={current_odds} ({odds_variation:+.2f}) | us_odds={current_us_odds} ({us_odds_variation:+})")
+                else:
+                    log("debug", f"Market {market_id} | Option {option_id} | SKIPPED (no change): odds={current_odds} | Total: {ring.count}")
+
+            # Options added or removed and any non-price field change also change the document
+            fields = _fields_hash(market)
+            changed = (
+                existing_doc is None
+                or bool(appends)
+                or rings.keys() != market_history.options.keys()
+                or fields != market_history.fields
+            )
+            market_history.options = rings
+            market_history.fields = fields
+
+            if not (changed or include_unchanged):
+                continue
+
+            if any(ring.pending for ring in rings.values()):
+                histories = _option_histories(existing_doc)
+                for option_id, ring in rings.items():
+                    if ring.pending:
+                        ring.load(histories.get(option_id, []))
+
+            for ring, odds, odds_variation, us_odds, us_odds_variation in appends:
+                ring.append(timestamp, odds, odds_variation, us_odds, us_odds_variation)
+            appended_count += len(appends)
+
+            for option in options:
+                option["history"] = rings[option.get("id")].entries()
+
+            # Add version control
+            existing_version_control = {}
             if existing_doc:
-                existing_options = existing_doc.get("value", {}).get("options", [])
-                for existing_option in existing_options:
-                    if existing_option.get("id") == option_id:
-                        # Copy the entire existing history
-                        existing_history = existing_option.get("history", [])
-                        if existing_history and len(existing_history) > 0:
-                            last_entry = existing_history[-1]
-                            # Handle both old array format and new object format
-                            if isinstance(last_entry, dict):
-                                previous_odds = last_entry.get("odds")
-                                previous_us_odds = last_entry.get("us") or last_entry.get("us_odds")  # Support old key
-                            elif isinstance(last_entry, list):
-                                # Legacy format: [odds, variation, timestamp, usOdds]
-                                previous_odds = last_entry[0] if len(last_entry) > 0 else None
-                                previous_us_odds = last_entry[3] if len(last_entry) > 3 else None
-                        print(f"Market {market_id} | Option {option_id} | Existing: {len(existing_history)} | Last odds: {previous_odds} ({previous_us_odds})")
-                        break
-            
-            # Calculate variations
-            if previous_odds is not None:
-                odds_variation = round(current_odds - previous_odds, 2)
-            else:
-                odds_variation = 0
-                print(f"Market {market_id} | Option {option_id} | First entry | Odds: {current_odds} ({current_us_odds})")
-            
-            # Calculate American odds variation
-            if previous_us_odds is not None and current_us_odds is not None:
-                us_odds_variation = current_us_odds - previous_us_odds
-            else:
-                us_odds_variation = 0
-            
-            # Start with existing history
-            new_history = list(existing_history)
-            timestamp = datetime.utcnow().isoformat()
-            
-            # Only save to history if there's a variation OR it's the first entry
-            is_first_entry = len(existing_history) == 0
-            has_variation = odds_variation != 0 or us_odds_variation != 0
-            
-            if is_first_entry or has_variation:
-                new_entry = {
-                    "odds": current_odds,
-                    "var": odds_variation,
-                    "us": current_us_odds,
-                    "us_var": us_odds_variation,
-                    "ts": timestamp
-                }
-                
-                new_history.append(new_entry)
-                
-                # Keep only last 100 entries
-                if len(new_history) > 100:
-                    new_history = new_history[-100:]
-                
-                us_odds_str = f"{current_us_odds} ({int(us_odds_variation):+d})" if current_us_odds is not None else "None"
-                print(f"Market {market_id} | Option {option_id} | ✅ SAVED: odds={current_odds} ({odds_variation:+.2f}) | us_odds={us_odds_str} | Total: {len(new_history)}")
-            else:
-                us_odds_str = f"{current_us_odds}" if current_us_odds is not None else "None"
-                print(f"Market {market_id} | Option {option_id} | ⏭️  SKIPPED (no change): odds={current_odds} | us_odds={us_odds_str} | Total: {len(new_history)}")
-            
-            # Set the history on the option
-            option["history"] = new_history
-            
-            updated_options.append(option)
-        
-        # Update market with processed options
-        market["options"] = updated_options
-        
-        # Add version control
-        existing_version_control = {}
-        if existing_doc:
-            existing_version_control = existing_doc.get("value", {}).get("version_control", {})
-        
-        update_count = existing_version_control.get("update_count", 0) + 1
-        market["version_control"] = {
-            **existing_version_control,
-            "update_count": update_count,
-            "last_updated": datetime.utcnow().isoformat(),
-            "last_sync_status": "completed"
-        }
-        
-        print(f"   ✅ Market {market_id} | Update count: {update_count} | Options: {len(market.get('options', []))}")
-        updated_markets.append(market)
-    
-    print(f"Processed {len(updated_markets)} markets")
-    
+                existing_version_control = existing_doc.get("value", {}).get("version_control", {})
+
+            update_count = existing_version_control.get("update_count", 0) + 1
+            market["version_control"] = {
+                **existing_version_control,
+                "update_count": update_count,
+                "last_updated": timestamp,
+                "last_sync_status": "completed"
+            }
+            market_history.synced = timestamp
+
+            log("debug", f"Market {market_id} | Update count: {update_count} | Options: {len(options)}")
+            updated_markets.append(market)
+
+    log("info", f"Processed {len(current_markets)} markets | {len(updated_markets)} returned | {appended_count} odds changes")
+
     return {
         "status": True,
         "data": {
             "markets": updated_markets,
-            "processed_count": len(updated_markets)
+            "processed_count": len(current_markets),
+            "returned_count": len(updated_markets),
+            "changes_count": appended_count
         }
     }
-
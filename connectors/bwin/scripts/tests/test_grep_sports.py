@@ -0,0 +1,107 @@
+"""Tests for grep-sports: the indexed, cached filter against the original scan.
+
+Expected selections were recorded from the implementation that scanned every
+market of every fixture on each call, before feeds were indexed and cached.
+"""
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import os
+import random
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "grep_sports",
+    os.path.join(_parent_dir, "grep-sports.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+grep_nfl_markets = _module.grep_nfl_markets
+
+_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+TYPES = ["Money Line Period Y", "moneyline", "Handicap Period Y", "Spread", "Over/Under Points Period Y",
+         "Total Period Y", "total points", "Player Props", "3Way", "Half Time"]
+PERIODS = ["FullTime", "Game", "Match", "FirstHalf", "Quarter1"]
+VALUES = ["", "45.5", "47.5", "44.5", "43", "50.5", "-3.5", "7"]
+
+
+def _feed(seed, sports=(11,)):
+    rnd = random.Random(seed)
+    fixtures = []
+    count = rnd.randint(0, 12)
+    for i in range(count):
+        markets = []
+        for j in range(rnd.randint(5, 40)):
+            market = {
+                "id": j,
+                "marketType": rnd.choice(TYPES),
+                "period": rnd.choice(PERIODS),
+                "name": {"text": rnd.choice(["Total Points", "Money Line", "Spread", "Over Under"])},
+                "options": [{"id": k, "name": {"text": rnd.choice(["Over 43.5", "Under 45", "Team A", "+3.5"])},
+                             "price": {"odds": 1.9}} for k in range(2)],
+            }
+            value = rnd.choice(VALUES)
+            if value:
+                market["value"] = value
+            markets.append(market)
+        fixtures.append({
+            "id": {"full": f"2:{rnd.randint(1, count)}"},
+            "name": {"text": f"A vs B {i}"},
+            "sport": {"id": rnd.choice(sports)},
+            "competition": {"id": rnd.choice([1, 2, 3]), "name": {"text": "NFL"}},
+            "markets": markets,
+        })
+    return fixtures
+
+
+def _summary(data):
+    """Selected market ids, the source market each came from, and category counts."""
+    return {
+        "market_ids": data["market_ids"],
+        "sources": [[m["metadata"]["fixture_id"], m["id"]] for m in data["market_odds"]],
+        "category_counts": data["category_counts"],
+        "total_markets": data["total_markets"],
+    }
+
+
+def _grep(**params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return grep_nfl_markets({"params": params})
+
+
+with open(os.path.join(_FIXTURES, "grep_sports_expected.json")) as _f:
+    _EXPECTED = json.load(_f)
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_matches_full_scan(seed):
+    fixtures = _feed(int(seed))
+    first = _grep(fixtures=copy.deepcopy(fixtures))
+    assert _summary(first["data"]) == _EXPECTED[seed]
+
+    second = _grep(fixtures=copy.deepcopy(fixtures))
+    assert second["data"]["cache_hit"] is True
+    assert second["data"] == dict(first["data"], cache_hit=True)
+
+
+def test_filters_match_prefiltered_feed():
+    fixtures = _feed(99, sports=(11, 4, 7))
+    prefiltered = [f for f in fixtures if f["sport"]["id"] == 11 and f["competition"]["id"] in (1, 3)]
+    expected = _grep(fixtures=copy.deepcopy(prefiltered))["data"]
+    result = _grep(fixtures=copy.deepcopy(fixtures), sport_id=11, competition_ids="3,1")["data"]
+    assert _summary(result) == _summary(expected)
+
+
+def test_cached_result_is_not_shared():
+    fixtures = _feed(3)
+    first = _grep(fixtures=fixtures)
+    assert first["data"]["market_odds"]
+    first["data"]["market_odds"][0]["metadata"]["market_id"] = "changed"
+    again = _grep(fixtures=fixtures)
+    assert again["data"]["market_odds"][0]["metadata"]["market_id"] != "changed"
@@ -0,0 +1,119 @@
+"""Tests for odds-delta: ring-buffer history against the original list history.
+
+Expected histories were recorded from the implementation that rebuilt every
+option's history list from the stored documents on each poll.
+"""
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import os
+import random
+
+import pytest
+
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "odds_delta",
+    os.path.join(_parent_dir, "odds-delta.py")
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+calculate_odds_delta = _module.calculate_odds_delta
+
+_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _poll_markets(rnd, prices):
+    for options in prices.values():
+        for price in options.values():
+            if rnd.random() < 0.15:
+                price[0] = round(price[0] + rnd.choice([-0.05, 0.05]), 2)
+            if rnd.random() < 0.1 and price[1] is not None:
+                price[1] += rnd.choice([-5, 5])
+    return [
+        {"metadata": {"market_id": market_id},
+         "options": [{"id": option_id, "price": {"odds": p[0], "usOdds": p[1]}} for option_id, p in options.items()]}
+        for market_id, options in prices.items()
+    ]
+
+
+def _simulate(seed, polls=25, reset=None):
+    """Final option histories, without timestamps, after `polls` polls of a seeded feed.
+
+    Returned markets are written back as the stored documents, as the
+    workflow does. `reset()` (when given) runs before every 5th poll.
+    """
+    rnd = random.Random(seed)
+    prices = {
+        f"m{i}": {j: [round(rnd.uniform(1.2, 5), 2), rnd.choice([None, rnd.choice([-1, 1]) * rnd.randint(100, 300)])]
+                  for j in range(2)}
+        for i in range(6)
+    }
+    documents = {}
+    for poll in range(polls):
+        current = _poll_markets(rnd, prices)
+        if reset and poll % 5 == 0:
+            reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = calculate_odds_delta({"params": {"current_markets": copy.deepcopy(current),
+                                                      "existing_documents": copy.deepcopy(list(documents.values()))}})
+        for market in result["data"]["markets"]:
+            documents[market["metadata"]["market_id"]] = {"metadata": market["metadata"], "value": json.loads(json.dumps(market))}
+    return {
+        market_id: {str(option["id"]): [[e["odds"], e["var"], e["us"], e["us_var"]] for e in option["history"]]
+                    for option in doc["value"]["options"]}
+        for market_id, doc in sorted(documents.items())
+    }
+
+
+with open(os.path.join(_FIXTURES, "odds_delta_expected.json")) as _f:
+    _EXPECTED = json.load(_f)
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_history_matches_list_history(seed):
+    _module._store.clear()
+    assert _simulate(int(seed)) == _EXPECTED[seed]
+
+
+@pytest.mark.parametrize("seed", sorted(_EXPECTED, key=int))
+def test_history_survives_store_reset(seed):
+    # A cold worker rebuilds the rings from the stored documents
+    assert _simulate(int(seed), reset=_module._store.clear) == _EXPECTED[seed]
+
+
+def _market(odds, name="Match Result"):
+    return {"metadata": {"market_id": "m1"}, "name": name,
+            "options": [{"id": 1, "price": {"odds": odds, "usOdds": None}}]}
+
+
+def _poll(market, documents, **params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = calculate_odds_delta({"params": {"current_markets": [market], "existing_documents": documents, **params}})
+    return result["data"]["markets"]
+
+
+def test_history_keeps_last_entries():
+    _module._store.clear()
+    documents = []
+    for poll in range(_module.HISTORY_SIZE + 30):
+        returned = _poll(_market(round(1.5 + poll * 0.01, 2)), documents)
+        documents = [{"metadata": m["metadata"], "value": json.loads(json.dumps(m))} for m in returned]
+    history = documents[0]["value"]["options"][0]["history"]
+    assert len(history) == _module.HISTORY_SIZE
+    assert history[0]["odds"] == 1.8
+    assert history[-1]["odds"] == round(1.5 + (_module.HISTORY_SIZE + 29) * 0.01, 2)
+
+
+def test_only_changed_markets_are_returned():
+    _module._store.clear()
+    returned = _poll(_market(2.0), [])
+    documents = [{"metadata": m["metadata"], "value": json.loads(json.dumps(m))} for m in returned]
+
+    assert _poll(_market(2.0), documents) == []
+    assert len(_poll(_market(2.0), documents, include_unchanged=True)) == 1
+    # A non-price change is still a change
+    assert len(_poll(_market(2.0, name="1X2"), documents)) == 1
@@ -1,14 +1,299 @@
+import importlib.util
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
 import fastf1
 
 import pandas as pd
 
 
+DEFAULT_CACHE_DIR = os.environ.get("FASTF1_CACHE_DIR", "/tmp/fastf1-cache")
+DEFAULT_LOG_LEVEL = "WARNING"
+SESSION_CACHE_SIZE = 8
+
+# What each command needs from session.load(); results and driver info are
+# always loaded by FastF1, "event" only needs the schedule lookup.
+LOAD_PROFILES = {
+    "event": None,
+    "results": {"laps": False, "telemetry": False, "weather": False, "messages": False},
+    "laps": {"laps": True, "telemetry": False, "weather": False, "messages": False},
+    "telemetry": {"laps": True, "telemetry": True, "weather": False, "messages": False},
+}
+
+_configured = {"cache_dir": None, "log_level": None}
+_configure_lock = threading.Lock()
+
+# In-process LRU of loaded sessions: key -> (session, loaded parts)
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+# key -> [lock, number of callers holding or waiting on it]
+_session_locks = {}
+
+
+def _configure_fastf1(params):
+    """Enable the on-disk HTTP/parse cache and set the log level once per process."""
+    cache_dir = params.get('cache_dir') or DEFAULT_CACHE_DIR
+    log_level = str(params.get('log_level') or DEFAULT_LOG_LEVEL).upper()
+
+    with _configure_lock:
+        if _configured["cache_dir"] != cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            fastf1.Cache.enable_cache(cache_dir)
+            _configured["cache_dir"] = cache_dir
+        if _configured["log_level"] != log_level:
+            fastf1.set_log_level(log_level)
+            _configured["log_level"] = log_level
+
+
+def _session_key(year, event, session_type):
+    event_key = event if isinstance(event, int) else str(event).strip().lower()
+    return (int(year), event_key, str(session_type).strip().upper())
+
+
+def _get_loaded_session(year, event, session_type, profile):
+    """
+    Return a session loaded with at least what `profile` needs.
+
+    Sessions are kept in an LRU keyed by (year, event, session_type); a cached
+    session is only loaded again when the profile asks for parts it lacks.
+    Cached sessions are never loaded in place: an upgrade loads a fresh
+    Session and swaps the cache entry, so callers still reading the old one
+    are unaffected.
+    """
+    key = _session_key(year, event, session_type)
+    needed = LOAD_PROFILES[profile]
+
+    with _sessions_lock:
+        entry = _session_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    key_lock = entry[0]
+
+    try:
+        # Concurrent requests for the same session wait for a single load
+        with key_lock:
+            with _sessions_lock:
+                cached = _sessions.get(key)
+                if cached:
+                    _sessions.move_to_end(key)
+
+            if cached:
+                session, loaded = cached
+            else:
+                session, loaded = fastf1.get_session(year, event, session_type), None
+
+            if needed is not None:
+                if loaded is None:
+                    session.load(**needed)
+                    loaded = dict(needed)
+                elif any(wanted and not loaded.get(part) for part, wanted in needed.items()):
+                    loaded = {part: bool(loaded.get(part) or needed.get(part)) for part in needed}
+                    session = fastf1.get_session(year, event, session_type)
+                    session.load(**loaded)
+
+            with _sessions_lock:
+                _sessions[key] = (session, loaded)
+                _sessions.move_to_end(key)
+                while len(_sessions) > SESSION_CACHE_SIZE:
+                    evicted, _ = _sessions.popitem(last=False)
+                    # A lock still in use stays until its last user releases it
+                    if _session_locks.get(evicted, (None, 1))[1] == 0:
+                        del _session_locks[evicted]
+    finally:
+        with _sessions_lock:
+            entry[1] -= 1
+            if entry[1] == 0 and key not in _sessions:
+                _session_locks.pop(key, None)
+
+    return session
+
+
+LAP_RECORD_COLUMNS = [
+    ("driver", 'Driver'),
+    ("team", 'Team'),
+    ("lap_number", 'LapNumber'),
+    ("lap_time", 'LapTime'),
+    ("sector_1_time", 'Sector1Time'),
+    ("sector_2_time", 'Sector2Time'),
+    ("sector_3_time", 'Sector3Time'),
+    ("compound", 'Compound'),
+    ("tyre_life", 'TyreLife'),
+    ("is_personal_best", 'IsPersonalBest'),
+    ("position", 'Position'),
+]
+LAP_TIME_COLUMNS = {'LapTime', 'Sector1Time', 'Sector2Time', 'Sector3Time'}
+
+
+def _laps_to_records(laps):
+    """Convert a Laps DataFrame to per-lap dicts column-wise instead of row by row."""
+    frame = pd.DataFrame(index=laps.index)
+    for name, column in LAP_RECORD_COLUMNS:
+        if column not in laps.columns:
+            frame[name] = False if column == 'IsPersonalBest' else ''
+            continue
+        values = laps[column]
+        if column in LAP_TIME_COLUMNS:
+            values = values.map(str)
+        elif column == 'IsPersonalBest':
+            values = values.astype(bool)
+        frame[name] = values
+    return frame.to_dict('records')
+
+
+CAR_CHANNELS = ['Speed', 'RPM', 'nGear', 'Throttle', 'Brake', 'DRS']
+POS_CHANNELS = ['X', 'Y', 'Z']
+TELEMETRY_CHANNELS = CAR_CHANNELS + POS_CHANNELS + ['Distance']
+# File formats are optional: both are written by pyarrow, which is not a
+# dependency of the connector and must be installed alongside it
+FILE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if v not in (None, '')]
+    return [value]
+
+
+def _filter_laps(laps, drivers, lap_start=None, lap_end=None):
+    """Apply driver and lap-range filters before anything is serialized."""
+    if len(drivers) == 1:
+        laps = laps.pick_driver(drivers[0])
+    elif drivers:
+        laps = laps.pick_drivers(drivers)
+    if lap_start not in (None, ''):
+        laps = laps[laps['LapNumber'] >= int(lap_start)]
+    if lap_end not in (None, ''):
+        laps = laps[laps['LapNumber'] <= int(lap_end)]
+    return laps
+
+
+def _timedelta_ms(series):
+    return (series.dt.total_seconds() * 1000).round().astype('Int64')
+
+
+def _column_values(series):
+    """Column as a JSON-ready list, missing values as None."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _laps_frame(laps):
+    """Laps as a compact frame: lap and sector times in integer milliseconds."""
+    frame = pd.DataFrame(index=laps.index)
+    for name, column in LAP_RECORD_COLUMNS:
+        if column in LAP_TIME_COLUMNS:
+            name = f"{name}_ms"
+            if column in laps.columns:
+                frame[name] = _timedelta_ms(laps[column])
+            else:
+                frame[name] = pd.Series(pd.NA, index=laps.index, dtype='Int64')
+        elif column not in laps.columns:
+            frame[name] = None
+        elif column == 'LapNumber':
+            frame[name] = laps[column].round().astype('Int64')
+        elif column == 'IsPersonalBest':
+            frame[name] = laps[column].eq(True)
+        else:
+            frame[name] = laps[column]
+    return frame.reset_index(drop=True)
+
+
+def _telemetry_frame(laps, channels):
+    """Telemetry samples of the given laps, tagged with driver and lap number."""
+    frames = []
+    needs_pos = any(channel in POS_CHANNELS for channel in channels)
+
+    for driver in laps['Driver'].dropna().unique():
+        driver_laps = laps[laps['Driver'] == driver]
+        bounds = (
+            driver_laps[['LapNumber', 'LapStartTime', 'Time']]
+            .dropna()
+            .rename(columns={'Time': 'LapEndTime'})
+            .sort_values('LapStartTime')
+        )
+        if bounds.empty:
+            continue
+
+        # One slice per driver covering the selected laps, not one per lap
+        telemetry = driver_laps.get_car_data()
+        if needs_pos:
+            telemetry = telemetry.merge_channels(driver_laps.get_pos_data())
+        if 'Distance' in channels:
+            telemetry = telemetry.add_distance()
+
+        samples = pd.DataFrame(telemetry[['SessionTime'] + channels]).sort_values('SessionTime')
+        # merge_asof needs both keys at the same resolution
+        samples['SessionTime'] = samples['SessionTime'].astype('timedelta64[ns]')
+        bounds['LapStartTime'] = bounds['LapStartTime'].astype('timedelta64[ns]')
+        tagged = pd.merge_asof(
+            samples,
+            bounds,
+            left_on='SessionTime',
+            right_on='LapStartTime',
+            direction='backward',
+        )
+        # Drop samples that fall between non-selected laps
+        tagged = tagged[tagged['SessionTime'] <= tagged['LapEndTime']]
+
+        frame = pd.DataFrame({
+            'driver': driver,
+            'lap_number': tagged['LapNumber'].round().astype('Int64'),
+            'session_time_ms': _timedelta_ms(tagged['SessionTime']),
+        })
+        for channel in channels:
+            frame[channel] = tagged[channel]
+        frames.append(frame)
+
+    if not frames:
+        columns = ['driver', 'lap_number', 'session_time_ms'] + channels
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _output_format_error(output_format, formats):
+    """Message for an output_format that cannot be served, else None."""
+    if output_format not in formats and output_format not in FILE_FORMATS:
+        return f"Unsupported output_format: {output_format}"
+    if output_format in FILE_FORMATS and importlib.util.find_spec("pyarrow") is None:
+        return f"output_format '{output_format}' requires pyarrow, which is not installed; use one of {list(formats)}"
+    return None
+
+
+def _frame_output(frame, output_format, prefix):
+    """Serialize a frame as columnar JSON or write it to the work directory."""
+    if output_format in FILE_FORMATS:
+        root = Path(os.getenv("MACHINA_WORK_DIR", os.getcwd())).expanduser().resolve()
+        output_dir = root / "fastf1"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output = output_dir / f"{prefix}-{uuid.uuid4().hex}{FILE_FORMATS[output_format]}"
+        if output_format == "parquet":
+            frame.to_parquet(output, index=False)
+        else:
+            frame.to_feather(output)
+        return {
+            "format": output_format,
+            "file_path": str(output.relative_to(root)),
+            "file_name": output.name,
+            "columns": list(frame.columns),
+            "row_count": len(frame),
+        }
+
+    return {
+        "format": "columnar",
+        "columns": {column: _column_values(frame[column]) for column in frame.columns},
+        "row_count": len(frame),
+    }
+
+
 def get_session_data(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
-        
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\nsession_data params\n\n", params)
         
         year = params.get('session_year', 2019)
@@ -17,9 +302,8 @@ def get_session_data(request_data):
         
         print(f"\n\nUsing year: {year}, event: {event}, session_type: {session_type}\n\n")
         
-        session = fastf1.get_session(year, event, session_type)
-        
-        session.load()
+        # Only event metadata is returned, so the session is not loaded
+        session = _get_loaded_session(year, event, session_type, "event")
         
         result = {
             "session": str(session),
@@ -45,10 +329,8 @@ def get_session_data(request_data):
 
 def get_driver_info(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
-        
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\ndriver_info params\n\n", params)
         
         year = params.get('year', 2023)
@@ -107,10 +389,8 @@ def get_driver_info(request_data):
 
 def get_team_info(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
-        
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\nteam_info params\n\n", params)
         
         year = params.get('year', 2023)
@@ -161,10 +441,8 @@ def get_team_info(request_data):
 
 def get_race_schedule(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
-        
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\nrace_schedule params\n\n", params)
         
         year = params.get('year', 2023)
@@ -203,49 +481,33 @@ def get_race_schedule(request_data):
 
 def get_lap_data(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
-        
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\nlap_data params\n\n", params)
         
         year = params.get('year', 2023)
         event = params.get('event', 'Monza')
         session_type = params.get('session_type', 'R')
         driver = params.get('driver')
+        output_format = str(params.get('output_format') or 'records').lower()
         
         print(f"\n\nUsing year: {year}, event: {event}, session_type: {session_type}, driver: {driver}\n\n")
         
-        # Get session
-        session = fastf1.get_session(year, event, session_type)
-        session.load()
+        format_error = _output_format_error(output_format, ('records', 'columnar'))
+        if format_error:
+            return {"status": False, "data": None, "message": format_error}
         
-        if driver:
-            # Get laps for specific driver
-            laps = session.laps.pick_driver(driver)
-        else:
-            # Get all laps
-            laps = session.laps
-        
-        # Convert laps DataFrame to list of dictionaries
-        laps_list = []
-        for _, lap in laps.iterrows():
-            lap_data = {
-                "driver": lap.get('Driver', ''),
-                "team": lap.get('Team', ''),
-                "lap_number": lap.get('LapNumber', ''),
-                "lap_time": str(lap.get('LapTime', '')),
-                "sector_1_time": str(lap.get('Sector1Time', '')),
-                "sector_2_time": str(lap.get('Sector2Time', '')),
-                "sector_3_time": str(lap.get('Sector3Time', '')),
-                "compound": lap.get('Compound', ''),
-                "tyre_life": lap.get('TyreLife', ''),
-                "is_personal_best": bool(lap.get('IsPersonalBest', False)),
-                "position": lap.get('Position', '')
-            }
-            laps_list.append(lap_data)
+        # Get session (laps only, no telemetry, weather or messages)
+        session = _get_loaded_session(year, event, session_type, "laps")
         
-        return {"status": True, "data": laps_list, "message": f"Lap data retrieved successfully"}
+        laps = _filter_laps(session.laps, _as_list(driver), params.get('lap_start'), params.get('lap_end'))
+        
+        if output_format == 'records':
+            laps_list = _laps_to_records(laps)
+            return {"status": True, "data": laps_list, "message": f"Lap data retrieved successfully"}
+        
+        lap_data = _frame_output(_laps_frame(laps), output_format, "laps")
+        return {"status": True, "data": lap_data, "message": f"Lap data retrieved successfully"}
         
     except Exception as e:
         print(f"Error getting lap data: {str(e)}")
@@ -259,12 +521,53 @@ def get_lap_data(request_data):
         }
 
 
-def get_race_results(request_data):
+def get_telemetry_data(request_data):
     try:
-        # Enable FastF1 logging
-        fastf1.set_log_level('DEBUG')
+        params = request_data.get('params', {})
+        _configure_fastf1(params)
+        print("\n\ntelemetry_data params\n\n", params)
         
+        year = params.get('year', 2023)
+        event = params.get('event', 'Monza')
+        session_type = params.get('session_type', 'R')
+        drivers = _as_list(params.get('driver'))
+        channels = _as_list(params.get('channels')) or list(CAR_CHANNELS)
+        output_format = str(params.get('output_format') or 'columnar').lower()
+        
+        print(f"\n\nUsing year: {year}, event: {event}, session_type: {session_type}, drivers: {drivers}, channels: {channels}\n\n")
+        
+        unknown = [channel for channel in channels if channel not in TELEMETRY_CHANNELS]
+        if unknown:
+            return {"status": False, "data": None, "message": f"Unknown telemetry channels: {unknown}. Available: {TELEMETRY_CHANNELS}"}
+        format_error = _output_format_error(output_format, ('columnar',))
+        if format_error:
+            return {"status": False, "data": None, "message": format_error}
+        
+        # Get session (laps and telemetry, no weather or messages)
+        session = _get_loaded_session(year, event, session_type, "telemetry")
+        
+        laps = _filter_laps(session.laps, drivers, params.get('lap_start'), params.get('lap_end'))
+        
+        telemetry_data = _frame_output(_telemetry_frame(laps, channels), output_format, "telemetry")
+        
+        return {"status": True, "data": telemetry_data, "message": f"Telemetry data retrieved successfully"}
+        
+    except Exception as e:
+        print(f"Error getting telemetry data: {str(e)}")
+        print(f"Error type: {type(e)}")
+        import traceback
+        print(f"Full traceback: {traceback.format_exc()}")
+        return {
+            "status": False,
+            "data": f"Error: {str(e)}",
+            "message": "Error getting telemetry data"
+        }
+
+
+def get_race_results(request_data):
+    try:
         params = request_data.get('params', {})
+        _configure_fastf1(params)
         print("\n\nrace_results params\n\n", params)
         
         year = int(params.get('year', 2023))
@@ -272,9 +575,8 @@ def get_race_results(request_data):
         
         print(f"\n\nUsing year: {year}, event: {event}\n\n")
         
-        # Get session
-        session = fastf1.get_session(year, event, 'R')
-        session.load()
+        # Get session (results only)
+        session = _get_loaded_session(year, event, 'R', "results")
         
         # Get race results
         results = session.results
@@ -1,11 +1,261 @@
 import requests
 import json
 import gzip
-from io import BytesIO
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "https://www.goalserve.com/getfeed"
 INPLAY_URL = "http://inplay.goalserve.com"
 
+POOL_SIZE = 16
+STREAM_CHUNK_SIZE = 64 * 1024
+# Removed matches/markets kept so late pollers still see the removal
+MAX_TOMBSTONES = 5000
+
+_session = None
+_session_lock = threading.Lock()
+
+# Seconds a successful response stays fresh, per endpoint. Reference data
+# changes a few times a day, live feeds every few seconds.
+CACHE_TTLS = {
+    "leagues_mapping": 6 * 3600,
+    "seasons": 6 * 3600,
+    "historical": 24 * 3600,
+    "fixtures": 3600,
+    "inplay_match_result": 3600,
+    "standings": 600,
+    "topscorers": 600,
+    "inplay_mapping": 60,
+    "pregame_odds": 30,
+    "live_stats": 10,
+    "match_stats": 10,
+    "livescores": 5,
+}
+MAX_CACHE_ENTRIES = 512
+DEFAULT_MAX_WORKERS = 8
+
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Per-sport inplay state for diff mode, see _apply_inplay_snapshot
+_inplay_states = {}
+_inplay_lock = threading.Lock()
+
+
+def _get_session():
+    """Module-level pooled session so repeated calls reuse connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _fetch_json(endpoint, url, query_params, params, timeout=30):
+    """
+    GET a JSON endpoint through the pooled session and the TTL cache.
+
+    The TTL comes from CACHE_TTLS and can be overridden per call with the
+    `cache_ttl` param (0 disables caching). Only successful responses are
+    cached, as raw bytes parsed on every hit, so callers that mutate the
+    returned data never touch the cache.
+    """
+    try:
+        ttl = float(params["cache_ttl"])
+    except (KeyError, TypeError, ValueError):
+        ttl = CACHE_TTLS.get(endpoint, 0)
+    cache_key = (url, tuple(sorted((query_params or {}).items())))
+
+    if ttl > 0:
+        with _cache_lock:
+            cached = _response_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                _response_cache.move_to_end(cache_key)
+                body = cached[1]
+            else:
+                body = None
+        if body is not None:
+            return {"status": True, "data": json.loads(body)}
+
+    try:
+        response = _get_session().get(url, params=query_params, timeout=timeout)
+        response.raise_for_status()
+
+        body = response.content
+        data = json.loads(body)
+
+    except requests.exceptions.RequestException as e:
+        return {"status": False, "message": f"Request failed: {str(e)}"}
+    except json.JSONDecodeError as e:
+        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+
+    if ttl > 0:
+        with _cache_lock:
+            _response_cache[cache_key] = (time.monotonic() + ttl, body)
+            _response_cache.move_to_end(cache_key)
+            while len(_response_cache) > MAX_CACHE_ENTRIES:
+                _response_cache.popitem(last=False)
+
+    return {"status": True, "data": data}
+
+
+def _read_gzip_json(response):
+    """
+    Inflate a gzip body chunk by chunk while it downloads, then parse it.
+
+    Inflated chunks are appended to a single bytearray, so the compressed
+    payload is never buffered as a whole and no joined copy of the body is
+    made; the JSON is parsed once the download is complete, straight from
+    those bytes. Bodies that were already decoded (Content-Encoding: gzip)
+    are parsed as they are.
+    """
+    decompressor = None
+    body = bytearray()
+    started = False
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        if not chunk:
+            continue
+        if not started:
+            started = True
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body += decompressor.decompress(chunk) if decompressor else chunk
+    if decompressor:
+        body += decompressor.flush()
+        if not decompressor.eof:
+            raise gzip.BadGzipFile("Truncated gzip stream")
+    return json.loads(body)
+
+
+def _keyed(collection, id_fields=("id",)):
+    """Index a dict or list of entities by id; dicts are already keyed."""
+    if isinstance(collection, dict):
+        return collection
+    keyed = {}
+    if isinstance(collection, list):
+        for idx, item in enumerate(collection):
+            key = None
+            if isinstance(item, dict):
+                key = item.get("id") or (item.get("info") or {}).get("id")
+            keyed[str(key if key is not None else idx)] = item
+    return keyed
+
+
+def _new_inplay_state():
+    return {"epoch": uuid.uuid4().hex, "seq": 0, "matches": {}, "removed": {}}
+
+
+def _apply_inplay_snapshot(state, data):
+    """
+    Fold a full inplay snapshot into the per-sport state.
+
+    Every match and market remembers the sequence number of its last change.
+    A match whose payload is unchanged is skipped with a single comparison,
+    so only changed matches are walked market by market. Returns the number
+    of changed matches.
+    """
+    events = _keyed(data.get("events") if isinstance(data, dict) else None)
+    seq = state["seq"] + 1
+    matches = state["matches"]
+    changed = 0
+
+    for match_id, event in events.items():
+        entry = matches.get(match_id)
+        if entry is not None and entry["event"] == event:
+            continue
+
+        changed += 1
+        payload = event if isinstance(event, dict) else {"value": event}
+        fields = {k: v for k, v in payload.items() if k != "odds"}
+        markets = _keyed(payload.get("odds"))
+
+        if entry is None:
+            state["removed"].pop(match_id, None)
+            matches[match_id] = {
+                "event": event,
+                "seq": seq,
+                "fields": fields,
+                "fields_seq": seq,
+                "markets": {market_id: (seq, market) for market_id, market in markets.items()},
+                "removed_markets": {},
+            }
+            continue
+
+        entry["event"] = event
+        entry["seq"] = seq
+        if entry["fields"] != fields:
+            entry["fields"] = fields
+            entry["fields_seq"] = seq
+
+        old_markets = entry["markets"]
+        for market_id, market in markets.items():
+            previous = old_markets.get(market_id)
+            if previous is None or previous[1] != market:
+                old_markets[market_id] = (seq, market)
+                entry["removed_markets"].pop(market_id, None)
+        for market_id in [m for m in old_markets if m not in markets]:
+            del old_markets[market_id]
+            entry["removed_markets"][market_id] = seq
+
+    for match_id in [m for m in matches if m not in events]:
+        del matches[match_id]
+        state["removed"][match_id] = seq
+        changed += 1
+
+    if len(state["removed"]) > MAX_TOMBSTONES:
+        oldest = sorted(state["removed"].items(), key=lambda item: item[1])
+        for match_id, _ in oldest[:len(oldest) - MAX_TOMBSTONES]:
+            del state["removed"][match_id]
+
+    if changed:
+        state["seq"] = seq
+    return changed
+
+
+def _inplay_diff(state, since_seq):
+    """Matches and markets changed after since_seq (everything when since_seq is None)."""
+    full = since_seq is None
+    since = -1 if full else since_seq
+    changed_matches = {}
+
+    for match_id, entry in state["matches"].items():
+        if entry["seq"] <= since:
+            continue
+        match = {"seq": entry["seq"]}
+        if entry["fields_seq"] > since:
+            match.update(entry["fields"])
+        match["odds"] = {
+            market_id: dict(market, seq=market_seq) if isinstance(market, dict) else {"value": market, "seq": market_seq}
+            for market_id, (market_seq, market) in entry["markets"].items()
+            if market_seq > since
+        }
+        if not full:
+            removed_markets = [m for m, removed_seq in entry["removed_markets"].items() if removed_seq > since]
+            if removed_markets:
+                match["removed_odds"] = removed_markets
+        changed_matches[match_id] = match
+
+    removed = [] if full else [m for m, removed_seq in state["removed"].items() if removed_seq > since]
+
+    return {
+        "epoch": state["epoch"],
+        "seq": state["seq"],
+        "full": full,
+        "matches": changed_matches,
+        "removed_matches": removed,
+        "changed_count": len(changed_matches) + len(removed),
+    }
+
 
 def get_leagues_mapping(request_data):
     """
@@ -27,17 +277,7 @@ def get_leagues_mapping(request_data):
 
     url = f"{BASE_URL}/{api_key}/soccerfixtures/data/mapping"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("leagues_mapping", url, {"json": 1}, params)
 
 
 def get_livescores(request_data):
@@ -68,17 +308,7 @@ def get_livescores(request_data):
     if cat:
         query_params["cat"] = cat
 
-    try:
-        response = requests.get(url, params=query_params, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("livescores", url, query_params, params)
 
 
 def get_standings(request_data):
@@ -112,17 +342,7 @@ def get_standings(request_data):
     if season:
         query_params["season"] = season
 
-    try:
-        response = requests.get(url, params=query_params, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("standings", url, query_params, params)
 
 
 def get_topscorers(request_data):
@@ -150,17 +370,7 @@ def get_topscorers(request_data):
 
     url = f"{BASE_URL}/{api_key}/topscorers/{league_id}"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("topscorers", url, {"json": 1}, params)
 
 
 def get_pregame_odds(request_data):
@@ -210,17 +420,7 @@ def get_pregame_odds(request_data):
     if params.get("ts"):
         query_params["ts"] = params["ts"]
 
-    try:
-        response = requests.get(url, params=query_params, timeout=60)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("pregame_odds", url, query_params, params, timeout=60)
 
 
 def get_fixtures(request_data):
@@ -248,17 +448,7 @@ def get_fixtures(request_data):
 
     url = f"{BASE_URL}/{api_key}/soccerfixtures/leagueid/{league_id}"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("fixtures", url, {"json": 1}, params)
 
 
 def get_seasons(request_data):
@@ -281,17 +471,7 @@ def get_seasons(request_data):
 
     url = f"{BASE_URL}/{api_key}/soccerfixtures/data/seasons"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("seasons", url, {"json": 1}, params)
 
 
 def get_inplay_odds(request_data):
@@ -303,31 +483,52 @@ def get_inplay_odds(request_data):
         request_data (dict): Dictionary containing:
             - params (dict): Dictionary with:
                 - sport (str, optional): Sport type - soccer, basket, tennis, etc. Default: soccer
+                - mode (str, optional): "full" returns the whole feed, "diff" returns only
+                  matches and markets changed since since_seq. Default: full
+                - since_seq (int, optional): seq from the previous diff response
+                - epoch (str, optional): epoch from the previous diff response; when it does
+                  not match (e.g. the connector restarted) a full diff is returned
 
     Returns:
-        dict: Status and inplay odds data
+        dict: Status and inplay odds data. In diff mode data holds epoch, seq, full,
+        matches (changed matches with their changed odds, each tagged with seq),
+        removed_matches and changed_count.
     """
     params = request_data.get("params", {})
     sport = params.get("sport", "soccer")
+    mode = params.get("mode", "full")
 
     url = f"{INPLAY_URL}/inplay-{sport}.gz"
 
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        # Decompress gzip data
-        compressed_data = BytesIO(response.content)
-        with gzip.GzipFile(fileobj=compressed_data) as f:
-            decompressed_data = f.read().decode('utf-8')
-
-        data = json.loads(decompressed_data)
-        return {"status": True, "data": data}
+        with _get_session().get(url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            data = _read_gzip_json(response)
+
+        if mode != "diff":
+            return {"status": True, "data": data}
+
+        since_seq = params.get("since_seq")
+        with _inplay_lock:
+            state = _inplay_states.setdefault(sport, _new_inplay_state())
+            _apply_inplay_snapshot(state, data)
+            if since_seq in (None, "") or params.get("epoch") != state["epoch"]:
+                since_seq = None
+            else:
+                since_seq = int(since_seq)
+            diff = _inplay_diff(state, since_seq)
+
+        if isinstance(data, dict):
+            diff["updated"] = data.get("updated")
+            diff["updated_ts"] = data.get("updated_ts")
+        return {"status": True, "data": diff}
 
     except requests.exceptions.RequestException as e:
         return {"status": False, "message": f"Request failed: {str(e)}"}
-    except (gzip.BadGzipFile, json.JSONDecodeError) as e:
+    except (gzip.BadGzipFile, zlib.error, json.JSONDecodeError, UnicodeDecodeError) as e:
         return {"status": False, "message": f"Data decode error: {str(e)}"}
+    except (TypeError, ValueError) as e:
+        return {"status": False, "message": f"Invalid parameters: {str(e)}"}
 
 
 def get_inplay_mapping(request_data):
@@ -350,17 +551,7 @@ def get_inplay_mapping(request_data):
 
     url = f"{BASE_URL}/{api_key}/soccernew/inplay-mapping"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("inplay_mapping", url, {"json": 1}, params)
 
 
 def get_live_stats(request_data):
@@ -394,17 +585,7 @@ def get_live_stats(request_data):
     if date:
         query_params["date"] = date
 
-    try:
-        response = requests.get(url, params=query_params, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("live_stats", url, query_params, params)
 
 
 def get_match_stats(request_data):
@@ -437,17 +618,7 @@ def get_match_stats(request_data):
 
     url = f"{BASE_URL}/{api_key}/commentaries/match"
 
-    try:
-        response = requests.get(url, params={"json": 1, "id": match_id, "league": league_id}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("match_stats", url, {"json": 1, "id": match_id, "league": league_id}, params)
 
 
 def get_historical(request_data):
@@ -480,17 +651,7 @@ def get_historical(request_data):
 
     url = f"{BASE_URL}/{api_key}/soccerhistory/leagueid/{league_id}-{season}"
 
-    try:
-        response = requests.get(url, params={"json": 1}, timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        return {"status": True, "data": data}
-
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+    return _fetch_json("historical", url, {"json": 1}, params)
 
 
 def get_inplay_match_result(request_data):
@@ -519,14 +680,101 @@ def get_inplay_match_result(request_data):
 
     url = f"{INPLAY_URL}/results/{year_month}/{match_id}.json"
 
+    return _fetch_json("inplay_match_result", url, None, params)
+
+
+# Commands that can be fanned out by get_many
+MANY_ENDPOINTS = {
+    "leagues_mapping": get_leagues_mapping,
+    "livescores": get_livescores,
+    "standings": get_standings,
+    "topscorers": get_topscorers,
+    "pregame_odds": get_pregame_odds,
+    "fixtures": get_fixtures,
+    "seasons": get_seasons,
+    "inplay_mapping": get_inplay_mapping,
+    "live_stats": get_live_stats,
+    "match_stats": get_match_stats,
+    "historical": get_historical,
+    "inplay_match_result": get_inplay_match_result,
+}
+
+
+def _run_many_request(request, shared_params):
+    if isinstance(request, (list, tuple)):
+        request = dict(zip(("endpoint", "league_id", "date"), request))
+    if not isinstance(request, dict):
+        return {"status": False, "message": "Each request must be a dict or [endpoint, league_id, date]"}
+
+    endpoint = str(request.get("endpoint") or "")
+    if endpoint.startswith("get_"):
+        endpoint = endpoint[4:]
+    handler = MANY_ENDPOINTS.get(endpoint)
+    if handler is None:
+        return {"status": False, "message": f"Unsupported endpoint: {request.get('endpoint')}"}
+
+    request_params = dict(shared_params)
+    request_params.update({k: v for k, v in request.items() if k != "endpoint" and v is not None})
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+        return handler({"params": request_params})
+    except Exception as e:
+        return {"status": False, "message": f"Request failed: {str(e)}"}
 
-        data = response.json()
-        return {"status": True, "data": data}
 
-    except requests.exceptions.RequestException as e:
-        return {"status": False, "message": f"Request failed: {str(e)}"}
-    except json.JSONDecodeError as e:
-        return {"status": False, "message": f"JSON decode error: {str(e)}", "raw_response": response.text[:500]}
+def get_many(request_data):
+    """
+    Fetch several endpoints concurrently, e.g. live stats for many leagues.
+
+    Each request runs through the same pooled session and response cache as
+    the single-endpoint commands; a failing request does not affect the others.
+
+    Args:
+        request_data (dict): Dictionary containing:
+            - params (dict): Dictionary with:
+                - api_key (str, required): Goalserve API key
+                - requests (list, required): Requests as dicts with "endpoint"
+                  (e.g. live_stats, fixtures, standings) plus that endpoint's params
+                  (league_id, date, season, match_id, ...), or [endpoint, league_id, date]
+                - max_workers (int, optional): Concurrent requests. Default: 8
+                - cache_ttl (int, optional): Override the per-endpoint cache TTL in seconds
+
+    Returns:
+        dict: Status and one result per request, in request order
+    """
+    params = request_data.get("params", {})
+    requests_list = params.get("requests") or []
+
+    if not params.get("api_key"):
+        return {"status": False, "message": "API key is required"}
+
+    if not isinstance(requests_list, list) or not requests_list:
+        return {"status": False, "message": "requests must be a non-empty list"}
+
+    shared_params = {k: v for k, v in params.items() if k not in ("requests", "max_workers")}
+    try:
+        max_workers = max(1, min(int(params.get("max_workers") or DEFAULT_MAX_WORKERS), len(requests_list)))
+    except (TypeError, ValueError):
+        return {"status": False, "message": "max_workers must be an integer"}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_run_many_request, request, shared_params) for request in requests_list]
+        results = [future.result() for future in futures]
+
+    items = []
+    for request, result in zip(requests_list, results):
+        item = {"request": request, "status": result.get("status", False)}
+        if item["status"]:
+            item["data"] = result.get("data")
+        else:
+            item["message"] = result.get("message")
+        items.append(item)
+
+    succeeded = sum(1 for item in items if item["status"])
+    return {
+        "status": True,
+        "data": {
+            "results": items,
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+        }
+    }
@@ -1,24 +1,212 @@
 from google.cloud import storage
 
+import hashlib
 import json
 import mimetypes
+import shutil
 import tempfile
+import threading
 import urllib.request
 import urllib.error
 import urllib.parse
 import os
 import base64
 import re
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    from google.cloud.storage import transfer_manager
+except ImportError:  # google-cloud-storage < 2.10
+    transfer_manager = None
 
-def invoke_upload(request_data):
-    # Machina sometimes provides connector inputs under `params`, sometimes under `inputs`
-    params = request_data.get("params") or request_data.get("inputs") or {}
-    headers = request_data.get("headers") or {}
 
-    api_key = headers.get("api_key") or params.get("api_key")
-    bucket_name = headers.get("bucket_name") or params.get("bucket_name")
+# Files above RESUMABLE_THRESHOLD are sent as chunked resumable uploads, local
+# files above PARALLEL_THRESHOLD as concurrent XML multipart uploads.
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+PARALLEL_CHUNK_SIZE = 32 * 1024 * 1024
+PARALLEL_MAX_WORKERS = 8
+DEFAULT_MAX_WORKERS = 8
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Base64 is decoded in slices of this many characters (a multiple of 4)
+BASE64_SLICE_SIZE = 4 * 1024 * 1024
+_NON_BASE64_RE = re.compile(r"[^A-Za-z0-9+/=]")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    pass
+
+
+def _load_service_account(api_key):
+    """Accept service account as dict, JSON string, or path to JSON file."""
+    if isinstance(api_key, dict):
+        return api_key
+    try:
+        return json.loads(api_key)
+    except Exception:
+        if os.path.exists(str(api_key)):
+            with open(api_key, "r") as f:
+                return json.load(f)
+    raise UploadError("Invalid service account JSON in api_key.")
+
+
+def _get_client(service_account_info):
+    """One storage.Client per service account, keyed by a hash of its JSON."""
+    key = hashlib.sha256(
+        json.dumps(service_account_info, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = storage.Client.from_service_account_info(service_account_info)
+            _clients[key] = client
+        return client
+
 
+def _classify_input(file_input):
+    """Return (kind, base64_data, mime_type) with kind in url/bytes/base64/path."""
+    if isinstance(file_input, bytes):
+        return "bytes", None, None
+    if file_input.startswith(("http://", "https://", "gs://")):
+        return "url", None, None
+    if file_input.startswith("data:"):
+        try:
+            header, base64_data = file_input.split(",", 1)
+        except Exception:
+            raise UploadError("Invalid Data URI format.")
+        mime_match = re.search(r"data:(.*?);", header)
+        return "base64", base64_data, mime_match.group(1) if mime_match else None
+    if len(file_input) > 100:
+        # Simple heuristic for raw base64
+        try:
+            base64.b64decode(file_input[:100], validate=True)
+            return "base64", file_input, None
+        except Exception:
+            pass
+    return "path", None, None
+
+
+def _resolve_filename(file_input, kind, mime_type):
+    if kind == "url":
+        parsed_url = urllib.parse.urlparse(file_input)
+        filename = os.path.basename(parsed_url.path)
+        if (
+            not filename
+            or len(filename) < 3
+            or (
+                "." not in filename
+                and not filename.replace("_", "").replace("-", "").isalnum()
+            )
+        ):
+            if parsed_url.fragment:
+                fragment_path = parsed_url.fragment
+                fragment_filename = os.path.basename(fragment_path)
+                if fragment_filename and (
+                    "." in fragment_filename
+                    or len(fragment_filename) > len(filename or "")
+                ):
+                    filename = fragment_filename
+        return filename or "downloaded_file"
+    if kind == "base64":
+        ext = ".bin"
+        if mime_type:
+            guessed_ext = mimetypes.guess_extension(mime_type)
+            if guessed_ext:
+                ext = guessed_ext
+        return "upload_" + os.urandom(4).hex() + ext
+    if kind == "bytes":
+        return "upload_" + os.urandom(4).hex() + ".bin"
+    return os.path.basename(file_input) or ("upload_" + os.urandom(4).hex())
+
+
+def _resolve_remote(remote_path, filename):
+    """Custom remote path, default to static/{filename}."""
+    if remote_path:
+        if remote_path.endswith("/"):
+            return f"{remote_path}{filename}"
+        return remote_path
+    return f"static/{filename}"
+
+
+def _decode_base64_to_file(base64_data, file_obj):
+    """
+    Decode base64 in slices so only one slice of decoded bytes is held at a time.
+
+    Characters outside the base64 alphabet (line breaks, spaces) are dropped
+    per slice, as b64decode itself would, and the len % 4 leftover of each
+    cleaned slice is carried into the next so every decode is quad aligned.
+    """
+    carry = ""
+    for start in range(0, len(base64_data), BASE64_SLICE_SIZE):
+        chunk = carry + _NON_BASE64_RE.sub("", base64_data[start:start + BASE64_SLICE_SIZE])
+        aligned = len(chunk) - len(chunk) % 4
+        file_obj.write(base64.b64decode(chunk[:aligned]))
+        carry = chunk[aligned:]
+    if carry:
+        # Unpadded tail; b64decode reports it as incorrect padding
+        file_obj.write(base64.b64decode(carry))
+
+
+def _upload_stream(blob, file_obj, size, content_type):
+    if size > RESUMABLE_THRESHOLD:
+        blob.chunk_size = RESUMABLE_CHUNK_SIZE
+    blob.upload_from_file(file_obj, size=size, content_type=content_type)
+
+
+def _upload_local_file(blob, file_path, content_type):
+    size = os.path.getsize(file_path)
+    if transfer_manager is not None and size > PARALLEL_THRESHOLD:
+        transfer_manager.upload_chunks_concurrently(
+            file_path,
+            blob,
+            content_type=content_type,
+            chunk_size=PARALLEL_CHUNK_SIZE,
+            worker_type=transfer_manager.THREAD,
+            max_workers=PARALLEL_MAX_WORKERS,
+        )
+        return
+    with open(file_path, "rb") as f:
+        _upload_stream(blob, f, size, content_type)
+
+
+def _download_to_file(client, file_input, download_temp_path):
+    # Use authenticated client for GCS URLs
+    is_gcs_url = False
+    source_bucket_name = None
+    source_blob_name = None
+
+    if file_input.startswith("gs://"):
+        is_gcs_url = True
+        parts = file_input[5:].split("/", 1)
+        source_bucket_name = parts[0]
+        source_blob_name = parts[1] if len(parts) > 1 else ""
+    elif "storage.googleapis.com" in file_input:
+        is_gcs_url = True
+        parsed_url = urllib.parse.urlparse(file_input)
+        path_parts = parsed_url.path.lstrip("/").split("/", 1)
+        if len(path_parts) >= 2:
+            source_bucket_name = path_parts[0]
+            source_blob_name = path_parts[1]
+
+    if is_gcs_url and source_bucket_name and source_blob_name:
+        source_bucket = client.bucket(source_bucket_name)
+        source_blob = source_bucket.blob(source_blob_name)
+        source_blob.download_to_filename(download_temp_path)
+    else:
+        req = urllib.request.Request(
+            file_input, headers={"User-Agent": "Mozilla/5.0"}
+        )
+        with urllib.request.urlopen(req) as response:
+            with open(download_temp_path, "wb") as f:
+                shutil.copyfileobj(response, f, STREAM_CHUNK_SIZE)
+
+
+def _upload_item(client, bucket_name, params):
+    """Upload one file described by params, returning the connector response."""
     # Accept file_path (generic), video_path (legacy), and image_path (legacy)
     file_input = (
         params.get("file_path")
@@ -35,110 +223,15 @@ def invoke_upload(request_data):
     if not isinstance(file_input, bytes):
         file_input = str(file_input)
 
-    # Classify input
-    is_url = isinstance(file_input, str) and file_input.startswith(
-        ("http://", "https://", "gs://")
-    )
-    is_raw_bytes = isinstance(file_input, bytes)
-    is_base64 = False
-    base64_data = None
-    mime_type = None
-
-    if isinstance(file_input, str) and file_input.startswith("data:"):
-        is_base64 = True
-        try:
-            header, base64_data = file_input.split(",", 1)
-            mime_match = re.search(r"data:(.*?);", header)
-            if mime_match:
-                mime_type = mime_match.group(1)
-        except Exception:
-            return {"status": "error", "message": "Invalid Data URI format."}
-    elif not is_url and isinstance(file_input, str) and len(file_input) > 100:
-        # Simple heuristic for raw base64
-        try:
-            base64.b64decode(file_input[:100], validate=True)
-            is_base64 = True
-            base64_data = file_input
-        except Exception:
-            is_base64 = False
-
-    # Resolve filename
-    filename = params.get("filename")
-    if not filename:
-        if is_url:
-            parsed_url = urllib.parse.urlparse(file_input)
-            filename = os.path.basename(parsed_url.path)
-            if (
-                not filename
-                or len(filename) < 3
-                or (
-                    "." not in filename
-                    and not filename.replace("_", "").replace("-", "").isalnum()
-                )
-            ):
-                if parsed_url.fragment:
-                    fragment_path = parsed_url.fragment
-                    fragment_filename = os.path.basename(fragment_path)
-                    if fragment_filename and (
-                        "." in fragment_filename
-                        or len(fragment_filename) > len(filename or "")
-                    ):
-                        filename = fragment_filename
-            if not filename:
-                filename = "downloaded_file"
-        elif is_base64:
-            ext = ".bin"
-            if mime_type:
-                guessed_ext = mimetypes.guess_extension(mime_type)
-                if guessed_ext:
-                    ext = guessed_ext
-            filename = "upload_" + os.urandom(4).hex() + ext
-        elif is_raw_bytes:
-            filename = "upload_" + os.urandom(4).hex() + ".bin"
-        else:
-            filename = os.path.basename(file_input) or (
-                "upload_" + os.urandom(4).hex()
-            )
-
-    # Custom remote path, default to static/{filename}
-    remote_path = params.get("remote_path")
-    if remote_path:
-        if remote_path.endswith("/"):
-            remote = f"{remote_path}{filename}"
-        else:
-            remote = remote_path
-    else:
-        remote = f"static/{filename}"
+    try:
+        kind, base64_data, mime_type = _classify_input(file_input)
+    except UploadError as e:
+        return {"status": "error", "message": str(e)}
 
-    if not api_key:
-        return {"status": "error", "message": "API key is required."}
+    filename = params.get("filename") or _resolve_filename(file_input, kind, mime_type)
+    remote = _resolve_remote(params.get("remote_path"), filename)
 
-    temp_sa_path = None
     try:
-        # Accept service account as dict, JSON string, or path to JSON file
-        service_account_info = None
-        if isinstance(api_key, dict):
-            service_account_info = api_key
-        else:
-            try:
-                service_account_info = json.loads(api_key)
-            except Exception:
-                if os.path.exists(str(api_key)):
-                    with open(api_key, "r") as f:
-                        service_account_info = json.load(f)
-                else:
-                    return {
-                        "status": "error",
-                        "message": "Invalid service account JSON in api_key.",
-                    }
-
-        with tempfile.NamedTemporaryFile(
-            mode="w", delete=False, suffix=".json"
-        ) as temp_sa:
-            json.dump(service_account_info, temp_sa)
-            temp_sa_path = temp_sa.name
-
-        client = storage.Client.from_service_account_json(temp_sa_path)
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(remote)
 
@@ -146,22 +239,27 @@ def invoke_upload(request_data):
         if cache_control:
             blob.cache_control = cache_control
 
-        if is_base64:
+        if kind == "base64":
             try:
-                decoded_data = base64.b64decode(base64_data)
                 content_type = (
                     mime_type
                     or mimetypes.guess_type(filename)[0]
                     or "application/octet-stream"
                 )
-                blob.upload_from_string(decoded_data, content_type=content_type)
+                # Spill to disk past the resumable threshold instead of
+                # holding the whole decoded payload in memory
+                with tempfile.SpooledTemporaryFile(max_size=RESUMABLE_THRESHOLD) as decoded:
+                    _decode_base64_to_file(base64_data, decoded)
+                    size = decoded.tell()
+                    decoded.seek(0)
+                    _upload_stream(blob, decoded, size, content_type)
             except Exception as e:
                 return {
                     "status": "error",
                     "message": f"Error decoding/uploading base64: {e}",
                 }
 
-        elif is_raw_bytes:
+        elif kind == "bytes":
             try:
                 content_type = (
                     params.get("content_type")
@@ -175,49 +273,18 @@ def invoke_upload(request_data):
                     "message": f"Error uploading raw bytes: {e}",
                 }
 
-        elif is_url:
+        elif kind == "url":
+            download_temp_path = None
             try:
                 with tempfile.NamedTemporaryFile(delete=False) as download_temp:
                     download_temp_path = download_temp.name
 
-                # Use authenticated client for GCS URLs
-                is_gcs_url = False
-                source_bucket_name = None
-                source_blob_name = None
-
-                if file_input.startswith("gs://"):
-                    is_gcs_url = True
-                    parts = file_input[5:].split("/", 1)
-                    source_bucket_name = parts[0]
-                    source_blob_name = parts[1] if len(parts) > 1 else ""
-                elif "storage.googleapis.com" in file_input:
-                    is_gcs_url = True
-                    parsed_url = urllib.parse.urlparse(file_input)
-                    path_parts = parsed_url.path.lstrip("/").split("/", 1)
-                    if len(path_parts) >= 2:
-                        source_bucket_name = path_parts[0]
-                        source_blob_name = path_parts[1]
-
-                if is_gcs_url and source_bucket_name and source_blob_name:
-                    source_bucket = client.bucket(source_bucket_name)
-                    source_blob = source_bucket.blob(source_blob_name)
-                    source_blob.download_to_filename(download_temp_path)
-                else:
-                    req = urllib.request.Request(
-                        file_input, headers={"User-Agent": "Mozilla/5.0"}
-                    )
-                    with urllib.request.urlopen(req) as response:
-                        with open(download_temp_path, "wb") as f:
-                            f.write(response.read())
+                _download_to_file(client, file_input, download_temp_path)
 
                 content_type, _ = mimetypes.guess_type(download_temp_path)
                 content_type = content_type or "application/octet-stream"
 
-                with open(download_temp_path, "rb") as f:
-                    blob.upload_from_file(f, content_type=content_type)
-
-                if os.path.exists(download_temp_path):
-                    os.unlink(download_temp_path)
+                _upload_local_file(blob, download_temp_path, content_type)
             except urllib.error.URLError as e:
                 return {
                     "status": "error",
@@ -228,6 +295,9 @@ def invoke_upload(request_data):
                     "status": "error",
                     "message": f"Error downloading from URL: {e}",
                 }
+            finally:
+                if download_temp_path and os.path.exists(download_temp_path):
+                    os.unlink(download_temp_path)
 
         else:
             # Local file path
@@ -240,16 +310,12 @@ def invoke_upload(request_data):
             content_type, _ = mimetypes.guess_type(file_input)
             content_type = content_type or "application/octet-stream"
 
-            with open(file_input, "rb") as f:
-                blob.upload_from_file(f, content_type=content_type)
+            _upload_local_file(blob, file_input, content_type)
 
         blob.reload()
 
     except Exception as e:
         return {"status": "error", "message": f"Exception when uploading file: {e}"}
-    finally:
-        if temp_sa_path and os.path.exists(temp_sa_path):
-            os.unlink(temp_sa_path)
 
     public_url = f"https://storage.googleapis.com/{bucket_name}/{remote}"
     gcs_uri = f"gs://{bucket_name}/{remote}"
@@ -264,3 +330,102 @@ def invoke_upload(request_data):
             "filename": filename,
         },
     }
+
+
+def _client_from_request(request_data):
+    """Return (params, client, bucket_name) or raise UploadError."""
+    # Machina sometimes provides connector inputs under `params`, sometimes under `inputs`
+    params = request_data.get("params") or request_data.get("inputs") or {}
+    headers = request_data.get("headers") or {}
+
+    api_key = headers.get("api_key") or params.get("api_key")
+    bucket_name = headers.get("bucket_name") or params.get("bucket_name")
+
+    if not api_key:
+        raise UploadError("API key is required.")
+
+    return params, _get_client(_load_service_account(api_key)), bucket_name
+
+
+def invoke_upload(request_data):
+    params = request_data.get("params") or request_data.get("inputs") or {}
+    if not (
+        params.get("file_path")
+        or params.get("video_path")
+        or params.get("image_path")
+    ):
+        return {
+            "status": "error",
+            "message": "file_path (or video_path / image_path) is required.",
+        }
+
+    try:
+        params, client, bucket_name = _client_from_request(request_data)
+    except UploadError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        return {"status": "error", "message": f"Exception when uploading file: {e}"}
+
+    return _upload_item(client, bucket_name, params)
+
+
+def invoke_upload_batch(request_data):
+    """
+    Upload many files concurrently with one cached client.
+
+    params:
+        files: list of inputs, each a file path / URL / base64 string or a dict
+            with the invoke_upload fields (file_path, filename, remote_path,
+            cache_control, content_type)
+        remote_path, cache_control: defaults applied to every file
+        max_workers: concurrent uploads (default 8)
+
+    Results keep the input order; a failed file does not stop the others.
+    """
+    try:
+        params, client, bucket_name = _client_from_request(request_data)
+    except UploadError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        return {"status": "error", "message": f"Exception when uploading files: {e}"}
+
+    files = params.get("files") or []
+    if not isinstance(files, list) or not files:
+        return {"status": "error", "message": "files must be a non-empty list."}
+
+    shared = {
+        key: params[key]
+        for key in ("remote_path", "cache_control", "content_type")
+        if params.get(key)
+    }
+    items = []
+    for entry in files:
+        item = dict(shared)
+        if isinstance(entry, dict):
+            item.update(entry)
+        else:
+            item["file_path"] = entry
+        # A shared remote_path only makes sense as a folder
+        if "remote_path" in shared and item["remote_path"] == shared["remote_path"] and not item["remote_path"].endswith("/"):
+            item["remote_path"] = item["remote_path"] + "/"
+        items.append(item)
+
+    try:
+        max_workers = max(1, int(params.get("max_workers") or DEFAULT_MAX_WORKERS))
+    except (TypeError, ValueError):
+        max_workers = DEFAULT_MAX_WORKERS
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        results = list(executor.map(lambda item: _upload_item(client, bucket_name, item), items))
+
+    uploaded = [r["data"] for r in results if r.get("status") is True]
+    return {
+        "status": True,
+        "data": {
+            "message": f"Uploaded {len(uploaded)} of {len(items)} files.",
+            "results": results,
+            "uploaded": uploaded,
+            "succeeded": len(uploaded),
+            "failed": len(items) - len(uploaded),
+        },
+    }
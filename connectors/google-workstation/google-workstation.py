@@ -1,3 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+# Relay tokens are refreshed this many seconds before they expire
+RELAY_TOKEN_EXPIRY_MARGIN = 60
+
+# Streamed text is coalesced and published once per interval,
+# or earlier once this many characters are buffered
+STREAM_FLUSH_INTERVAL_MS = 50
+STREAM_MAX_BUFFER_CHARS = 4096
+
+_relay_tokens = {}
+_workstation_clients = {}
+_redis_pools = {}
+_state_lock = threading.Lock()
+
+
+###############################################
+# Shared clients and relay token cache
+###############################################
+def _get_workstations_client(credential):
+    from google.cloud import workstations_v1
+    from google.oauth2 import service_account
+
+    # One client (and gRPC channel) per service account, keyed by its hash
+    key = hashlib.sha256(json.dumps(credential, sort_keys=True).encode("utf-8")).hexdigest()
+    with _state_lock:
+        client = _workstation_clients.get(key)
+        if client is None:
+            creds = service_account.Credentials.from_service_account_info(credential)
+            client = workstations_v1.WorkstationsClient(credentials=creds)
+            _workstation_clients[key] = client
+        return client
+
+
+def _get_redis_client(redis_url):
+    import redis as redis_lib
+
+    # Clients share one connection pool per URL, so publishing reuses sockets
+    with _state_lock:
+        pool = _redis_pools.get(redis_url)
+        if pool is None:
+            pool = redis_lib.ConnectionPool.from_url(redis_url, decode_responses=True)
+            _redis_pools[redis_url] = pool
+    return redis_lib.Redis(connection_pool=pool)
+
+
+def _relay_cache_file(workstation):
+    return f"/tmp/gcw_relay_cache_{workstation}.json"
+
+
+def _load_relay_token(workstation):
+    """Return (access_token, relay_url) from memory, then the cache file, or (None, None)."""
+    min_expiry = time.time() + RELAY_TOKEN_EXPIRY_MARGIN
+    with _state_lock:
+        cache = _relay_tokens.get(workstation)
+    if not cache or cache.get("expires_at", 0) <= min_expiry:
+        cache = None
+        cache_file = _relay_cache_file(workstation)
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    cache = json.load(f)
+            except Exception:
+                cache = None
+        if not cache or cache.get("expires_at", 0) <= min_expiry:
+            return None, None
+        with _state_lock:
+            _relay_tokens[workstation] = cache
+    return cache.get("access_token"), cache.get("relay_url")
+
+
+def _store_relay_token(workstation, access_token, relay_url, expires_at):
+    cache = {"access_token": access_token, "relay_url": relay_url, "expires_at": expires_at}
+    with _state_lock:
+        _relay_tokens[workstation] = cache
+    try:
+        with open(_relay_cache_file(workstation), 'w') as f:
+            json.dump(cache, f)
+    except Exception:
+        pass
+
+
+def _clear_relay_token(workstation):
+    with _state_lock:
+        _relay_tokens.pop(workstation, None)
+    try:
+        os.remove(_relay_cache_file(workstation))
+    except Exception:
+        pass
+
+
+def _authenticate_relay(credential, name, workstation):
+    """
+    Fetch a fresh relay token. Returns (access_token, relay_url, state);
+    the token and URL are None when the workstation is not running.
+    """
+    from google.cloud import workstations_v1
+
+    client = _get_workstations_client(credential)
+    ws = client.get_workstation(request=workstations_v1.GetWorkstationRequest(name=name))
+    state = ws.state.name if ws.state else "UNKNOWN"
+    if state != "STATE_RUNNING":
+        return None, None, state
+    token_response = client.generate_access_token(
+        request=workstations_v1.GenerateAccessTokenRequest(workstation=name)
+    )
+    access_token = token_response.access_token
+    relay_url = f"https://8080-{ws.host}"
+    expires_at = token_response.expire_time.timestamp() if token_response.expire_time else time.time() + 3600
+    _store_relay_token(workstation, access_token, relay_url, expires_at)
+    return access_token, relay_url, state
+
+
+###############################################
+# Coalescing Redis publisher for streamed responses
+###############################################
+class _StreamPublisher:
+    """
+    Buffers stream messages for one channel and publishes them through a
+    pipeline, one round trip per flush. Consecutive content chunks with the
+    same metadata are merged. A background thread flushes every interval, and
+    a flush also happens once the buffer is full or a non-content message
+    (tool_call, error, done) arrives, so ordering is preserved.
+    """
+
+    def __init__(self, redis_client, channel, flush_interval=STREAM_FLUSH_INTERVAL_MS / 1000.0,
+                 max_buffer_chars=STREAM_MAX_BUFFER_CHARS):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.flush_interval = flush_interval
+        self.max_buffer_chars = max_buffer_chars
+        self.pending = []
+        self.buffered_chars = 0
+        self.chunks = 0
+        self.messages = 0
+        self.round_trips = 0
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self._run, daemon=True)
+        self.flusher.start()
+
+    def publish(self, message_type, content, metadata):
+        with self.lock:
+            self.chunks += 1
+            last = self.pending[-1] if self.pending else None
+            if (message_type == "content" and last and last["type"] == "content"
+                    and last["metadata"] == metadata):
+                last["content"] += content
+            else:
+                self.pending.append({"type": message_type, "content": content, "metadata": metadata})
+            self.buffered_chars += len(content or "")
+            if message_type != "content" or self.buffered_chars >= self.max_buffer_chars:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+
+    def stats(self):
+        return {"chunks": self.chunks, "messages": self.messages, "round_trips": self.round_trips}
+
+    def _run(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        pending, self.pending, self.buffered_chars = self.pending, [], 0
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for message in pending:
+                pipe.publish(self.channel, json.dumps(message))
+            pipe.execute()
+            self.messages += len(pending)
+            self.round_trips += 1
+        except Exception:
+            pass
+
+
 ###############################################
 # Create a new workstation under a given config
 ###############################################
@@ -283,12 +473,8 @@ def invoke_get_workstation(request_data):
 # Kill a Claude session on a workstation by session_id or pid
 ###############################################
 def invoke_kill_session(request_data):
-    from google.cloud import workstations_v1
-    from google.oauth2 import service_account
     import json
     import requests
-    import os
-    import time
 
     request_data = {**request_data, **request_data.get('params', {})}
     credential = request_data.get("credential")
@@ -317,41 +503,16 @@ def invoke_kill_session(request_data):
         return {"status": False, "message": "session_id or pid is required."}
 
     name = f"projects/{project_id}/locations/{location}/workstationClusters/{cluster}/workstationConfigs/{config}/workstations/{workstation}"
-    cache_file = f"/tmp/gcw_relay_cache_{workstation}.json"
 
     try:
         # Try cached token + relay_url first
-        access_token = None
-        relay_url = None
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cache = json.load(f)
-                if cache.get('expires_at', 0) > time.time() + 60:
-                    access_token = cache.get('access_token')
-                    relay_url = cache.get('relay_url')
-            except Exception:
-                pass
+        access_token, relay_url = _load_relay_token(workstation)
 
         # Cache miss — authenticate and cache
         if not access_token or not relay_url:
-            creds = service_account.Credentials.from_service_account_info(credential)
-            client = workstations_v1.WorkstationsClient(credentials=creds)
-            ws = client.get_workstation(request=workstations_v1.GetWorkstationRequest(name=name))
-            state = ws.state.name if ws.state else "UNKNOWN"
-            if state != "STATE_RUNNING":
+            access_token, relay_url, state = _authenticate_relay(credential, name, workstation)
+            if not access_token:
                 return {"status": False, "data": {"workstation_state": state}, "message": f"Workstation is {state} — cannot kill session."}
-            token_response = client.generate_access_token(
-                request=workstations_v1.GenerateAccessTokenRequest(workstation=name)
-            )
-            access_token = token_response.access_token
-            relay_url = f"https://8080-{ws.host}"
-            expires_at = token_response.expire_time.timestamp() if token_response.expire_time else time.time() + 3600
-            try:
-                with open(cache_file, 'w') as f:
-                    json.dump({"access_token": access_token, "relay_url": relay_url, "expires_at": expires_at}, f)
-            except Exception:
-                pass
 
         payload = {}
         if session_id:
@@ -366,10 +527,7 @@ def invoke_kill_session(request_data):
         )
 
         if response.status_code == 401:
-            try:
-                os.remove(cache_file)
-            except Exception:
-                pass
+            _clear_relay_token(workstation)
             return {"status": False, "message": "Token expired — cache cleared, retry."}
 
         result = response.json()
@@ -382,10 +540,7 @@ def invoke_kill_session(request_data):
             "message": result.get("message", "Session killed."),
         }
     except Exception as e:
-        try:
-            os.remove(cache_file)
-        except Exception:
-            pass
+        _clear_relay_token(workstation)
         return {"status": False, "message": f"Error killing session: {e}"}
 
 
@@ -496,12 +651,8 @@ def invoke_list_configs(request_data):
 # List active Claude sessions on a workstation via the relay API
 ###############################################
 def invoke_list_sessions(request_data):
-    from google.cloud import workstations_v1
-    from google.oauth2 import service_account
     import json
     import requests
-    import os
-    import time
 
     request_data = {**request_data, **request_data.get('params', {})}
     credential = request_data.get("credential")
@@ -525,45 +676,20 @@ def invoke_list_sessions(request_data):
         return {"status": False, "message": "workstation is required."}
 
     name = f"projects/{project_id}/locations/{location}/workstationClusters/{cluster}/workstationConfigs/{config}/workstations/{workstation}"
-    cache_file = f"/tmp/gcw_relay_cache_{workstation}.json"
 
     try:
         # Try cached token + relay_url first (skip get_workstation + generate_access_token)
-        access_token = None
-        relay_url = None
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cache = json.load(f)
-                if cache.get('expires_at', 0) > time.time() + 60:
-                    access_token = cache.get('access_token')
-                    relay_url = cache.get('relay_url')
-            except Exception:
-                pass
+        access_token, relay_url = _load_relay_token(workstation)
 
         # Cache miss — authenticate and cache
         if not access_token or not relay_url:
-            creds = service_account.Credentials.from_service_account_info(credential)
-            client = workstations_v1.WorkstationsClient(credentials=creds)
-            ws = client.get_workstation(request=workstations_v1.GetWorkstationRequest(name=name))
-            state = ws.state.name if ws.state else "UNKNOWN"
-            if state != "STATE_RUNNING":
+            access_token, relay_url, state = _authenticate_relay(credential, name, workstation)
+            if not access_token:
                 return {
                     "status": True,
                     "data": {"sessions": [], "session_count": 0, "workstation_state": state},
                     "message": f"Workstation is {state} — no sessions running.",
                 }
-            token_response = client.generate_access_token(
-                request=workstations_v1.GenerateAccessTokenRequest(workstation=name)
-            )
-            access_token = token_response.access_token
-            relay_url = f"https://8080-{ws.host}"
-            expires_at = token_response.expire_time.timestamp() if token_response.expire_time else time.time() + 3600
-            try:
-                with open(cache_file, 'w') as f:
-                    json.dump({"access_token": access_token, "relay_url": relay_url, "expires_at": expires_at}, f)
-            except Exception:
-                pass
 
         response = requests.get(
             f"{relay_url}/api/sessions",
@@ -573,10 +699,7 @@ def invoke_list_sessions(request_data):
 
         # Auth failed — invalidate cache so next call re-authenticates
         if response.status_code == 401:
-            try:
-                os.remove(cache_file)
-            except Exception:
-                pass
+            _clear_relay_token(workstation)
             return {"status": False, "message": "Token expired — cache cleared, retry."}
 
         if response.status_code != 200:
@@ -593,16 +716,10 @@ def invoke_list_sessions(request_data):
             "message": f"Found {result.get('session_count', 0)} Claude session(s) running.",
         }
     except requests.exceptions.ConnectionError:
-        try:
-            os.remove(cache_file)
-        except Exception:
-            pass
+        _clear_relay_token(workstation)
         return {"status": True, "data": {"sessions": [], "session_count": 0, "workstation_state": "STATE_STOPPED"}, "message": "Workstation unreachable — likely stopped."}
     except Exception as e:
-        try:
-            os.remove(cache_file)
-        except Exception:
-            pass
+        _clear_relay_token(workstation)
         return {"status": False, "message": f"Error listing sessions: {e}"}
 
 
@@ -657,13 +774,8 @@ def invoke_list_workstations(request_data):
 # Send a prompt to Claude on a workstation with real-time streaming via Redis pub/sub
 ###############################################
 def invoke_send_message(request_data):
-    from google.cloud import workstations_v1
-    from google.oauth2 import service_account
     import json
     import requests
-    import redis as redis_lib
-    import os
-    import time
 
     request_data = {**request_data, **request_data.get('params', {})}
     credential = request_data.get("credential")
@@ -694,57 +806,28 @@ def invoke_send_message(request_data):
     cwd = request_data.get("cwd")
     output_format = request_data.get("output_format", "stream-json")
     timeout = int(request_data.get("timeout", 300))
+    flush_interval = float(request_data.get("stream_flush_ms") or STREAM_FLUSH_INTERVAL_MS) / 1000.0
+    max_buffer_chars = int(request_data.get("stream_max_buffer_chars") or STREAM_MAX_BUFFER_CHARS)
 
     name = f"projects/{project_id}/locations/{location}/workstationClusters/{cluster}/workstationConfigs/{config}/workstations/{workstation}"
-    cache_file = f"/tmp/gcw_relay_cache_{workstation}.json"
+    publisher = None
 
     try:
         # Try cached token + relay_url first
-        access_token = None
-        relay_url = None
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cache = json.load(f)
-                if cache.get('expires_at', 0) > time.time() + 60:
-                    access_token = cache.get('access_token')
-                    relay_url = cache.get('relay_url')
-            except Exception:
-                pass
+        access_token, relay_url = _load_relay_token(workstation)
 
         # Cache miss — authenticate and cache
         if not access_token or not relay_url:
-            creds = service_account.Credentials.from_service_account_info(credential)
-            client = workstations_v1.WorkstationsClient(credentials=creds)
-            ws = client.get_workstation(request=workstations_v1.GetWorkstationRequest(name=name))
-            state = ws.state.name if ws.state else "UNKNOWN"
-            if state != "STATE_RUNNING":
+            access_token, relay_url, state = _authenticate_relay(credential, name, workstation)
+            if not access_token:
                 return {"status": False, "data": {"workstation_state": state}, "message": f"Workstation is {state} — cannot send message."}
-            token_response = client.generate_access_token(
-                request=workstations_v1.GenerateAccessTokenRequest(workstation=name)
-            )
-            access_token = token_response.access_token
-            relay_url = f"https://8080-{ws.host}"
-            expires_at = token_response.expire_time.timestamp() if token_response.expire_time else time.time() + 3600
-            try:
-                with open(cache_file, 'w') as f:
-                    json.dump({"access_token": access_token, "relay_url": relay_url, "expires_at": expires_at}, f)
-            except Exception:
-                pass
 
         # Redis pub/sub for real-time streaming
         # Use injected stream channel from agent streaming pipeline if available,
         # otherwise fall back to thread-based channel
-        redis_client = None
         redis_channel = request_data.get("_stream_channel", "")
         if not redis_channel and thread_id:
             redis_channel = f"thread:{thread_id}:stream"
-        if redis_channel:
-            try:
-                redis_url = request_data.get("redis_url", "redis://redis:6379/0")
-                redis_client = redis_lib.from_url(redis_url, decode_responses=True)
-            except Exception:
-                redis_client = None
 
         payload = {"prompt": prompt, "output_format": output_format}
         if session_id:
@@ -759,15 +842,20 @@ def invoke_send_message(request_data):
         )
 
         if response.status_code == 401:
-            try:
-                os.remove(cache_file)
-            except Exception:
-                pass
+            _clear_relay_token(workstation)
             return {"status": False, "message": "Token expired — cache cleared, retry."}
 
         if response.status_code != 200:
             return {"status": False, "message": f"Relay error (HTTP {response.status_code}): {response.text}"}
 
+        # Chunks are coalesced into pipelined publishes on a pooled connection
+        if redis_channel:
+            try:
+                redis_url = request_data.get("redis_url", "redis://redis:6379/0")
+                publisher = _StreamPublisher(_get_redis_client(redis_url), redis_channel, flush_interval, max_buffer_chars)
+            except Exception:
+                publisher = None
+
         full_content = []
         result_session_id = None
 
@@ -794,15 +882,9 @@ def invoke_send_message(request_data):
                         text = block.get("text", "")
                         if text:
                             full_content.append(text)
-                            if redis_client and redis_channel:
-                                try:
-                                    redis_client.publish(redis_channel, json.dumps({
-                                        "type": "content", "content": text,
-                                        "metadata": {"session_id": result_session_id or session_id},
-                                    }))
-                                except Exception:
-                                    pass
-                    elif block_type == "tool_use" and redis_client and redis_channel:
+                            if publisher:
+                                publisher.publish("content", text, {"session_id": result_session_id or session_id})
+                    elif block_type == "tool_use" and publisher:
                         tool_name = block.get("name", "unknown")
                         tool_input = block.get("input", {})
                         # Build a human-readable status from the tool call
@@ -817,41 +899,22 @@ def invoke_send_message(request_data):
                             "WebSearch": f"Searching web",
                         }
                         status_text = tool_labels.get(tool_name, f"Using {tool_name}")
-                        try:
-                            redis_client.publish(redis_channel, json.dumps({
-                                "type": "tool_call",
-                                "content": status_text,
-                                "metadata": {
-                                    "tool": tool_name,
-                                    "input": tool_input,
-                                    "session_id": result_session_id or session_id,
-                                },
-                            }))
-                        except Exception:
-                            pass
+                        publisher.publish("tool_call", status_text, {
+                            "tool": tool_name,
+                            "input": tool_input,
+                            "session_id": result_session_id or session_id,
+                        })
 
             elif chunk_type == "result":
                 result_session_id = chunk.get("session_id", result_session_id or session_id)
                 # result.result contains the full text as fallback
                 if not full_content and chunk.get("result"):
                     full_content.append(chunk["result"])
-                if chunk.get("subtype") == "error" and redis_client and redis_channel:
-                    try:
-                        redis_client.publish(redis_channel, json.dumps({
-                            "type": "error", "content": chunk.get("error", "Unknown error"),
-                            "metadata": {"session_id": result_session_id},
-                        }))
-                    except Exception:
-                        pass
-
-            elif chunk_type == "error" and redis_client and redis_channel:
-                try:
-                    redis_client.publish(redis_channel, json.dumps({
-                        "type": "error", "content": chunk.get("error", "Unknown relay error"),
-                        "metadata": {"session_id": result_session_id or session_id},
-                    }))
-                except Exception:
-                    pass
+                if chunk.get("subtype") == "error" and publisher:
+                    publisher.publish("error", chunk.get("error", "Unknown error"), {"session_id": result_session_id})
+
+            elif chunk_type == "error" and publisher:
+                publisher.publish("error", chunk.get("error", "Unknown relay error"), {"session_id": result_session_id or session_id})
 
         full_text = "".join(full_content)
 
@@ -873,39 +936,30 @@ def invoke_send_message(request_data):
         if objects:
             full_text = display_text
 
-        if redis_client and redis_channel:
-            try:
-                redis_client.publish(redis_channel, json.dumps({
-                    "type": "done", "content": full_text,
-                    "metadata": {"session_id": result_session_id or session_id},
-                }))
-            except Exception:
-                pass
-
-        if redis_client:
-            try:
-                redis_client.close()
-            except Exception:
-                pass
+        data = {
+            "response": full_text,
+            "objects": objects,
+            "session_id": result_session_id or session_id,
+            "relay_url": relay_url, "workstation_state": "STATE_RUNNING",
+        }
+        if publisher:
+            publisher.publish("done", full_text, {"session_id": result_session_id or session_id})
+            publisher.close()
+            data["stream_stats"] = publisher.stats()
 
         return {
             "status": True,
-            "data": {
-                "response": full_text,
-                "objects": objects,
-                "session_id": result_session_id or session_id,
-                "relay_url": relay_url, "workstation_state": "STATE_RUNNING",
-            },
+            "data": data,
             "message": "Claude response received.",
         }
     except requests.exceptions.Timeout:
         return {"status": False, "message": f"Request timed out after {timeout}s."}
     except Exception as e:
-        try:
-            os.remove(cache_file)
-        except Exception:
-            pass
+        _clear_relay_token(workstation)
         return {"status": False, "message": f"Error sending message: {e}"}
+    finally:
+        if publisher:
+            publisher.close()
 
 
 ###############################################
@@ -1028,10 +1082,6 @@ def invoke_stop_workstation(request_data):
 # Publish a stream update to a Redis pub/sub channel for real-time UI updates
 ###############################################
 def invoke_stream_update(request_data):
-    import json
-    import os
-    import redis as redis_lib
-
     request_data = {**request_data, **request_data.get('params', {})}
     document_id = request_data.get("document_id")
     content = request_data.get("content", "")
@@ -1049,7 +1099,7 @@ def invoke_stream_update(request_data):
 
     try:
         redis_url = request_data.get("redis_url") or os.environ.get("REDIS_URL", "redis://redis:6379/0")
-        redis_client = redis_lib.from_url(redis_url, decode_responses=True)
+        redis_client = _get_redis_client(redis_url)
 
         message = json.dumps({
             "type": update_type,
@@ -1058,7 +1108,6 @@ def invoke_stream_update(request_data):
         })
 
         subscribers = redis_client.publish(redis_channel, message)
-        redis_client.close()
 
         return {
             "status": True,
@@ -1,3 +1,134 @@
+import http.client
+import json
+import queue
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _scan_gamma_pages(request, endpoint, query, items_key, extract, target_count=None,
+                      max_pages=50, concurrency=8, rate_limit=10.0):
+    """
+    Fetch every page of a Gamma list endpoint concurrently.
+
+    The Gamma API does not return a total, so one wave of tiny probes
+    (limit=1 at pages 1, 2, 4, 8, ...) runs alongside the first page to
+    bracket the page count. The remaining pages are then fetched in parallel
+    under a shared rate limit. `extract(raw_item)` returns the normalized
+    items for a raw item as soon as its page arrives. Once the in-order
+    prefix of finished pages holds `target_count` items, the rest of the scan
+    is cancelled.
+
+    `request(endpoint, params=...)` is the caller's Gamma request helper.
+    """
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+    page_size = int(query["limit"])
+    start_offset = int(query.get("offset", 0))
+    interval = 1.0 / rate_limit if rate_limit and rate_limit > 0 else 0.0
+    slot_lock = threading.Lock()
+    next_slot = [0.0]
+
+    def _throttled(page, limit):
+        if interval:
+            with slot_lock:
+                now = time.monotonic()
+                slot = max(now, next_slot[0])
+                next_slot[0] = slot + interval
+            if slot > now:
+                time.sleep(slot - now)
+        return request(endpoint, params=dict(query, offset=start_offset + page * page_size, limit=limit))
+
+    def _page_items(response):
+        if isinstance(response, dict) and response.get("error"):
+            return None
+        items = response if isinstance(response, list) else response.get(items_key, response)
+        return items if isinstance(items, list) else []
+
+    pages = {}
+    raw_counts = {}
+    errors = []
+    seen_ids = set()
+    complete = True
+
+    def _collect(page, response):
+        raw_items = _page_items(response)
+        if raw_items is None:
+            errors.append({"page": page, "message": f"API error ({response.get('status_code', 'unknown')}): {response.get('message', '')}"})
+            pages[page] = []
+            raw_counts[page] = 0
+            return
+        raw_counts[page] = len(raw_items)
+        collected = []
+        for raw in raw_items:
+            raw_id = raw.get("id") if isinstance(raw, dict) else None
+            # Offsets can shift while pages are fetched; drop repeats
+            if raw_id is not None:
+                if raw_id in seen_ids:
+                    continue
+                seen_ids.add(raw_id)
+            collected.extend(extract(raw))
+        pages[page] = collected
+
+    def _prefix_count():
+        total, page = 0, 0
+        while page in pages:
+            total += len(pages[page])
+            page += 1
+        return total
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        probes = [p for p in (2 ** k for k in range(max_pages.bit_length() + 1)) if p < max_pages]
+        first = executor.submit(_throttled, 0, page_size)
+        probe_futures = {p: executor.submit(_throttled, p, 1) for p in probes}
+
+        first_response = first.result()
+        _collect(0, first_response)
+        last_page = 0
+        if len(_page_items(first_response) or []) >= page_size:
+            last_page = max_pages - 1
+            for p in probes:
+                probe_items = _page_items(probe_futures[p].result())
+                # A failed probe counts as non-empty so no page is skipped
+                if probe_items is not None and not probe_items:
+                    last_page = p - 1
+                    break
+        for future in probe_futures.values():
+            future.cancel()
+
+        if target_count and _prefix_count() >= target_count:
+            return {"items": pages[0][:target_count], "pages_fetched": 1, "complete": last_page == 0, "errors": errors}
+
+        pending = {executor.submit(_throttled, p, page_size): p for p in range(1, last_page + 1)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _collect(pending.pop(future), future.result())
+            if target_count and _prefix_count() >= target_count:
+                complete = False
+                for future in pending:
+                    future.cancel()
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    items = []
+    page = 0
+    while page in pages:
+        items.extend(pages[page])
+        page += 1
+    if target_count:
+        items = items[:target_count]
+    if errors:
+        complete = False
+    if last_page == max_pages - 1 and raw_counts.get(last_page, 0) >= page_size:
+        # Hit max_pages with full pages, more may exist
+        complete = False
+    return {"items": items, "pages_fetched": len(pages), "complete": complete, "errors": errors}
+
+
 def get_sports_markets(request_data):
     import json
     import urllib.request
@@ -91,6 +222,27 @@ def get_sports_markets(request_data):
         if params.get("game_id"):
             query["game_id"] = params["game_id"]
 
+        if params.get("scan"):
+            # Scan mode: every page in one call, optionally stopping at target_count matches
+            text = str(params.get("query", "") or "").lower()
+
+            def _extract(market):
+                normalized = _normalize_market(market)
+                if text and text not in f"{normalized['question']} {normalized['slug']} {normalized['description']}".lower():
+                    return []
+                return [normalized]
+
+            query["limit"] = 100
+            scan = _scan_gamma_pages(
+                _request, "/markets", query, "markets", _extract,
+                target_count=int(params.get("target_count") or 0) or None,
+                max_pages=int(params.get("max_pages", 50)),
+                concurrency=int(params.get("concurrency", 8)),
+                rate_limit=float(params.get("rate_limit", 10)),
+            )
+            markets = scan["items"]
+            return {"status": True, "data": {"markets": markets, "count": len(markets), "offset": query["offset"], "pages_fetched": scan["pages_fetched"], "complete": scan["complete"], "errors": scan["errors"]}, "message": f"Scanned {scan['pages_fetched']} pages, {len(markets)} sports markets"}
+
         response = _request("/markets", params=query)
         if isinstance(response, dict) and response.get("error"):
             return {"status": False, "data": None, "message": f"API error ({response.get('status_code', 'unknown')}): {response.get('message', '')}"}
@@ -216,6 +368,26 @@ def get_sports_events(request_data):
         if params.get("series_id"):
             query["series_id"] = params["series_id"]
 
+        if params.get("scan"):
+            # Scan mode: every page in one call, optionally stopping at target_count matches
+            text = str(params.get("query", "") or "").lower()
+
+            def _extract(event):
+                if text and text not in f"{event.get('title', '')} {event.get('slug', '')} {event.get('description', '')}".lower():
+                    return []
+                return [_normalize_event(event)]
+
+            query["limit"] = 100
+            scan = _scan_gamma_pages(
+                _request, "/events", query, "events", _extract,
+                target_count=int(params.get("target_count") or 0) or None,
+                max_pages=int(params.get("max_pages", 50)),
+                concurrency=int(params.get("concurrency", 8)),
+                rate_limit=float(params.get("rate_limit", 10)),
+            )
+            events = scan["items"]
+            return {"status": True, "data": {"events": events, "count": len(events), "offset": query["offset"], "pages_fetched": scan["pages_fetched"], "complete": scan["complete"], "errors": scan["errors"]}, "message": f"Scanned {scan['pages_fetched']} pages, {len(events)} sports events"}
+
         response = _request("/events", params=query)
         if isinstance(response, dict) and response.get("error"):
             return {"status": False, "data": None, "message": f"API error ({response.get('status_code', 'unknown')}): {response.get('message', '')}"}
@@ -751,6 +923,35 @@ def search_markets(request_data):
         query = params.get("query", "").lower()
         limit = min(int(params.get("limit", 20)), 50)
 
+        if params.get("scan"):
+            # Scan mode: search every active sports event page instead of the top limit * 2
+            limit = int(params.get("limit", 20))
+            smt = params.get("sports_market_types", "")
+
+            def _extract(e):
+                if query and not (
+                    query in e.get("title", "").lower()
+                    or query in e.get("description", "").lower()
+                    or query in e.get("slug", "").lower()
+                ):
+                    return []
+                markets = e.get("markets", [])
+                if smt:
+                    markets = [m for m in markets if m.get("sportsMarketType", "") == smt]
+                return [_normalize_market(m) for m in markets]
+
+            scan = _scan_gamma_pages(
+                _request, "/events",
+                {"tag_id": params.get("tag_id", SPORTS_TAG_ID), "limit": 100, "offset": 0, "active": "true", "closed": "false", "order": "volume", "ascending": "false"},
+                "events", _extract,
+                target_count=limit,
+                max_pages=int(params.get("max_pages", 50)),
+                concurrency=int(params.get("concurrency", 8)),
+                rate_limit=float(params.get("rate_limit", 10)),
+            )
+            result = scan["items"]
+            return {"status": True, "data": {"markets": result, "count": len(result), "query": query or "(all sports)", "pages_fetched": scan["pages_fetched"], "complete": scan["complete"]}, "message": f"Found {len(result)} markets"}
+
         event_params = {
             "tag_id": params.get("tag_id", SPORTS_TAG_ID),
             "limit": min(limit * 2, 100),
@@ -887,3 +1088,218 @@ def get_last_trade_price(request_data):
         return {"status": True, "data": {"token_id": token_id, "price": _safe_float(response.get("price")), "side": response.get("side", "")}, "message": f"Last trade price: {response.get('price', 'N/A')}"}
     except Exception as e:
         return {"status": False, "data": None, "message": f"Error fetching last trade price: {str(e)}"}
+
+
+CLOB_HOST = "clob.polymarket.com"
+CLOB_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+CLOB_BATCH_SIZE = 100
+CLOB_POOL_SIZE = 16
+
+# Idle keep-alive CLOB connections shared by every call in the process, so
+# repeated batch commands skip the TCP/TLS handshake.
+_clob_pool = queue.LifoQueue(maxsize=CLOB_POOL_SIZE)
+
+
+def _clob_release(conn):
+    try:
+        _clob_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def _clob_request(method, endpoint, params=None, body=None):
+    """
+    Send one request to the CLOB API over a pooled keep-alive connection.
+
+    A connection is checked out for the duration of the request, so worker
+    threads never share one. A stale pooled connection is retried once on a
+    fresh connection. Errors come back as `{"error": True, ...}` dicts, like
+    the per-command `_request` helpers.
+    """
+    path = endpoint
+    if params:
+        clean = {k: v for k, v in params.items() if v is not None and v != ""}
+        if clean:
+            path += "?" + urllib.parse.urlencode(clean, doseq=True)
+    headers = {"User-Agent": CLOB_USER_AGENT, "Accept": "application/json"}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    for attempt in range(2):
+        conn = None
+        if not attempt:
+            try:
+                conn = _clob_pool.get_nowait()
+            except queue.Empty:
+                pass
+        if conn is None:
+            conn = http.client.HTTPSConnection(CLOB_HOST, timeout=30)
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            if attempt:
+                return {"error": True, "message": str(e)}
+            continue  # stale keep-alive connection, reconnect once
+        if resp.will_close:
+            conn.close()
+        else:
+            _clob_release(conn)
+        if resp.status >= 400:
+            return {"error": True, "status_code": resp.status, "message": raw.decode(errors="replace")}
+        try:
+            return json.loads(raw.decode())
+        except ValueError as e:
+            return {"error": True, "message": str(e)}
+
+
+def _clob_safe_float(value, default=0.0):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def _clob_token_ids(params):
+    """`token_id` plus `token_ids` (list or comma-separated), deduplicated in order."""
+    token_ids = params.get("token_ids", []) or []
+    if isinstance(token_ids, str):
+        token_ids = [t.strip() for t in token_ids.split(",")]
+    if params.get("token_id"):
+        token_ids = [params["token_id"]] + list(token_ids)
+    return list(dict.fromkeys(str(t) for t in token_ids if t))
+
+
+def _batch_by_token(token_ids, batch_endpoint, single_endpoint, id_key, missing_message,
+                    max_workers=8, use_batch=True):
+    """
+    Fetch one CLOB payload per token, batch endpoint first.
+
+    Tokens are POSTed to `batch_endpoint` in chunks of CLOB_BATCH_SIZE and
+    matched back by `item[id_key]`. Chunks whose batch call fails (or all
+    tokens, when `use_batch` is false) fall back to one GET of
+    `single_endpoint` per token. Returns `(payloads, errors)`, both keyed by
+    token id.
+    """
+    payloads = {}
+    errors = {}
+    pending = token_ids
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        if use_batch:
+            chunks = [token_ids[i:i + CLOB_BATCH_SIZE] for i in range(0, len(token_ids), CLOB_BATCH_SIZE)]
+            responses = list(executor.map(
+                lambda chunk: _clob_request("POST", batch_endpoint, body=[{"token_id": t} for t in chunk]), chunks
+            ))
+            pending = []
+            for chunk, response in zip(chunks, responses):
+                if not isinstance(response, list):
+                    # Batch endpoint unavailable for this chunk, fetch one by one
+                    pending.extend(chunk)
+                    continue
+                wanted = set(chunk)
+                for item in response:
+                    if isinstance(item, dict) and str(item.get(id_key, "")) in wanted:
+                        payloads[str(item[id_key])] = item
+                for tid in chunk:
+                    if tid not in payloads:
+                        errors[tid] = missing_message
+
+        if pending:
+            responses = list(executor.map(
+                lambda tid: _clob_request("GET", single_endpoint, params={"token_id": tid}), pending
+            ))
+            for tid, response in zip(pending, responses):
+                if not isinstance(response, dict):
+                    errors[tid] = "Unexpected response"
+                elif response.get("error"):
+                    errors[tid] = f"API error ({response.get('status_code', 'unknown')}): {response.get('message', '')}"
+                else:
+                    payloads[tid] = response
+    return payloads, errors
+
+
+def get_order_books(request_data):
+    import heapq
+
+    def _levels(levels, best_first_high, depth):
+        parsed = [(_clob_safe_float(l.get("price")), _clob_safe_float(l.get("size"))) for l in levels if isinstance(l, dict)]
+        if depth:
+            pick = heapq.nlargest if best_first_high else heapq.nsmallest
+            parsed = pick(depth, parsed, key=lambda level: level[0])
+        else:
+            parsed.sort(key=lambda level: level[0], reverse=best_first_high)
+        return [{"price": price, "size": size} for price, size in parsed]
+
+    def _normalize_book(token_id, response, depth):
+        bids = response.get("bids", []) or []
+        asks = response.get("asks", []) or []
+        top_bids = _levels(bids, True, depth)
+        top_asks = _levels(asks, False, depth)
+        best_bid = top_bids[0]["price"] if top_bids else 0
+        best_ask = top_asks[0]["price"] if top_asks else 0
+        spread = round(best_ask - best_bid, 4) if best_bid and best_ask else None
+        return {
+            "token_id": token_id,
+            "market": response.get("market", ""),
+            "timestamp": response.get("timestamp", ""),
+            "bids": top_bids,
+            "asks": top_asks,
+            "best_bid": best_bid,
+            "best_ask": best_ask,
+            "spread": spread,
+            "bid_depth": len(bids),
+            "ask_depth": len(asks),
+        }
+
+    try:
+        params = request_data if isinstance(request_data, dict) else {}
+        token_ids = _clob_token_ids(params)
+        if not token_ids:
+            return {"status": False, "data": None, "message": "token_ids is required"}
+
+        depth = int(params.get("depth") or 0)
+        raw_books, errors = _batch_by_token(
+            token_ids, "/books", "/book", "asset_id", "No order book returned",
+            max_workers=int(params.get("max_workers") or 8),
+            use_batch=params.get("use_batch", True) is not False,
+        )
+
+        books = {tid: _normalize_book(tid, raw_books[tid], depth) for tid in token_ids if tid in raw_books}
+        return {
+            "status": True,
+            "data": {"books": books, "count": len(books), "errors": errors},
+            "message": f"Retrieved {len(books)} of {len(token_ids)} order books",
+        }
+    except Exception as e:
+        return {"status": False, "data": None, "message": f"Error fetching order books: {str(e)}"}
+
+
+def get_last_trade_prices(request_data):
+    try:
+        params = request_data if isinstance(request_data, dict) else {}
+        token_ids = _clob_token_ids(params)
+        if not token_ids:
+            return {"status": False, "data": None, "message": "token_ids is required"}
+
+        trades, errors = _batch_by_token(
+            token_ids, "/last-trades-prices", "/last-trade-price", "token_id", "No last trade returned",
+            max_workers=int(params.get("max_workers") or 8),
+            use_batch=params.get("use_batch", True) is not False,
+        )
+
+        prices = {
+            tid: {"token_id": tid, "price": _clob_safe_float(trades[tid].get("price")), "side": trades[tid].get("side", "")}
+            for tid in token_ids if tid in trades
+        }
+        return {
+            "status": True,
+            "data": {"prices": prices, "count": len(prices), "errors": errors},
+            "message": f"Retrieved last trade prices for {len(prices)} of {len(token_ids)} tokens",
+        }
+    except Exception as e:
+        return {"status": False, "data": None, "message": f"Error fetching last trade prices: {str(e)}"}
@@ -1,10 +1,85 @@
+import calendar
 import feedparser
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import tempfile
 import time
+import urllib.error
 import urllib.parse
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 
 
+DEFAULT_FEED_CACHE_DIR = "/tmp/rss-feed-cache"
+DEFAULT_FEED_TIMEOUT = 10
+DEFAULT_MAX_WORKERS = 8
+USER_AGENT = "Mozilla/5.0 (compatible; machina-rss-feed/1.0)"
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _build_google_news_url(query, language="en-US", country="US", after=None, before=None):
+    lang_code = language.split("-")[0] if "-" in language else language
+    ceid = f"{country}:{lang_code}"
+    query_parts = [query]
+    if after:
+        query_parts.append(f"after:{after}")
+    if before:
+        query_parts.append(f"before:{before}")
+    full_query = " ".join(query_parts)
+    encoded_query = urllib.parse.quote_plus(full_query)
+    encoded_country = urllib.parse.quote_plus(country)
+    encoded_ceid = urllib.parse.quote_plus(ceid)
+    url = f"https://news.google.com/rss/search?q={encoded_query}&hl={language}&gl={encoded_country}&ceid={encoded_ceid}"
+    return url
+
+def _parse_entry(entry):
+    content = ""
+    if hasattr(entry, 'content'):
+        content = entry.content[0].value if entry.content else ""
+    elif hasattr(entry, 'description'):
+        content = entry.description
+    elif hasattr(entry, 'summary'):
+        content = entry.summary
+    published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    published_iso = ""
+    if published_parsed:
+        published_iso = datetime.fromtimestamp(time.mktime(published_parsed)).isoformat()
+    return {
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "id": entry.get("id", ""),
+        "published": entry.get("published", entry.get("updated", "")),
+        "published_iso": published_iso,
+        "author": entry.get("author", ""),
+        "summary": entry.get("summary", ""),
+        "content": content,
+        "tags": [tag.term for tag in entry.tags] if hasattr(entry, 'tags') else []
+    }
+
+def _sort_entries_by_date(entries, reverse=True):
+    def get_sort_key(entry):
+        published_iso = entry.get("published_iso", "")
+        if published_iso:
+            try:
+                return datetime.fromisoformat(published_iso.replace('Z', '+00:00'))
+            except (ValueError, AttributeError):
+                pass
+        published = entry.get("published", "")
+        if published:
+            try:
+                dt = parsedate_to_datetime(published)
+                return dt
+            except (ValueError, TypeError):
+                pass
+        return datetime.min if reverse else datetime.max
+    return sorted(entries, key=get_sort_key, reverse=reverse)
+
+
 def fetch_feed(request_data):
     """
     Fetch and parse an RSS/Atom feed.
@@ -26,63 +101,6 @@ def fetch_feed(request_data):
     """
     params = request_data.get("params")
     
-    def _build_google_news_url(query, language="en-US", country="US", after=None, before=None):
-        lang_code = language.split("-")[0] if "-" in language else language
-        ceid = f"{country}:{lang_code}"
-        query_parts = [query]
-        if after:
-            query_parts.append(f"after:{after}")
-        if before:
-            query_parts.append(f"before:{before}")
-        full_query = " ".join(query_parts)
-        encoded_query = urllib.parse.quote_plus(full_query)
-        encoded_country = urllib.parse.quote_plus(country)
-        encoded_ceid = urllib.parse.quote_plus(ceid)
-        url = f"https://news.google.com/rss/search?q={encoded_query}&hl={language}&gl={encoded_country}&ceid={encoded_ceid}"
-        return url
-
-    def _parse_entry(entry):
-        content = ""
-        if hasattr(entry, 'content'):
-            content = entry.content[0].value if entry.content else ""
-        elif hasattr(entry, 'description'):
-            content = entry.description
-        elif hasattr(entry, 'summary'):
-            content = entry.summary
-        published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
-        published_iso = ""
-        if published_parsed:
-            published_iso = datetime.fromtimestamp(time.mktime(published_parsed)).isoformat()
-        return {
-            "title": entry.get("title", ""),
-            "link": entry.get("link", ""),
-            "id": entry.get("id", ""),
-            "published": entry.get("published", entry.get("updated", "")),
-            "published_iso": published_iso,
-            "author": entry.get("author", ""),
-            "summary": entry.get("summary", ""),
-            "content": content,
-            "tags": [tag.term for tag in entry.tags] if hasattr(entry, 'tags') else []
-        }
-
-    def _sort_entries_by_date(entries, reverse=True):
-        def get_sort_key(entry):
-            published_iso = entry.get("published_iso", "")
-            if published_iso:
-                try:
-                    return datetime.fromisoformat(published_iso.replace('Z', '+00:00'))
-                except (ValueError, AttributeError):
-                    pass
-            published = entry.get("published", "")
-            if published:
-                try:
-                    dt = parsedate_to_datetime(published)
-                    return dt
-                except (ValueError, TypeError):
-                    pass
-            return datetime.min if reverse else datetime.max
-        return sorted(entries, key=get_sort_key, reverse=reverse)
-
     google_news = params.get("google_news", False)
     if isinstance(google_news, str):
         google_news = google_news.lower() in ('true', '1', 'yes')
@@ -169,63 +187,6 @@ def fetch_items(request_data):
     """
     params = request_data.get("params")
     
-    def _build_google_news_url(query, language="en-US", country="US", after=None, before=None):
-        lang_code = language.split("-")[0] if "-" in language else language
-        ceid = f"{country}:{lang_code}"
-        query_parts = [query]
-        if after:
-            query_parts.append(f"after:{after}")
-        if before:
-            query_parts.append(f"before:{before}")
-        full_query = " ".join(query_parts)
-        encoded_query = urllib.parse.quote_plus(full_query)
-        encoded_country = urllib.parse.quote_plus(country)
-        encoded_ceid = urllib.parse.quote_plus(ceid)
-        url = f"https://news.google.com/rss/search?q={encoded_query}&hl={language}&gl={encoded_country}&ceid={encoded_ceid}"
-        return url
-
-    def _parse_entry(entry):
-        content = ""
-        if hasattr(entry, 'content'):
-            content = entry.content[0].value if entry.content else ""
-        elif hasattr(entry, 'description'):
-            content = entry.description
-        elif hasattr(entry, 'summary'):
-            content = entry.summary
-        published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
-        published_iso = ""
-        if published_parsed:
-            published_iso = datetime.fromtimestamp(time.mktime(published_parsed)).isoformat()
-        return {
-            "title": entry.get("title", ""),
-            "link": entry.get("link", ""),
-            "id": entry.get("id", ""),
-            "published": entry.get("published", entry.get("updated", "")),
-            "published_iso": published_iso,
-            "author": entry.get("author", ""),
-            "summary": entry.get("summary", ""),
-            "content": content,
-            "tags": [tag.term for tag in entry.tags] if hasattr(entry, 'tags') else []
-        }
-
-    def _sort_entries_by_date(entries, reverse=True):
-        def get_sort_key(entry):
-            published_iso = entry.get("published_iso", "")
-            if published_iso:
-                try:
-                    return datetime.fromisoformat(published_iso.replace('Z', '+00:00'))
-                except (ValueError, AttributeError):
-                    pass
-            published = entry.get("published", "")
-            if published:
-                try:
-                    dt = parsedate_to_datetime(published)
-                    return dt
-                except (ValueError, TypeError):
-                    pass
-            return datetime.min if reverse else datetime.max
-        return sorted(entries, key=get_sort_key, reverse=reverse)
-
     google_news = params.get("google_news", False)
     if isinstance(google_news, str):
         google_news = google_news.lower() in ('true', '1', 'yes')
@@ -298,3 +259,338 @@ def fetch_items(request_data):
 
     except Exception as e:
         return {"status": False, "message": f"Exception when fetching items: {e}"}
+
+
+def _as_bool(value, default=False):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def _feed_spec_url(spec):
+    """Resolve a feed spec (URL string or dict with url / google_news query) to a URL."""
+    if isinstance(spec, str):
+        return spec.strip()
+    if not isinstance(spec, dict):
+        return ""
+    if _as_bool(spec.get("google_news")):
+        if not spec.get("query"):
+            return ""
+        return _build_google_news_url(
+            spec["query"],
+            spec.get("language", "en-US"),
+            spec.get("country", "US"),
+            spec.get("after"),
+            spec.get("before"),
+        )
+    return (spec.get("url") or "").strip()
+
+
+def _feed_cache_path(cache_dir, url):
+    return os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_feed_cache(cache_dir, url):
+    """Cached validators and parsed entries of one feed, or None."""
+    try:
+        with open(_feed_cache_path(cache_dir, url), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("url") != url or not isinstance(cached.get("entries"), list):
+        return None
+    return cached
+
+
+def _save_feed_cache(cache_dir, url, validator, entries):
+    # One file per feed, written to a temp file and swapped in, so concurrent
+    # pollers never read a partial entry or drop each other's feeds
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "url": url,
+                "etag": validator.get("etag"),
+                "modified": validator.get("modified"),
+                # Undated entries sort last; JSON has no -inf
+                "entries": [[None if ts == float("-inf") else ts, item] for ts, item in entries],
+            }, f)
+        os.replace(tmp_path, _feed_cache_path(cache_dir, url))
+    except OSError:
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _fetch_conditional(url, validator, deadline):
+    """
+    GET a feed with If-None-Match / If-Modified-Since from its cached validator.
+
+    The body is read in chunks and the fetch fails with TimeoutError once
+    ``deadline`` (time.monotonic()) has passed. Returns (status, body,
+    headers); body is None on 304.
+    """
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8",
+        "Accept-Encoding": "gzip",
+    }
+    if validator:
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("modified"):
+            headers["If-Modified-Since"] = validator["modified"]
+
+    def remaining():
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError("Feed fetch exceeded its timeout")
+        return left
+
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=remaining()) as response:
+            chunks = bytearray()
+            while True:
+                remaining()
+                chunk = response.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks += chunk
+            body = bytes(chunks)
+            response_headers = {k.lower(): v for k, v in response.headers.items()}
+            status = response.status
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, {k.lower(): v for k, v in e.headers.items()}
+        raise
+
+    if response_headers.get("content-encoding", "").lower() == "gzip":
+        body = gzip.decompress(body)
+        response_headers.pop("content-encoding", None)
+    return status, body, response_headers
+
+
+def _entry_timestamp(entry):
+    """UTC epoch seconds of an entry, parsed once; None when it has no usable date."""
+    published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if published_parsed:
+        try:
+            return calendar.timegm(published_parsed)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    published = entry.get("published", entry.get("updated", ""))
+    if published:
+        try:
+            return parsedate_to_datetime(published).timestamp()
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return None
+
+
+def _entry_hashes(item):
+    """Hashes of the guid and link, either one identifies a duplicate."""
+    hashes = []
+    for value in (item.get("id"), item.get("link")):
+        if value:
+            hashes.append(hashlib.sha1(value.strip().encode("utf-8")).hexdigest())
+    return hashes
+
+
+def _fetch_one_feed(url, cache_dir, timeout):
+    """
+    Fetch and parse one feed within ``timeout`` seconds; returns (feed_status,
+    sorted [(ts, item)]). With a cache_dir, a 304 replays the entries cached
+    with the validators, so every caller gets the full feed.
+    """
+    started = time.time()
+    deadline = time.monotonic() + timeout
+    cached = _load_feed_cache(cache_dir, url) if cache_dir else None
+    try:
+        status, body, headers = _fetch_conditional(url, cached, deadline)
+    except Exception as e:
+        return {"url": url, "status": "error", "message": str(e)}, []
+
+    if status == 304:
+        entries = [
+            (ts if ts is not None else float("-inf"), item)
+            for ts, item in cached["entries"]
+        ]
+        return {
+            "url": url,
+            "status": "not_modified",
+            "title": entries[0][1].get("feed_title", "") if entries else "",
+            "count": len(entries),
+            "elapsed_ms": int((time.time() - started) * 1000),
+        }, entries
+
+    try:
+        feed = feedparser.parse(body, response_headers=headers)
+    except Exception as e:
+        return {"url": url, "status": "error", "message": f"Failed to parse feed: {e}"}, []
+
+    if feed.bozo and not feed.entries and not feed.feed:
+        return {"url": url, "status": "error", "message": f"Failed to parse feed: {feed.bozo_exception}"}, []
+
+    feed_title = feed.feed.get("title", "")
+    entries = []
+    for entry in feed.entries:
+        item = _parse_entry(entry)
+        item["feed_url"] = url
+        item["feed_title"] = feed_title
+        ts = _entry_timestamp(entry)
+        entries.append((ts if ts is not None else float("-inf"), item))
+    # Newest first; the sort is stable so undated entries keep feed order
+    entries.sort(key=lambda pair: pair[0], reverse=True)
+
+    if cache_dir and (headers.get("etag") or headers.get("last-modified")):
+        _save_feed_cache(cache_dir, url, {"etag": headers.get("etag"), "modified": headers.get("last-modified")}, entries)
+
+    return {
+        "url": url,
+        "status": "ok",
+        "title": feed_title,
+        "count": len(entries),
+        "elapsed_ms": int((time.time() - started) * 1000),
+    }, entries
+
+
+def _fetch_all(urls, cache_dir, timeout, max_workers):
+    """
+    Run _fetch_one_feed for every URL in a thread pool. A feed still running
+    ``timeout`` seconds after it started is reported as timed out and its
+    worker abandoned; it stops at its next read.
+    """
+    started = {}
+
+    def run(url):
+        started[url] = time.monotonic()
+        return _fetch_one_feed(url, cache_dir, timeout)
+
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(run, url): url for url in urls}
+        while pending:
+            now = time.monotonic()
+            for future, url in list(pending.items()):
+                if not future.done() and url in started and now - started[url] >= timeout:
+                    del pending[future]
+                    results[url] = ({"url": url, "status": "error", "message": f"Timed out after {timeout}s"}, [])
+            deadlines = [started[url] + timeout - now for url in pending.values() if url in started]
+            # Workers that have not recorded their start yet are polled shortly
+            wait_for = min(deadlines) if deadlines else 0.05
+            done, _ = wait(pending, timeout=max(wait_for, 0.01), return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [results[url] for url in urls]
+
+
+def fetch_feeds(request_data):
+    """
+    Fetch many RSS/Atom feeds concurrently and merge their items by date.
+
+    Each feed is requested with its cached ETag / Last-Modified validators, so
+    feeds that answer 304 Not Modified are not downloaded or parsed again;
+    their items are replayed from the entries cached with the validators.
+    Items are de-duplicated across feeds by guid/link hash and k-way merged
+    newest first.
+
+    Args:
+        request_data (dict): Dictionary containing:
+            - params (dict): Dictionary with:
+                - urls (list, optional): Feed URLs
+                - feeds (list, optional): Feed specs, either URL strings or dicts with
+                  "url", or "google_news": True plus "query", "language", "country",
+                  "after", "before"
+                - limit (int, optional): Max number of merged items to return
+                - timeout (int, optional): Per-feed deadline in seconds, covering connect,
+                  download and parse (default: 10)
+                - max_workers (int, optional): Concurrent fetches (default: 8)
+                - use_validators (bool, optional): Send conditional requests and update
+                  the feed cache (default: True)
+                - feed_cache_dir (str, optional): Directory with one validators + entries
+                  file per feed (default: /tmp/rss-feed-cache)
+
+    Returns:
+        dict: Status, merged items and per-feed fetch status.
+    """
+    params = request_data.get("params", {}) or {}
+
+    specs = list(params.get("urls") or []) + list(params.get("feeds") or [])
+    urls = []
+    invalid = []
+    for spec in specs:
+        url = _feed_spec_url(spec)
+        if not url:
+            invalid.append(spec)
+        elif url not in urls:
+            urls.append(url)
+
+    if not urls:
+        return {"status": False, "message": "At least one feed URL is required in urls or feeds."}
+
+    try:
+        timeout = float(params.get("timeout") or DEFAULT_FEED_TIMEOUT)
+        max_workers = max(1, min(int(params.get("max_workers") or DEFAULT_MAX_WORKERS), len(urls)))
+    except (ValueError, TypeError):
+        return {"status": False, "message": "timeout and max_workers must be numbers."}
+
+    use_validators = _as_bool(params.get("use_validators"), default=True)
+    cache_dir = (params.get("feed_cache_dir") or DEFAULT_FEED_CACHE_DIR) if use_validators else None
+
+    try:
+        results = _fetch_all(urls, cache_dir, timeout, max_workers)
+
+        feeds = []
+        per_feed_entries = []
+        for feed_status, entries in results:
+            feeds.append(feed_status)
+            per_feed_entries.append(entries)
+
+        limit = None
+        if params.get("limit"):
+            try:
+                limit = int(params["limit"])
+            except (ValueError, TypeError):
+                pass # Ignore invalid limit
+
+        # Every feed is already sorted newest first, so a k-way merge is enough
+        items = []
+        seen = set()
+        duplicates_removed = 0
+        for _, item in heapq.merge(*per_feed_entries, key=lambda pair: pair[0], reverse=True):
+            hashes = _entry_hashes(item)
+            if any(h in seen for h in hashes):
+                duplicates_removed += 1
+                continue
+            seen.update(hashes)
+            items.append(item)
+            if limit is not None and len(items) >= limit:
+                break
+
+        errors = [f for f in feeds if f["status"] == "error"]
+        errors.extend({"url": spec, "status": "error", "message": "Invalid feed spec."} for spec in invalid)
+
+        return {
+            "status": True,
+            "data": {
+                "items": items,
+                "count": len(items),
+                "feeds": feeds,
+                "not_modified": sum(1 for f in feeds if f["status"] == "not_modified"),
+                "errors": errors,
+                "duplicates_removed": duplicates_removed,
+            }
+        }
+
+    except Exception as e:
+        return {"status": False, "message": f"Exception when fetching feeds: {e}"}
@@ -1,3 +1,371 @@
+import hashlib
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+
+BASE_URL = "https://api.sociavault.com/v1"
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_ATTEMPTS = 3
+# Full jitter: retry n sleeps a random time up to min(cap, base * 2**n)
+RETRY_BASE_DELAY = 1.5
+RETRY_MAX_DELAY = 20.0
+
+# Requests per second and burst size, shared by all calls with the same API key
+DEFAULT_RATE_LIMIT = float(os.environ.get("SOCIAVAULT_RATE_LIMIT", "5"))
+DEFAULT_BURST = int(os.environ.get("SOCIAVAULT_BURST", "10"))
+DEFAULT_MAX_WORKERS = 8
+
+# Statuses that are never retried
+NON_RETRYABLE_STATUSES = (400, 401, 402)
+
+# Scrape responses are cached on disk across runs, one JSON file per
+# (endpoint, params). TTLs in seconds per endpoint; a `cache_ttl` param
+# overrides them per call and SOCIAVAULT_CACHE_TTLS='{"posts": 300}' per container.
+CACHE_DIR = os.environ.get("SOCIAVAULT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "sociavault-cache")
+CACHE_TTLS = {
+    "profile": 6 * 3600,
+    "posts": 15 * 60,
+    "reels": 15 * 60,
+    "comments": 60 * 60,
+    # Posts remembered for incremental fetching; older lists are refetched so
+    # like and comment counts do not freeze
+    "known_posts": 24 * 3600,
+}
+try:
+    CACHE_TTLS.update(json.loads(os.environ.get("SOCIAVAULT_CACHE_TTLS") or "{}"))
+except ValueError:
+    pass
+# Posts remembered per handle for incremental fetching
+KNOWN_POSTS_LIMIT = 500
+DEFAULT_MAX_PAGES = 5
+
+_clients = {}
+_clients_lock = threading.Lock()
+_connections = threading.local()
+
+
+class _TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate, burst):
+        self.rate = max(float(rate), 0.01)
+        self.burst = max(int(burst), 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _SociaVaultClient:
+    """
+    Per API key state: the rate limiter and the last known credit balance.
+    Credits come from get_credits and are decremented by each response's
+    credits_used. The balance is only an estimate used to size batches;
+    single calls always go to the API, which is the authority on credits.
+    """
+
+    def __init__(self, rate, burst):
+        self.limiter = _TokenBucket(rate, burst)
+        self.credits = None
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate, burst):
+        with self.limiter.lock:
+            self.limiter.rate = max(float(rate), 0.01)
+            self.limiter.burst = max(int(burst), 1)
+
+    def set_credits(self, credits):
+        with self.lock:
+            self.credits = credits
+
+    def spend(self, credits_used):
+        with self.lock:
+            if self.credits is not None and isinstance(credits_used, (int, float)):
+                self.credits = max(self.credits - credits_used, 0)
+
+
+def _get_client(api_key, rate=None, burst=None):
+    # One client per API key, keyed by its hash
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _SociaVaultClient(rate or DEFAULT_RATE_LIMIT, burst or DEFAULT_BURST)
+            _clients[key] = client
+        elif rate:
+            client.set_rate(rate, burst or client.limiter.burst)
+        return client
+
+
+def _get_connection(timeout):
+    """Keep-alive connection to the API host, one per thread. Returns (conn, reused)."""
+    parts = urllib.parse.urlsplit(BASE_URL)
+    key = (parts.scheme, parts.netloc)
+    conn = getattr(_connections, "conn", None)
+    if conn is not None and getattr(_connections, "key", None) == key:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+    if conn is not None:
+        conn.close()
+    conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(parts.netloc, timeout=timeout)
+    _connections.conn, _connections.key = conn, key
+    return conn, False
+
+
+def _drop_connection():
+    conn = getattr(_connections, "conn", None)
+    if conn is not None:
+        conn.close()
+    _connections.conn = None
+
+
+def _get(path, api_key, timeout):
+    """One GET on the pooled connection. Returns (status, headers, body)."""
+    headers = {"Accept": "application/json"}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    conn, reused = _get_connection(timeout)
+    try:
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+        _drop_connection()
+        if not reused:
+            raise
+        # The server closed an idle keep-alive connection; reconnect once
+        conn, _ = _get_connection(timeout)
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except Exception:
+            _drop_connection()
+            raise
+    except Exception:
+        _drop_connection()
+        raise
+    if resp.will_close:
+        _drop_connection()
+    return resp.status, resp.headers, body
+
+
+def _retry_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def _request(endpoint, params=None, api_key=None, timeout=DEFAULT_TIMEOUT, attempts=DEFAULT_ATTEMPTS, meta=None):
+    path = urllib.parse.urlsplit(BASE_URL).path + endpoint
+    if params:
+        clean = {k: v for k, v in params.items() if v is not None and v != ""}
+        if clean:
+            path += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
+
+    client = _get_client(api_key or "")
+
+    # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
+    # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
+    # errors, transient 5xx/429). Retry those; never retry 400/401/402.
+    last_err = None
+    for attempt in range(attempts):
+        retry_after = None
+        client.limiter.acquire()
+        try:
+            status, headers, body = _get(path, api_key, timeout)
+            if 200 <= status < 300:
+                raw = json.loads(body.decode())
+                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
+                    client.spend(raw.get("credits_used"))
+                    if meta is not None:
+                        meta["credits_used"] = raw.get("credits_used")
+                    if not raw.get("success"):
+                        return {"error": True, "message": raw.get("message", "API returned success=false")}
+                    return raw.get("data", raw)
+                return raw
+            last_err = {"error": True, "status_code": status, "message": body.decode(errors="replace")}
+            if status in NON_RETRYABLE_STATUSES:
+                return last_err
+            if status == 429:
+                retry_after = headers.get("Retry-After")
+        except Exception as e:
+            last_err = {"error": True, "message": str(e)}
+        if attempt < attempts - 1:
+            time.sleep(_retry_delay(attempt, retry_after))
+    return last_err
+
+
+def _as_bool(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return bool(value)
+
+
+def _cache_path(kind, key_parts):
+    digest = hashlib.sha256(json.dumps([kind, key_parts], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, kind, digest[:2], f"{digest}.json")
+
+
+def _cache_read(kind, key_parts, ttl=None):
+    """Cached entry, or None when missing, unreadable or older than ttl seconds."""
+    path = _cache_path(kind, key_parts)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ttl is not None and time.time() - entry.get("stored_at", 0) > ttl:
+        return None
+    return entry
+
+
+def _cache_write(kind, key_parts, entry):
+    path = _cache_path(kind, key_parts)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**entry, "stored_at": time.time()}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _cache_ttl(kind, params):
+    ttl = params.get("cache_ttl")
+    if ttl not in (None, ""):
+        return float(ttl)
+    return float(CACHE_TTLS.get(kind, 0))
+
+
+def _cached_request(kind, endpoint, query, api_key, params):
+    """
+    _request through the response cache. Returns (response, cache_hit,
+    credits_saved); only successful responses are stored.
+    """
+    ttl = _cache_ttl(kind, params)
+    use_cache = _as_bool(params.get("use_cache"), default=True) and ttl > 0
+    key_parts = [endpoint, {k: v for k, v in query.items() if v is not None and v != ""}]
+    if use_cache:
+        entry = _cache_read(kind, key_parts, ttl)
+        if entry is not None:
+            return entry["response"], True, entry.get("credits_used") or 0
+
+    meta = {}
+    response = _request(endpoint, params=query, api_key=api_key, meta=meta)
+    if use_cache and not (isinstance(response, dict) and response.get("error")):
+        _cache_write(kind, key_parts, {"response": response, "credits_used": meta.get("credits_used") or 0})
+    return response, False, 0
+
+
+def _cache_params(params):
+    """Cache and paging params forwarded from a batch to each per-handle call."""
+    names = ("use_cache", "cache_ttl", "incremental", "max_pages")
+    return {name: params[name] for name in names if params.get(name) not in (None, "")}
+
+
+def _check_error(response):
+    if isinstance(response, dict) and response.get("error"):
+        status_code = response.get("status_code", "unknown")
+        if status_code == 401:
+            return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
+        if status_code == 402:
+            return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
+        return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
+    return None
+
+
+def _handle_list(value):
+    """Handles from a list or a comma separated string, deduplicated in order."""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return []
+    handles = []
+    for raw in value:
+        handle = str(raw).strip() if raw else ""
+        if handle and handle not in ("[]", "None") and handle not in handles:
+            handles.append(handle)
+    return handles
+
+
+def _prepare_batch(request_data):
+    """Apply the batch's rate settings and refresh the credit balance. Returns an error response or None."""
+    params = request_data.get("params", {})
+    api_key = request_data.get("headers", {}).get("api_key", "")
+    rate = params.get("rate_limit")
+    _get_client(api_key, float(rate) if rate else None, int(params.get("burst") or 0) or None)
+    if str(params.get("check_credits", "true")).lower() in ("true", "1", "yes"):
+        credits = get_credits(request_data)
+        if not credits["status"]:
+            return credits
+    return None
+
+
+def _run_batch(command, request_data, handles, extra_params, max_workers, credits_per_handle=1):
+    """
+    Run a single-handle command for many handles concurrently. The shared
+    rate limiter paces the requests. With check_credits, handles beyond what
+    the balance covers at `credits_per_handle` (worst case) each are skipped.
+    Results keep the input order.
+    """
+    api_key = request_data.get("headers", {}).get("api_key", "")
+    budget = None
+    # Only a balance _prepare_batch just read sizes the batch, never a stale estimate
+    if str(request_data.get("params", {}).get("check_credits", "true")).lower() in ("true", "1", "yes"):
+        client = _get_client(api_key)
+        with client.lock:
+            budget = client.credits
+
+    if budget is None:
+        scheduled = handles
+    else:
+        scheduled = handles[:max(int(budget // max(credits_per_handle, 1)), 0)]
+    skipped = handles[len(scheduled):]
+
+    def run(handle):
+        result = command({"headers": request_data.get("headers", {}), "params": {**extra_params, "handle": handle}})
+        return {"handle": handle, **result}
+
+    results = []
+    if scheduled:
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(scheduled)), 1)) as executor:
+            results = list(executor.map(run, scheduled))
+    for handle in skipped:
+        results.append({"handle": handle, "status": False, "data": None, "message": "Skipped: credit budget exhausted."})
+
+    succeeded = sum(1 for result in results if result["status"])
+    return results, succeeded, len(skipped)
+
+
 def _sv_first_image_url(item):
     # SociaVault returns image_versions2.candidates as a dict ({"0": {...}})
     # OR a list depending on the account/endpoint. Normalize and guard the
@@ -16,47 +384,6 @@ def _sv_first_image_url(item):
 
 
 def get_credits(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
     try:
         headers = request_data.get("headers", {})
         api_key = headers.get("api_key", "")
@@ -70,6 +397,11 @@ def get_credits(request_data):
                 return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
             return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
 
+        # Batch commands stop scheduling handles once this budget is spent
+        credits = response.get("credits")
+        if isinstance(credits, (int, float)):
+            _get_client(api_key).set_credits(credits)
+
         return {
             "status": True,
             "data": {
@@ -83,57 +415,6 @@ def get_credits(request_data):
 
 
 def instagram_get_profile(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
-
     try:
         headers = request_data.get("headers", {})
         params = request_data.get("params", {})
@@ -147,7 +428,7 @@ def instagram_get_profile(request_data):
             return {"status": False, "data": None, "message": "Parameter 'handle' is required (Instagram username)."}
 
         trim = params.get("trim", "true")
-        response = _request("/scrape/instagram/profile", params={"handle": handle, "trim": trim}, api_key=api_key)
+        response, cache_hit, credits_saved = _cached_request("profile", "/scrape/instagram/profile", {"handle": handle, "trim": trim}, api_key, params)
 
         err = _check_error(response)
         if err:
@@ -218,7 +499,9 @@ def instagram_get_profile(request_data):
             "data": {
                 "profile": profile,
                 "recent_videos": recent_videos,
-                "platform": "instagram"
+                "platform": "instagram",
+                "cache_hit": cache_hit,
+                "credits_saved": credits_saved
             },
             "message": f"Profile retrieved for @{profile.get('username', handle)}: {profile.get('followers_count', 0)} followers"
         }
@@ -226,58 +509,60 @@ def instagram_get_profile(request_data):
         return {"status": False, "data": None, "message": f"Error fetching Instagram profile: {str(e)}"}
 
 
-def instagram_get_posts(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
+def instagram_get_profiles(request_data):
+    """
+    Fetch many Instagram profiles concurrently within the rate limit.
+
+    Params: handles (list or comma separated), trim, max_workers (default 8),
+    rate_limit (requests/second), burst, check_credits (default true, reads
+    the credit balance first so the batch stops before it runs out),
+    use_cache and cache_ttl (passed to each lookup).
+    """
+    try:
+        headers = request_data.get("headers", {})
+        params = request_data.get("params", {})
+        api_key = headers.get("api_key", "")
+        if not api_key:
+            return {"status": False, "data": None, "message": "API key is required. Set the SociaVault-API-Key secret."}
+
+        handles = _handle_list(params.get("handles", []))
+        if not handles:
+            return {"status": False, "data": None, "message": "Parameter 'handles' is required (list of Instagram usernames)."}
+
+        err = _prepare_batch(request_data)
+        if err:
+            return err
+
+        extra_params = {"trim": params.get("trim", "true"), **_cache_params(params)}
+        results, succeeded, skipped = _run_batch(instagram_get_profile, request_data, handles, extra_params, int(params.get("max_workers") or DEFAULT_MAX_WORKERS))
+
+        return {
+            "status": True,
+            "data": {
+                "results": results,
+                "count": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded - skipped,
+                "skipped": skipped,
+                "credits_saved": sum(result["data"]["credits_saved"] for result in results if result["status"]),
+                "platform": "instagram"
+            },
+            "message": f"Retrieved {succeeded} of {len(results)} Instagram profiles"
+        }
+    except Exception as e:
+        return {"status": False, "data": None, "message": f"Error fetching Instagram profiles: {str(e)}"}
+
 
+def instagram_get_posts(request_data):
+    """
+    Fetch one page of posts for a handle, or with `incremental` page from the
+    newest post until one already seen for this handle (at most `max_pages`
+    pages) and return the new posts merged with the remembered ones.
+
+    Pinned posts come first on page 1, so known posts in the leading run do
+    not end the paging; it stops at a known post that follows a new one, or
+    at a page made only of known posts.
+    """
     def _normalize_post(item):
         caption_text = ""
         caption = item.get("caption", {})
@@ -298,28 +583,7 @@ def instagram_get_posts(request_data):
             "video_url": item.get("video_url", ""),
         }
 
-    try:
-        headers = request_data.get("headers", {})
-        params = request_data.get("params", {})
-        api_key = headers.get("api_key", "")
-        if not api_key:
-            return {"status": False, "data": None, "message": "API key is required. Set the SociaVault-API-Key secret."}
-
-        raw_handle = params.get("handle", "")
-        handle = str(raw_handle).strip() if raw_handle else ""
-        if not handle or handle in ("[]", "None"):
-            return {"status": False, "data": None, "message": "Parameter 'handle' is required (Instagram username)."}
-
-        query = {"handle": handle}
-        if params.get("next_max_id"):
-            query["next_max_id"] = str(params["next_max_id"])
-
-        response = _request("/scrape/instagram/posts", params=query, api_key=api_key)
-
-        err = _check_error(response)
-        if err:
-            return err
-
+    def _parse_page(response):
         data = response if isinstance(response, dict) else {}
         # Unwrap inner envelope if present (scrape endpoints return {success, data: {actual_data}})
         if isinstance(data.get("data"), (dict, list)):
@@ -337,74 +601,172 @@ def instagram_get_posts(request_data):
         for item in items:
             if isinstance(item, dict):
                 posts.append(_normalize_post(item))
-        next_max_id = data.get("next_max_id", None)
+        return posts, data.get("next_max_id", None)
+
+    try:
+        headers = request_data.get("headers", {})
+        params = request_data.get("params", {})
+        api_key = headers.get("api_key", "")
+        if not api_key:
+            return {"status": False, "data": None, "message": "API key is required. Set the SociaVault-API-Key secret."}
+
+        raw_handle = params.get("handle", "")
+        handle = str(raw_handle).strip() if raw_handle else ""
+        if not handle or handle in ("[]", "None"):
+            return {"status": False, "data": None, "message": "Parameter 'handle' is required (Instagram username)."}
+
+        if not _as_bool(params.get("incremental"), default=False):
+            query = {"handle": handle}
+            if params.get("next_max_id"):
+                query["next_max_id"] = str(params["next_max_id"])
+
+            response, cache_hit, credits_saved = _cached_request("posts", "/scrape/instagram/posts", query, api_key, params)
+
+            err = _check_error(response)
+            if err:
+                return err
+
+            posts, next_max_id = _parse_page(response)
+
+            return {
+                "status": True,
+                "data": {
+                    "posts": posts,
+                    "count": len(posts),
+                    "next_max_id": next_max_id,
+                    "has_more": next_max_id is not None,
+                    "cache_hit": cache_hit,
+                    "credits_saved": credits_saved
+                },
+                "message": f"Retrieved {len(posts)} posts for @{handle}"
+            }
+
+        known = (_cache_read("known_posts", [handle], CACHE_TTLS.get("known_posts")) or {}).get("posts", [])
+        known_ids = {post["id"] for post in known}
+        max_pages = max(int(params.get("max_pages") or DEFAULT_MAX_PAGES), 1)
+
+        fresh = []
+        next_max_id = None
+        pages = 0
+        cache_hits = 0
+        credits_saved = 0
+        reached_known = False
+        seen_new = False
+        while pages < max_pages:
+            query = {"handle": handle}
+            if next_max_id:
+                query["next_max_id"] = str(next_max_id)
+            response, cache_hit, saved = _cached_request("posts", "/scrape/instagram/posts", query, api_key, params)
+            err = _check_error(response)
+            if err:
+                if not pages:
+                    return err
+                break
+            pages += 1
+            cache_hits += int(cache_hit)
+            credits_saved += saved
+
+            page_posts, next_max_id = _parse_page(response)
+            fresh.extend(page_posts)
+            page_known = 0
+            for post in page_posts:
+                if post["id"] not in known_ids:
+                    seen_new = True
+                elif seen_new:
+                    reached_known = True
+                else:
+                    page_known += 1
+            if reached_known or (page_posts and page_known == len(page_posts)):
+                reached_known = True
+                break
+            if next_max_id is None:
+                break
+
+        fresh_ids = {post["id"] for post in fresh}
+        new_count = len(fresh_ids - known_ids)
+        if reached_known or next_max_id is None:
+            merged = fresh + [post for post in known if post["id"] not in fresh_ids]
+        else:
+            # Stopped before reaching a known post: keep only the contiguous
+            # newest run, so the next incremental fetch can stop on it safely
+            merged = fresh
+        merged = merged[:KNOWN_POSTS_LIMIT]
+        _cache_write("known_posts", [handle], {"posts": merged})
 
         return {
             "status": True,
             "data": {
-                "posts": posts,
-                "count": len(posts),
-                "next_max_id": next_max_id,
-                "has_more": next_max_id is not None
+                "posts": merged,
+                "count": len(merged),
+                "new_count": new_count,
+                "pages_fetched": pages,
+                "next_max_id": None if reached_known else next_max_id,
+                "has_more": not reached_known and next_max_id is not None,
+                "cache_hit": pages > 0 and cache_hits == pages,
+                "credits_saved": credits_saved
             },
-            "message": f"Retrieved {len(posts)} posts for @{handle}"
+            "message": f"Retrieved {new_count} new posts for @{handle} ({len(merged)} known)"
         }
     except Exception as e:
         return {"status": False, "data": None, "message": f"Error fetching Instagram posts: {str(e)}"}
 
 
-def instagram_get_reels(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
+def instagram_get_posts_many(request_data):
+    """
+    Fetch the latest posts page for many Instagram handles concurrently.
+
+    Params: handles (list or comma separated), max_workers (default 8),
+    rate_limit (requests/second), burst, check_credits (default true), and
+    use_cache, cache_ttl, incremental, max_pages (passed to each lookup).
+    """
+    try:
+        headers = request_data.get("headers", {})
+        params = request_data.get("params", {})
+        api_key = headers.get("api_key", "")
+        if not api_key:
+            return {"status": False, "data": None, "message": "API key is required. Set the SociaVault-API-Key secret."}
+
+        handles = _handle_list(params.get("handles", []))
+        if not handles:
+            return {"status": False, "data": None, "message": "Parameter 'handles' is required (list of Instagram usernames)."}
+
+        err = _prepare_batch(request_data)
+        if err:
+            return err
+
+        # Incremental lookups may page up to max_pages, one credit per page
+        credits_per_handle = 1
+        if _as_bool(params.get("incremental"), default=False):
+            credits_per_handle = max(int(params.get("max_pages") or DEFAULT_MAX_PAGES), 1)
+
+        results, succeeded, skipped = _run_batch(
+            instagram_get_posts,
+            request_data,
+            handles,
+            _cache_params(params),
+            int(params.get("max_workers") or DEFAULT_MAX_WORKERS),
+            credits_per_handle,
+        )
+        post_count = sum(result["data"]["count"] for result in results if result["status"])
+
+        return {
+            "status": True,
+            "data": {
+                "results": results,
+                "count": len(results),
+                "post_count": post_count,
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded - skipped,
+                "skipped": skipped,
+                "credits_saved": sum(result["data"]["credits_saved"] for result in results if result["status"])
+            },
+            "message": f"Retrieved {post_count} posts for {succeeded} of {len(results)} handles"
+        }
+    except Exception as e:
+        return {"status": False, "data": None, "message": f"Error fetching Instagram posts: {str(e)}"}
 
+
+def instagram_get_reels(request_data):
     def _normalize_reel(item):
         caption_text = ""
         caption = item.get("caption", {})
@@ -443,7 +805,7 @@ def instagram_get_reels(request_data):
         if params.get("max_id"):
             query["max_id"] = params["max_id"]
 
-        response = _request("/scrape/instagram/reels", params=query, api_key=api_key)
+        response, cache_hit, credits_saved = _cached_request("reels", "/scrape/instagram/reels", query, api_key, params)
 
         err = _check_error(response)
         if err:
@@ -466,7 +828,9 @@ def instagram_get_reels(request_data):
                 "reels": reels,
                 "count": len(reels),
                 "max_id": max_id,
-                "has_more": max_id is not None
+                "has_more": max_id is not None,
+                "cache_hit": cache_hit,
+                "credits_saved": credits_saved
             },
             "message": f"Retrieved {len(reels)} reels for @{handle}"
         }
@@ -475,57 +839,6 @@ def instagram_get_reels(request_data):
 
 
 def instagram_get_post_info(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
-
     try:
         headers = request_data.get("headers", {})
         params = request_data.get("params", {})
@@ -577,57 +890,6 @@ def instagram_get_post_info(request_data):
 
 
 def instagram_get_comments(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
-
     def _normalize_comment(item):
         user = item.get("user", {})
         return {
@@ -654,7 +916,7 @@ def instagram_get_comments(request_data):
         if params.get("cursor"):
             query["cursor"] = params["cursor"]
 
-        response = _request("/scrape/instagram/comments", params=query, api_key=api_key)
+        response, cache_hit, credits_saved = _cached_request("comments", "/scrape/instagram/comments", query, api_key, params)
 
         err = _check_error(response)
         if err:
@@ -677,7 +939,9 @@ def instagram_get_comments(request_data):
                 "comments": comments,
                 "count": len(comments),
                 "cursor": cursor,
-                "has_more": cursor is not None
+                "has_more": cursor is not None,
+                "cache_hit": cache_hit,
+                "credits_saved": credits_saved
             },
             "message": f"Retrieved {len(comments)} comments"
         }
@@ -686,57 +950,6 @@ def instagram_get_comments(request_data):
 
 
 def instagram_get_highlights(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        # Retry-with-backoff: SociaVault's scrape endpoints are flaky under
-        # sustained load (intermittent 404 "Account doesn't exist", empty/unknown
-        # errors, transient 5xx/429). Retry those; never retry 400/401.
-        last_err = None
-        for _attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode())
-                if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                    if not raw.get("success"):
-                        return {"error": True, "message": raw.get("message", "API returned success=false")}
-                    return raw.get("data", raw)
-                return raw
-            except urllib.error.HTTPError as e:
-                body = e.read().decode() if e.fp else ""
-                last_err = {"error": True, "status_code": e.code, "message": body}
-                if e.code in (400, 401):
-                    return last_err
-            except Exception as e:
-                last_err = {"error": True, "message": str(e)}
-            if _attempt < 2:
-                time.sleep(1.5 * (2 ** _attempt))
-        return last_err
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
-
     def _normalize_highlight(item):
         return {
             "id": item.get("id", item.get("pk", "")),
@@ -790,47 +1003,6 @@ def instagram_get_highlights(request_data):
 
 
 def instagram_get_transcript(request_data):
-    import json
-    import urllib.request
-    import urllib.error
-    import urllib.parse
-    import time
-    BASE_URL = "https://api.sociavault.com/v1"
-
-    def _request(endpoint, params=None, api_key=None):
-        url = f"{BASE_URL}{endpoint}"
-        if params:
-            clean = {k: v for k, v in params.items() if v is not None and v != ""}
-            if clean:
-                url += "?" + "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in clean.items())
-        req = urllib.request.Request(url)
-        req.add_header("Accept", "application/json")
-        if api_key:
-            req.add_header("X-API-Key", api_key)
-        try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                raw = json.loads(resp.read().decode())
-            if isinstance(raw, dict) and "success" in raw and "credits_used" in raw:
-                if not raw.get("success"):
-                    return {"error": True, "message": raw.get("message", "API returned success=false")}
-                return raw.get("data", raw)
-            return raw
-        except urllib.error.HTTPError as e:
-            body = e.read().decode() if e.fp else ""
-            return {"error": True, "status_code": e.code, "message": body}
-        except Exception as e:
-            return {"error": True, "message": str(e)}
-
-    def _check_error(response):
-        if isinstance(response, dict) and response.get("error"):
-            status_code = response.get("status_code", "unknown")
-            if status_code == 401:
-                return {"status": False, "data": None, "message": "Invalid API key. Please check your SociaVault-API-Key secret."}
-            if status_code == 402:
-                return {"status": False, "data": None, "message": "Insufficient credits. Please top up your SociaVault account."}
-            return {"status": False, "data": None, "message": f"API error ({status_code}): {response.get('message', '')}"}
-        return None
-
     try:
         headers = request_data.get("headers", {})
         params = request_data.get("params", {})
@@ -842,7 +1014,7 @@ def instagram_get_transcript(request_data):
         if not url:
             return {"status": False, "data": None, "message": "Parameter 'url' is required (full Instagram video/reel URL)."}
 
-        response = _request("/scrape/instagram/transcript", params={"url": url}, api_key=api_key)
+        response = _request("/scrape/instagram/transcript", params={"url": url}, api_key=api_key, timeout=60, attempts=1)
 
         err = _check_error(response)
         if err:
@@ -18,16 +18,26 @@ Runtime requirement:
   preferred path is adding `sports-skills>=0.21` to
   `machina-client-api/requirements.txt` and rebuilding the pod image.
 - As a fallback this module attempts a one-time `pip install
-  sports-skills` on first ImportError so customers can use the
-  connector without waiting on a pod-image rebuild. The first call is
-  then ~15-30s slower; subsequent calls are instant.
+  sports-skills` so customers can use the connector without waiting on a
+  pod-image rebuild. The install runs once per container (file-locked,
+  with a version marker) from a background pre-warm started when the
+  connector loads, so requests normally find the package already imported.
 """
 
+import contextlib
+import copy
+import fcntl
 import importlib
 import inspect
+import json
 import os
+import shutil
 import subprocess
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 
 _MIN_VERSION = (0, 28, 0)
@@ -38,6 +48,80 @@ _PIP_PACKAGE = "sports-skills>=0.28.0,<1.0"
 # reliably writable location. Contents live for the container's lifetime,
 # which matches how long the upgrade is needed.
 _TARGET_DIR = "/tmp/sports-skills-site"
+# Cross-process install coordination: only the worker holding this lock runs
+# pip; the others wait on it and then pick up the finished install. The
+# marker is written last, so its presence means the install is complete.
+_INSTALL_LOCK_PATH = _TARGET_DIR + ".lock"
+_INSTALL_MARKER = os.path.join(_TARGET_DIR, ".installed")
+_INSTALL_TIMEOUT = 180
+# Modules imported (and their signatures cached) by the background pre-warm.
+_PREWARM_MODULES = ("football", "polymarket", "kalshi", "markets", "betting", "news")
+
+_ready = False
+_ready_lock = threading.Lock()
+# (module_name, command) -> frozenset of accepted kwargs, or None when the
+# function takes **kwargs / has no introspectable signature.
+_signatures = {}
+
+# Response cache TTLs (seconds) per command family. Only the read-only
+# commands listed in _CACHE_FAMILIES are ever cached; anything else (order
+# placement, wallet configuration, account reads, commands added upstream
+# later) always reaches the package. A `cache_ttl` param overrides the TTL
+# per call and SPORTS_SKILLS_CACHE_TTLS='{"live": 10}' per container, for
+# listed commands only.
+_CACHE_FAMILIES = {
+    "live": frozenset((
+        "compare_odds", "fetch_items", "get_daily_schedule", "get_event", "get_event_details",
+        "get_event_lineups", "get_event_players_statistics", "get_event_statistics",
+        "get_event_summary", "get_event_timeline", "get_event_xg", "get_events",
+        "get_exchange_status", "get_game_summary", "get_last_trade_price", "get_market",
+        "get_market_candlesticks", "get_market_details", "get_market_prices", "get_markets",
+        "get_match", "get_matches", "get_news", "get_order_book", "get_pro_matches",
+        "get_scoreboard", "get_sport_markets", "get_sports_events", "get_sports_markets",
+        "get_todays_events", "get_todays_markets", "get_trades", "search_markets",
+    )),
+    "reference": frozenset((
+        "find_player", "get_competition_seasons", "get_competitions", "get_current_season",
+        "get_leagues", "get_lol_tournaments", "get_player_profile", "get_pro_teams",
+        "get_season_teams", "get_series", "get_series_list", "get_sports_config",
+        "get_sports_filters", "get_sports_market_types", "get_team_logo", "get_team_profile",
+        "search_entity", "search_player", "search_team",
+    )),
+    "schedules": frozenset((
+        "get_exchange_schedule", "get_head_to_head", "get_match_deliveries",
+        "get_missing_players", "get_player_season_stats", "get_player_stats",
+        "get_price_history", "get_season_leaders", "get_season_schedule",
+        "get_season_standings", "get_season_transfers", "get_sport_schedule",
+        "get_standings", "get_team_schedule", "lol_cargo_query",
+    )),
+}
+_CACHE_FAMILY_BY_COMMAND = {
+    command: family for family, commands in _CACHE_FAMILIES.items() for command in commands
+}
+# Betting utilities are pure math; recomputing beats a cache lookup.
+_UNCACHED_MODULES = frozenset(("betting",))
+_CACHE_TTLS = {
+    "live": 30,
+    "reference": 6 * 3600,
+    "schedules": 600,
+}
+try:
+    _CACHE_TTLS.update(
+        (family, ttl)
+        for family, ttl in json.loads(os.environ.get("SPORTS_SKILLS_CACHE_TTLS") or "{}").items()
+        if family in _CACHE_TTLS
+    )
+except (AttributeError, ValueError):
+    pass
+_CACHE_MAX_ENTRIES = 512
+# Keys the workflow runtime adds to every params dict; never part of a cache
+# key, even for **kwargs commands that receive them. api_key stays in the key
+# so responses fetched under one credential are not served under another.
+_FRAMEWORK_KEYS = frozenset(("model_name", "debugger", "headers"))
+_BATCH_MAX_WORKERS = 8
+
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
 
 
 def _loaded_version_ok():
@@ -66,38 +150,56 @@ def _activate_target():
     importlib.invalidate_caches()
     for name in [m for m in sys.modules if m == "sports_skills" or m.startswith("sports_skills.")]:
         del sys.modules[name]
+    _signatures.clear()
 
 
-def _ensure_sports_skills():
-    """Import sports_skills, pip-installing or upgrading when needed.
+def _target_installed():
+    """True when _TARGET_DIR holds a complete install of _PIP_PACKAGE."""
+    try:
+        with open(_INSTALL_MARKER, encoding="utf-8") as f:
+            return f.read().strip() == _PIP_PACKAGE
+    except OSError:
+        return False
 
-    Returns (ok: bool, err_msg: str|None). Pod base images bake a pinned
-    sports-skills into system site-packages; when that copy is older than
-    _MIN_VERSION (features like the 'worldcup' sport key would be missing),
-    this installs the current release to _TARGET_DIR and puts it first on
-    sys.path instead of silently using the stale version. Long-term the
-    floor should be enforced in the pod image requirements — this branch
-    keeps already-deployed pods working without a rebuild.
-    """
-    # Fast path: an acceptable version is already imported in THIS process.
-    if _loaded_version_ok():
-        return True, None
 
-    # A previous call (possibly in another worker process of this container)
-    # may have already installed the upgrade to /tmp — activate it and force
-    # a fresh import (purging any stale system module this worker cached).
-    if os.path.isdir(os.path.join(_TARGET_DIR, "sports_skills")):
-        _activate_target()
+def _import_target():
+    """Import sports_skills from _TARGET_DIR; True when the version is acceptable."""
+    _activate_target()
+    try:
+        importlib.import_module("sports_skills")
+    except ImportError:
+        return False
+    return _loaded_version_ok()
+
+
+@contextlib.contextmanager
+def _install_lock(timeout):
+    """Exclusive flock shared by every worker process of the container."""
+    with open(_INSTALL_LOCK_PATH, "a") as lock_file:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"timed out waiting for {_INSTALL_LOCK_PATH}")
+                time.sleep(0.5)
         try:
-            importlib.import_module("sports_skills")
-        except ImportError:
-            pass
-        if _loaded_version_ok():
-            return True, None
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
 
-    # Install/upgrade into the writable target. Capture stdout+stderr so
-    # failures surface a real error in the workflow output instead of a
-    # cryptic exit code.
+def _pip_install():
+    """pip install into a staging dir and swap it in, so readers never see a partial install.
+
+    Returns the CompletedProcess of the pip run.
+    """
+    staging = f"{_TARGET_DIR}.staging-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    # Capture stdout+stderr so failures surface a real error in the workflow
+    # output instead of a cryptic exit code.
     proc = subprocess.run(  # noqa: S603 — args are constants, no shell
         [
             sys.executable,
@@ -107,13 +209,58 @@ def _ensure_sports_skills():
             "--no-cache-dir",
             "--upgrade",
             "--target",
-            _TARGET_DIR,
+            staging,
             _PIP_PACKAGE,
         ],
         capture_output=True,
         text=True,
-        timeout=180,
+        timeout=_INSTALL_TIMEOUT,
     )
+    if proc.returncode != 0:
+        shutil.rmtree(staging, ignore_errors=True)
+        return proc
+
+    with open(os.path.join(staging, ".installed"), "w", encoding="utf-8") as f:
+        f.write(_PIP_PACKAGE)
+    if os.path.isdir(_TARGET_DIR):
+        retired = f"{_TARGET_DIR}.old-{os.getpid()}"
+        os.rename(_TARGET_DIR, retired)
+        os.rename(staging, _TARGET_DIR)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.rename(staging, _TARGET_DIR)
+    return proc
+
+
+def _ensure_sports_skills_once():
+    # Fast path: an acceptable version is already imported in THIS process.
+    if _loaded_version_ok():
+        return True, None
+
+    # Another worker of this container may have installed the upgrade already.
+    if _target_installed() and _import_target():
+        return True, None
+
+    # The baked copy in system site-packages may already be recent enough.
+    if "sports_skills" not in sys.modules:
+        try:
+            importlib.import_module("sports_skills")
+        except ImportError:
+            pass
+        if _loaded_version_ok():
+            return True, None
+
+    try:
+        with _install_lock(_INSTALL_TIMEOUT + 30):
+            # Re-check under the lock: the previous holder may have just
+            # finished the install this worker was about to run.
+            if _target_installed():
+                if _import_target():
+                    return True, None
+            proc = _pip_install()
+    except (OSError, TimeoutError, subprocess.TimeoutExpired) as e:
+        proc = subprocess.CompletedProcess(args=[], returncode=-1, stdout="", stderr=str(e))
+
     if proc.returncode != 0:
         # pip prints the actionable bit to stderr; include both for safety.
         tail = (proc.stderr or proc.stdout or "")[-1500:]
@@ -126,15 +273,102 @@ def _ensure_sports_skills():
             pass
         return False, f"pip install {_PIP_PACKAGE} failed (rc={proc.returncode}): {tail}"
 
-    _activate_target()
-    try:
-        importlib.import_module("sports_skills")
+    if _import_target() or "sports_skills" in sys.modules:
         return True, None
-    except ImportError as e:
-        return False, (
-            f"sports_skills installed but not importable from {_TARGET_DIR}: {e}. "
-            f"pip stdout tail: {(proc.stdout or '')[-500:]}"
+    return False, (
+        f"sports_skills installed but not importable from {_TARGET_DIR}. "
+        f"pip stdout tail: {(proc.stdout or '')[-500:]}"
+    )
+
+
+def _ensure_sports_skills():
+    """Import sports_skills, pip-installing or upgrading when needed.
+
+    Returns (ok: bool, err_msg: str|None). Pod base images bake a pinned
+    sports-skills into system site-packages; when that copy is older than
+    _MIN_VERSION (features like the 'worldcup' sport key would be missing),
+    this installs the current release to _TARGET_DIR and puts it first on
+    sys.path instead of silently using the stale version. Long-term the
+    floor should be enforced in the pod image requirements — this branch
+    keeps already-deployed pods working without a rebuild.
+
+    Runs once per process: threads wait on an in-process lock and worker
+    processes on a file lock, so pip runs at most once per container.
+    """
+    global _ready
+    if _ready:
+        return True, None
+    with _ready_lock:
+        if _ready:
+            return True, None
+        ok, err = _ensure_sports_skills_once()
+        _ready = ok
+        return ok, err
+
+
+def _allowed_kwargs(module_name, command, fn):
+    """Cached kwargs filter for a command, see _dispatch."""
+    key = (module_name, command)
+    if key in _signatures:
+        return _signatures[key]
+    try:
+        sig = inspect.signature(fn)
+        accepts_kwargs = any(
+            p.kind is inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values()
         )
+        allowed = None if accepts_kwargs else frozenset(sig.parameters.keys())
+    except (TypeError, ValueError):
+        # Builtins / C-extensions don't expose signatures — pass through.
+        allowed = None
+    _signatures[key] = allowed
+    return allowed
+
+
+def _prewarm():
+    """Install/import sports_skills and cache command signatures off the request path."""
+    ok, _ = _ensure_sports_skills()
+    if not ok:
+        return
+    for module_name in _PREWARM_MODULES:
+        try:
+            mod = importlib.import_module(f"sports_skills.{module_name}")
+        except Exception:  # noqa: BLE001 — best effort, requests report real errors
+            continue
+        for command in dir(mod):
+            fn = getattr(mod, command, None)
+            if not command.startswith("_") and callable(fn):
+                _allowed_kwargs(module_name, command, fn)
+
+
+def _cache_family(module_name, command):
+    """Cache family of a read-only command, or None when it must never be cached."""
+    if module_name in _UNCACHED_MODULES:
+        return None
+    return _CACHE_FAMILY_BY_COMMAND.get(command)
+
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, stored_at, data = entry
+        if expires_at <= time.monotonic():
+            del _response_cache[key]
+            return None
+        _response_cache.move_to_end(key)
+    # Callers get their own copy, so mutating a response never reaches the cache
+    return stored_at, copy.deepcopy(data)
+
+
+def _cache_put(key, ttl, data):
+    data = copy.deepcopy(data)
+    now = time.monotonic()
+    with _cache_lock:
+        _response_cache[key] = (now + ttl, now, data)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > _CACHE_MAX_ENTRIES:
+            _response_cache.popitem(last=False)
 
 
 def _dispatch(module_name, request_data):
@@ -150,6 +384,7 @@ def _dispatch(module_name, request_data):
 
     params = dict(request_data.get("params") or {})
     command = params.pop("command", None)
+    cache_ttl = params.pop("cache_ttl", None)
     if not command:
         return {
             "status": False,
@@ -184,17 +419,38 @@ def _dispatch(module_name, request_data):
     # kwargs with TypeError. Filter `params` down to what the function
     # actually accepts so the agent never has to know which keys are
     # framework noise vs. real call args.
-    try:
-        sig = inspect.signature(fn)
-        accepts_kwargs = any(
-            p.kind is inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values()
-        )
-        if not accepts_kwargs:
-            allowed = set(sig.parameters.keys())
-            params = {k: v for k, v in params.items() if k in allowed}
-    except (TypeError, ValueError):
-        # Builtins / C-extensions don't expose signatures — pass through.
-        pass
+    allowed = _allowed_kwargs(module_name, command, fn)
+    if allowed is not None:
+        params = {k: v for k, v in params.items() if k in allowed}
+
+    # Identical read calls within the family TTL are served from memory.
+    # Commands outside the read-only allowlist are never cached, whatever
+    # cache_ttl says. Framework keys are left out of the key, also for
+    # **kwargs commands whose params were not filtered above, so they never
+    # split it.
+    family = _cache_family(module_name, command)
+    ttl = 0.0
+    if family is not None:
+        try:
+            ttl = float(cache_ttl) if cache_ttl not in (None, "") else float(_CACHE_TTLS[family])
+        except (TypeError, ValueError):
+            ttl = float(_CACHE_TTLS[family])
+    cache_key = None
+    if ttl > 0:
+        try:
+            key_params = {k: v for k, v in params.items() if k not in _FRAMEWORK_KEYS}
+            cache_key = (module_name, command, json.dumps(key_params, sort_keys=True, default=str))
+        except (TypeError, ValueError):
+            cache_key = None
+    if cache_key is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            stored_at, data = cached
+            return {
+                "status": True,
+                "data": data,
+                "cache": {"status": "hit", "family": family, "ttl": ttl, "age": round(time.monotonic() - stored_at, 3)},
+            }
 
     try:
         result = fn(**params)
@@ -215,7 +471,20 @@ def _dispatch(module_name, request_data):
         result = result.model_dump()
     elif hasattr(result, "dict"):
         result = result.dict()
-    return {"status": True, "data": result}
+
+    if cache_key is None:
+        return {"status": True, "data": result, "cache": {"status": "bypass", "family": family}}
+    # The package reports upstream failures inside its own envelope; don't pin those.
+    if isinstance(result, dict) and result.get("status") is False:
+        return {"status": True, "data": result, "cache": {"status": "bypass", "family": family}}
+    _cache_put(cache_key, ttl, result)
+    return {"status": True, "data": result, "cache": {"status": "miss", "family": family, "ttl": ttl}}
+
+
+# Warm the import (and, if needed, the one-time install) when the connector
+# loads instead of on the first request. SPORTS_SKILLS_PREWARM=0 disables it.
+if os.environ.get("SPORTS_SKILLS_PREWARM", "1") != "0":
+    threading.Thread(target=_prewarm, name="sports-skills-prewarm", daemon=True).start()
 
 
 # -------------------------------------------------------------------
@@ -424,3 +693,64 @@ def invoke_sports_skills(request_data):
 
     return _dispatch(module_name, request_data)
 
+
+def invoke_batch(request_data):
+    """Run several sports-skills commands concurrently in one connector call.
+
+    Params:
+        calls: list of {"module", "command", ...kwargs} dicts (kwargs may also
+            be nested under "kwargs"), or [module, command, kwargs] lists.
+        max_workers: thread pool size (default 8).
+
+    Each call goes through the same dispatcher (and response cache) as the
+    invoke_<module> commands; a failing call does not affect the others.
+    Results come back in call order as {"module", "command", "status",
+    "data" | "message", "cache"}.
+    """
+    params = request_data.get("params") or {}
+    calls = params.get("calls") or []
+    if not isinstance(calls, list) or not calls:
+        return {"status": False, "message": "invoke_batch: `calls` must be a non-empty list of {module, command, ...kwargs}."}
+
+    ok, err = _ensure_sports_skills()
+    if not ok:
+        return {"status": False, "message": err}
+
+    def _run(call):
+        if isinstance(call, (list, tuple)):
+            module_name = call[0] if len(call) > 0 else None
+            command = call[1] if len(call) > 1 else None
+            kwargs = dict(call[2]) if len(call) > 2 and isinstance(call[2], dict) else {}
+        elif isinstance(call, dict):
+            kwargs = {k: v for k, v in call.items() if k not in ("module", "command", "kwargs")}
+            kwargs.update(call.get("kwargs") or {})
+            module_name = call.get("module")
+            command = call.get("command")
+        else:
+            return {"status": False, "message": "each call must be a dict or [module, command, kwargs]"}
+
+        if not isinstance(module_name, str) or not module_name.isidentifier():
+            return {"module": module_name, "command": command, "status": False, "message": f"invalid module: {module_name!r}"}
+        try:
+            result = _dispatch(module_name, {"params": dict(kwargs, command=command)})
+        except Exception as e:  # noqa: BLE001 — isolate failures per call
+            result = {"status": False, "message": f"sports_skills.{module_name}.{command} raised: {e}"}
+        return dict(result, module=module_name, command=command)
+
+    try:
+        max_workers = max(1, min(int(params.get("max_workers") or _BATCH_MAX_WORKERS), len(calls)))
+    except (TypeError, ValueError):
+        max_workers = min(_BATCH_MAX_WORKERS, len(calls))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_run, calls))
+
+    succeeded = sum(1 for r in results if r.get("status"))
+    return {
+        "status": True,
+        "data": {
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+        },
+    }
@@ -1,6 +1,54 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from azure.storage.blob import BlobServiceClient
 
 
+# Blobs above this size are uploaded as blocks in parallel
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+UPLOAD_MAX_CONCURRENCY = 4
+
+DEFAULT_MAX_WORKERS = 8
+
+_clients = {}
+
+_clients_lock = threading.Lock()
+
+
+def _get_blob_service_client(azure_blob_str):
+
+    # One client (and connection pool) per connection string, keyed by its hash
+    key = hashlib.sha256(azure_blob_str.encode("utf-8")).hexdigest()
+
+    with _clients_lock:
+
+        client = _clients.get(key)
+
+        if client is None:
+
+            client = BlobServiceClient.from_connection_string(azure_blob_str)
+
+            _clients[key] = client
+
+        return client
+
+
+def _upload_file(blob_service_client, full_filepath, final_filename):
+
+    container_name = 'gb-blob-images'
+
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=final_filename)
+
+    max_concurrency = UPLOAD_MAX_CONCURRENCY if os.path.getsize(full_filepath) > PARALLEL_THRESHOLD else 1
+
+    with open(full_filepath, 'rb') as data:
+
+        blob_client.upload_blob(data, overwrite=True, max_concurrency=max_concurrency)
+
+
 def store_image(request_data):
 
     headers = request_data.get("headers")
@@ -10,24 +58,62 @@ def store_image(request_data):
     azure_blob_str = headers.get("api_key", "")
 
     full_filepath = params.get("full_filepath", "")
-    
+
     final_filename = params.get("final_filename", "")
 
     if azure_blob_str is None:
 
         return {"status": False, "message": "Missing Azure Blob connection string."}
 
-    blob_service_client = BlobServiceClient.from_connection_string(azure_blob_str)
+    blob_service_client = _get_blob_service_client(azure_blob_str)
 
-    container_name = 'gb-blob-images'
+    _upload_file(blob_service_client, full_filepath, final_filename)
 
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=final_filename)
+    return {"status": True, "data": {"data": final_filename}, "message": "Image stored."}
 
-    with open(full_filepath, 'rb') as data:
 
-        blob_client.upload_blob(data, overwrite=True)
+def store_images(request_data):
 
-    return {"status": True, "data": {"data": final_filename}, "message": "Image stored."}
+    headers = request_data.get("headers")
+
+    params = request_data.get("params")
+
+    azure_blob_str = headers.get("api_key", "")
+
+    # List of {"full_filepath", "final_filename"}
+    files = params.get("files", [])
+
+    if not azure_blob_str:
+
+        return {"status": False, "message": "Missing Azure Blob connection string."}
+
+    if not files:
+
+        return {"status": False, "message": "Missing files to store."}
+
+    blob_service_client = _get_blob_service_client(azure_blob_str)
+
+    def upload(item):
+
+        try:
+
+            _upload_file(blob_service_client, item.get("full_filepath", ""), item.get("final_filename", ""))
+
+            return {"status": True, "data": item.get("final_filename", "")}
+
+        except Exception as e:
+
+            return {"status": False, "data": item.get("final_filename", ""), "message": str(e)}
+
+    max_workers = min(int(params.get("max_workers") or DEFAULT_MAX_WORKERS), len(files))
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+
+        results = list(executor.map(upload, files))
+
+    stored = sum(1 for result in results if result["status"])
+
+    return {"status": True, "data": {"results": results, "stored": stored, "failed": len(results) - stored}, "message": f"{stored} of {len(results)} images stored."}
 
 
 def store_base64_image(request_data):
@@ -41,12 +127,12 @@ def store_base64_image(request_data):
     base64_image = params.get("base64_image", "")
 
     final_filename = params.get("final_filename", "")
-    
+
     if azure_blob_str is None:
 
         return {"status": False, "message": "Missing Azure Blob connection string."}
 
-    blob_service_client = BlobServiceClient.from_connection_string(azure_blob_str)
+    blob_service_client = _get_blob_service_client(azure_blob_str)
 
     container_name = 'gb-blob-images'
 
@@ -1,13 +1,248 @@
 import base64
+import contextlib
+import fcntl
+import hashlib
 import json
 import mimetypes
+import shutil
 import tempfile
+import time
 import urllib.request
 import urllib.error
 import urllib.parse
 import os
 
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TEMP_DOWNLOADER_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "temp-downloader-cache"),
+)
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+def _as_bool(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return bool(value)
+
+
+@contextlib.contextmanager
+def _cache_lock(cache_dir):
+    """Hold an exclusive flock on the cache for an index read-modify-write."""
+    with open(os.path.join(cache_dir, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_cache_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache_index(cache_dir, index):
+    # Write-then-rename so concurrent runs never read a half written index
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".index")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(cache_dir, "index.json"))
+
+
+def _object_path(cache_dir, digest):
+    return os.path.join(cache_dir, "objects", digest)
+
+
+def _evict_cache(cache_dir, index, max_bytes):
+    """Drop least recently used objects (by mtime) until the cache fits max_bytes."""
+    objects_dir = os.path.join(cache_dir, "objects")
+    entries = []
+    total = 0
+    for name in os.listdir(objects_dir):
+        try:
+            stat = os.stat(os.path.join(objects_dir, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+        total += stat.st_size
+
+    evicted = set()
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(os.path.join(objects_dir, name))
+        except OSError:
+            continue
+        total -= size
+        evicted.add(name)
+
+    if evicted:
+        for url in [url for url, entry in index.items() if entry.get("sha256") in evicted]:
+            del index[url]
+    return bool(evicted)
+
+
+def _stream_to_file(response, file_obj, max_bytes):
+    """Copy the response body in chunks, returning (size, sha256) or raising DownloadTooLarge."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = response.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise DownloadTooLarge(f"Download exceeds max_bytes ({max_bytes} bytes).")
+        digest.update(chunk)
+        file_obj.write(chunk)
+    return size, digest.hexdigest()
+
+
+def _temp_path(filename):
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        return temp_file.name
+
+
+def _materialize(source_path, filename):
+    """Give the caller its own copy of a cached object; writes to it never reach the cache."""
+    temp_path = _temp_path(filename)
+    shutil.copyfile(source_path, temp_path)
+    return temp_path
+
+
+def _materialize_hit(cache_dir, cached_path, filename):
+    """Copy out a revalidated object, or None if a concurrent run evicted it meanwhile."""
+    with _cache_lock(cache_dir):
+        if not os.path.exists(cached_path):
+            return None
+        os.utime(cached_path)
+        return _materialize(cached_path, filename)
+
+
+def _download_cached(image_url, filename, cache_dir, cache_max_bytes, max_bytes, timeout):
+    """Revalidate and fetch through the content-addressed cache, returning (path, sha256, cache_hit)."""
+    os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+    index = _load_cache_index(cache_dir)
+    entry = index.get(image_url)
+    cached_path = _object_path(cache_dir, entry["sha256"]) if entry else None
+    if cached_path and not os.path.exists(cached_path):
+        entry = cached_path = None
+
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    req = urllib.request.Request(image_url, headers=headers)
+    try:
+        response = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and cached_path:
+            hit = _materialize_hit(cache_dir, cached_path, filename)
+            if hit:
+                return hit, entry["sha256"], True
+            # Evicted since the lookup: fetch it again unconditionally
+            return _download_cached(image_url, filename, cache_dir, cache_max_bytes, max_bytes, timeout)
+        raise
+
+    with response:
+        etag = response.headers.get("ETag")
+        if cached_path and etag and etag == entry.get("etag"):
+            # Servers that ignore conditional headers still tell us nothing changed
+            hit = _materialize_hit(cache_dir, cached_path, filename)
+            if hit:
+                return hit, entry["sha256"], True
+            # Evicted since the lookup; the body is still here, so store it again
+
+        length = response.headers.get("Content-Length")
+        if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+            raise DownloadTooLarge(f"Download exceeds max_bytes ({max_bytes} bytes).")
+
+        fd, staging_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as staging_file:
+                size, digest = _stream_to_file(response, staging_file, max_bytes)
+            if size > cache_max_bytes:
+                # Caching it would only evict everything else and then itself
+                temp_path = _temp_path(filename)
+                shutil.move(staging_path, temp_path)
+                return temp_path, digest, False
+
+            with _cache_lock(cache_dir):
+                object_path = _object_path(cache_dir, digest)
+                if os.path.exists(object_path):
+                    # Same bytes under another URL or ETag: keep the existing object
+                    os.unlink(staging_path)
+                    os.utime(object_path)
+                else:
+                    os.replace(staging_path, object_path)
+
+                # Re-read under the lock so entries written by concurrent runs survive
+                index = _load_cache_index(cache_dir)
+                index[image_url] = {
+                    "sha256": digest,
+                    "size": size,
+                    "etag": etag,
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "stored_at": time.time(),
+                }
+                temp_path = _materialize(object_path, filename)
+                _evict_cache(cache_dir, index, cache_max_bytes)
+                _save_cache_index(cache_dir, index)
+        except BaseException:
+            if os.path.exists(staging_path):
+                os.unlink(staging_path)
+            raise
+
+    return temp_path, digest, False
+
+
+def _download_uncached(image_url, filename, max_bytes, timeout):
+    req = urllib.request.Request(image_url, headers={'User-Agent': 'Mozilla/5.0'})
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_path = temp_file.name
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                _, digest = _stream_to_file(response, temp_file, max_bytes)
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_path)
+            raise
+    return temp_path, digest, False
+
+
 def invoke_download(request_data):
+    """
+    Download a file from a URL into a temp file.
+
+    The body is streamed to disk in chunks with a byte cap and timeout. Unless
+    `use_cache` is false, downloads go through a local content-addressed cache
+    (URL + ETag -> sha256 object) that is revalidated with conditional requests
+    and trimmed least recently used first, so repeated runs reuse the asset.
+    Callers always get their own copy; bodies larger than `cache_max_bytes`
+    are returned without being cached.
+
+    Optional params:
+        filename, timeout (seconds, default 30), max_bytes (default 100MB),
+        use_cache (default true), cache_dir, cache_max_bytes (default 1GB)
+    """
     params = request_data.get("params", {})
     
     # Get the image URL
@@ -28,14 +263,20 @@ def invoke_download(request_data):
             filename = "downloaded_image"
     
     try:
-        # Create a temporary file to store the downloaded image
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            # Download the image
-            req = urllib.request.Request(image_url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req) as response:
-                temp_file.write(response.read())
-            
-            temp_file_path = temp_file.name
+        timeout = float(params.get("timeout") or DEFAULT_TIMEOUT)
+        max_bytes = int(params.get("max_bytes") or DEFAULT_MAX_BYTES)
+
+        if _as_bool(params.get("use_cache"), default=True):
+            temp_file_path, digest, cache_hit = _download_cached(
+                image_url,
+                filename,
+                params.get("cache_dir") or DEFAULT_CACHE_DIR,
+                int(params.get("cache_max_bytes") or DEFAULT_CACHE_MAX_BYTES),
+                max_bytes,
+                timeout,
+            )
+        else:
+            temp_file_path, digest, cache_hit = _download_uncached(image_url, filename, max_bytes, timeout)
         
         # Get the content type
         content_type, _ = mimetypes.guess_type(filename)
@@ -52,10 +293,14 @@ def invoke_download(request_data):
                 "filename": filename,
                 "content_type": content_type,
                 "size": file_size,
-                "temp_path": temp_file_path
+                "temp_path": temp_file_path,
+                "sha256": digest,
+                "cache_hit": cache_hit
             }
         }
         
+    except DownloadTooLarge as e:
+        return {"status": "error", "message": str(e)}
     except urllib.error.URLError as e:
         return {"status": "error", "message": f"Failed to download file from URL: {e}"}
     except Exception as e:
@@ -4,6 +4,8 @@ import json
 import os
 import sys
 import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 
@@ -71,6 +73,121 @@ class TestInvokeDownload:
         os.unlink(result["data"]["temp_path"])
 
 
+class _AssetHandler(BaseHTTPRequestHandler):
+    body = b"x" * 4096
+    # Per-path bodies; other paths serve `body`
+    bodies = {}
+    etag = '"v1"'
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.bodies.get(self.path, self.body)
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def asset_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AssetHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _AssetHandler.hits = []
+    _AssetHandler.bodies = {}
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class TestDownloadCache:
+    """Tests for streamed, cached downloads against a local server."""
+
+    def test_repeat_download_is_cache_hit(self, asset_server, tmp_path):
+        request = {"params": {"image_url": f"{asset_server}/a.png", "cache_dir": str(tmp_path)}}
+        first = invoke_download(request)
+        second = invoke_download(request)
+        assert first["status"] == True and second["status"] == True
+        assert first["data"]["cache_hit"] == False
+        assert second["data"]["cache_hit"] == True
+        assert first["data"]["sha256"] == second["data"]["sha256"]
+        assert second["data"]["size"] == len(_AssetHandler.body)
+        # Callers own their copy; removing it must not break the cache
+        os.unlink(first["data"]["temp_path"])
+        os.unlink(second["data"]["temp_path"])
+        assert invoke_download(request)["data"]["cache_hit"] == True
+
+    def test_max_bytes_rejects_large_download(self, asset_server, tmp_path):
+        request = {"params": {"image_url": f"{asset_server}/a.png", "cache_dir": str(tmp_path), "max_bytes": 1024}}
+        result = invoke_download(request)
+        assert result["status"] == "error"
+        assert "max_bytes" in result["message"]
+        assert os.listdir(tmp_path / "objects") == []
+
+    def test_cache_evicts_least_recently_used(self, asset_server, tmp_path):
+        for name in ("a", "b", "c"):
+            _AssetHandler.bodies[f"/{name}.png"] = name.encode() * 4096
+
+        def download(name):
+            request = {"params": {
+                "image_url": f"{asset_server}/{name}.png",
+                "cache_dir": str(tmp_path),
+                "cache_max_bytes": 9000,
+            }}
+            result = invoke_download(request)
+            assert result["status"] == True
+            os.unlink(result["data"]["temp_path"])
+            return result["data"]
+
+        first = {name: download(name) for name in ("a", "b")}
+        # Touch "a" so "b" becomes the least recently used object
+        assert download("a")["cache_hit"] == True
+        third = download("c")
+
+        objects = set(os.listdir(tmp_path / "objects"))
+        assert objects == {first["a"]["sha256"], third["sha256"]}
+        index = json.loads((tmp_path / "index.json").read_text())
+        assert sorted(url.rsplit("/", 1)[1] for url in index) == ["a.png", "c.png"]
+        assert download("c")["cache_hit"] == True
+        assert download("b")["cache_hit"] == False
+
+    def test_object_larger_than_cache_is_not_cached(self, asset_server, tmp_path):
+        request = {"params": {
+            "image_url": f"{asset_server}/a.png",
+            "cache_dir": str(tmp_path),
+            "cache_max_bytes": 1024,
+        }}
+        result = invoke_download(request)
+        assert result["status"] == True
+        assert result["data"]["size"] == len(_AssetHandler.body)
+        with open(result["data"]["temp_path"], "rb") as f:
+            assert f.read() == _AssetHandler.body
+        os.unlink(result["data"]["temp_path"])
+        assert os.listdir(tmp_path / "objects") == []
+        assert not (tmp_path / "index.json").exists()
+        assert [p for p in os.listdir(tmp_path) if p.endswith(".part")] == []
+
+    def test_temp_file_is_a_copy(self, asset_server, tmp_path):
+        request = {"params": {"image_url": f"{asset_server}/a.png", "cache_dir": str(tmp_path)}}
+        result = invoke_download(request)
+        with open(result["data"]["temp_path"], "wb") as f:
+            f.write(b"overwritten by the caller")
+        os.unlink(result["data"]["temp_path"])
+        again = invoke_download(request)
+        assert again["data"]["cache_hit"] == True
+        with open(again["data"]["temp_path"], "rb") as f:
+            assert f.read() == _AssetHandler.body
+        os.unlink(again["data"]["temp_path"])
+
+
 class TestInvokeSaveToTmp:
     """Tests for invoke_save_to_tmp function."""
 